@@ -0,0 +1,3 @@
+"""Benchmarks to compare the runtime and quality of operators.
+Run them as module, e.g. `python -m benchmarks.line_detectors --help`
+"""
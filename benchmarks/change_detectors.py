@@ -0,0 +1,106 @@
+"""Benchmark of ChangeDetector (MOG) against RunningAverageDetector.
+
+Both operators are called on the frames of a recorded video. If no video is
+given, a synthetic sequence with slow lighting changes and a dart like object,
+which appears after some frames, is generated.
+The benchmark reports the mean runtime per frame, the intersection over union
+of both masks and for the synthetic sequence the intersection over union with
+the true mask.
+"""
+
+import argparse
+import time
+from typing import Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from countdart.operators import ChangeDetector, RunningAverageDetector
+
+
+def synthetic_frames(
+    count: int, seed: int = 0
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Creates frames with noise, slow lighting change and a line,
+    which appears in the second half of the sequence
+
+    Args:
+        count (int): number of frames
+        seed (int, optional): random seed. Defaults to 0.
+
+    Yields:
+        Iterator[Tuple[np.ndarray, np.ndarray]]: RGB frame and true mask
+    """
+    rng = np.random.default_rng(seed)
+    background = rng.integers(40, 200, (720, 1280, 3)).astype(np.float32)
+    background = cv2.GaussianBlur(background, (31, 31), 0)
+    for i in range(count):
+        lighting = 1 + 0.1 * np.sin(i / count * np.pi)
+        image = background * lighting + rng.normal(0, 3, background.shape)
+        image = np.clip(image, 0, 255).astype(np.uint8)
+        mask = np.zeros(image.shape[:2], dtype=np.uint8)
+        if i >= count // 2:
+            cv2.line(mask, (500, 300), (700, 420), 255, thickness=8)
+            image[mask > 0] = 250
+        yield image, mask
+
+
+def video_frames(path: str) -> Iterator[Tuple[np.ndarray, Optional[np.ndarray]]]:
+    """Yields RGB frames of a video without true mask"""
+    capture = cv2.VideoCapture(path)
+    while True:
+        ret, image = capture.read()
+        if not ret:
+            break
+        yield cv2.cvtColor(image, cv2.COLOR_BGR2RGB), None
+    capture.release()
+
+
+def iou(a: np.ndarray, b: np.ndarray) -> Optional[float]:
+    """Intersection over union of two masks, resized to the size of b"""
+    a = cv2.resize(a, (b.shape[1], b.shape[0]), interpolation=cv2.INTER_NEAREST)
+    union = np.count_nonzero((a > 0) | (b > 0))
+    if union == 0:
+        return None
+    return np.count_nonzero((a > 0) & (b > 0)) / union
+
+
+def main():
+    """Runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--video", help="recorded video of a dartboard")
+    parser.add_argument("--count", type=int, default=200, help="synthetic frames")
+    args = parser.parse_args()
+
+    if args.video:
+        frames = video_frames(args.video)
+    else:
+        frames = synthetic_frames(args.count)
+    detectors = {"mog": ChangeDetector(), "running_average": RunningAverageDetector()}
+    times = {name: [] for name in detectors}
+    truth_ious = {name: [] for name in detectors}
+    mutual_ious = []
+    for image, truth in frames:
+        masks = {}
+        for name, detector in detectors.items():
+            start = time.perf_counter()
+            masks[name] = detector(image)
+            times[name].append(time.perf_counter() - start)
+            if truth is not None:
+                value = iou(masks[name], truth)
+                if value is not None:
+                    truth_ious[name].append(value)
+        value = iou(masks["running_average"], masks["mog"])
+        if value is not None:
+            mutual_ious.append(value)
+
+    for name, values in times.items():
+        print(f"{name}: {np.mean(values) * 1000:.3f} ms per frame")
+        if truth_ious[name]:
+            print(f"{name}: mean iou with true mask {np.mean(truth_ious[name]):.3f}")
+    if mutual_ious:
+        print(f"mean iou between both masks: {np.mean(mutual_ious):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark of HoughLineDetector against PrincipalAxisDetector.
+
+Both operators are called on binary dart masks, e.g. recorded outputs of the
+DartSegmentor saved as images. If no directory is given, synthetic masks of
+darts with random angles are generated.
+The benchmark reports the mean runtime per mask and the angle difference
+between both detected lines.
+"""
+
+import argparse
+import glob
+import os
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from countdart.operators import BBoxDetector, HoughLineDetector, PrincipalAxisDetector
+
+
+def synthetic_masks(count: int, seed: int = 0) -> Tuple[List[np.ndarray], List[float]]:
+    """Creates binary masks with a dart like shape (thick line with noise)
+
+    Args:
+        count (int): number of masks
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        Tuple[List[np.ndarray], List[float]]: binary masks and true angles
+    """
+    rng = np.random.default_rng(seed)
+    masks = []
+    angles = []
+    for _ in range(count):
+        mask = np.zeros((720, 1280), dtype=np.uint8)
+        angle = rng.uniform(0, np.pi)
+        length = rng.uniform(100, 250)
+        cx, cy = rng.uniform(300, 900), rng.uniform(250, 450)
+        dx, dy = np.cos(angle) * length / 2, np.sin(angle) * length / 2
+        pt1 = (int(cx - dx), int(cy - dy))
+        pt2 = (int(cx + dx), int(cy + dy))
+        cv2.line(mask, pt1, pt2, 255, thickness=int(rng.integers(3, 9)))
+        # flight of the dart
+        cv2.circle(mask, pt2, 12, 255, thickness=-1)
+        noise = rng.random(mask.shape) > 0.99998
+        mask[noise] = 255
+        masks.append(mask)
+        angles.append(np.rad2deg(angle))
+    return masks, angles
+
+
+def load_masks(directory: str) -> List[np.ndarray]:
+    """Loads all png and jpg images in directory as binary masks"""
+    paths = sorted(
+        glob.glob(os.path.join(directory, "*.png"))
+        + glob.glob(os.path.join(directory, "*.jpg"))
+    )
+    masks = []
+    for path in paths:
+        mask = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        _, mask = cv2.threshold(mask, 127, 255, cv2.THRESH_BINARY)
+        masks.append(mask)
+    return masks
+
+
+def angle(line, h: int, w: int) -> float:
+    """Returns the undirected angle of the line in degree"""
+    x1, y1, x2, y2 = line.x1 * w, line.y1 * h, line.x2 * w, line.y2 * h
+    return np.rad2deg(np.arctan2(y2 - y1, x2 - x1)) % 180
+
+
+def angle_diff(a: float, b: float) -> float:
+    """Returns the difference of two undirected angles in degree"""
+    diff = abs(a - b) % 180
+    return min(diff, 180 - diff)
+
+
+def main():
+    """Runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--masks", help="directory with recorded dart masks")
+    parser.add_argument("--count", type=int, default=100, help="synthetic masks")
+    args = parser.parse_args()
+
+    angles: Optional[List[float]] = None
+    if args.masks:
+        masks = load_masks(args.masks)
+    else:
+        masks, angles = synthetic_masks(args.count)
+    bbox_detector = BBoxDetector()
+    detectors = {
+        "hough": HoughLineDetector(),
+        "principal_axis": PrincipalAxisDetector(),
+    }
+    times = {name: [] for name in detectors}
+    errors = {name: [] for name in detectors}
+    angle_diffs = []
+    for i, mask in enumerate(masks):
+        bbox, _ = bbox_detector(mask)
+        _, _, w, h = bbox.to_pixel(*mask.shape)
+        lines = {}
+        for name, detector in detectors.items():
+            start = time.perf_counter()
+            lines[name] = detector.call(mask, bbox)
+            times[name].append(time.perf_counter() - start)
+            if lines[name] and angles:
+                errors[name].append(angle_diff(angle(lines[name], h, w), angles[i]))
+        if all(lines.values()):
+            angle_diffs.append(
+                angle_diff(
+                    angle(lines["hough"], h, w), angle(lines["principal_axis"], h, w)
+                )
+            )
+
+    print(f"masks: {len(masks)}")
+    for name, values in times.items():
+        print(f"{name}: {np.mean(values) * 1000:.3f} ms per mask")
+        if errors[name]:
+            print(
+                f"{name}: angle error mean {np.mean(errors[name]):.2f} deg, "
+                f"max {np.max(errors[name]):.2f} deg"
+            )
+    if angle_diffs:
+        print(
+            f"angle difference: mean {np.mean(angle_diffs):.2f} deg, "
+            f"max {np.max(angle_diffs):.2f} deg"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark of the binary result encoding against json.
+
+Compares encode and decode cost per ResultMessage of the previous json
+path (model_dump_json, json.loads and ResultMessage(**...)), of pydantic's
+json parser (model_validate_json) and of the compact binary format
+(encode_result and decode_result).
+"""
+
+import argparse
+import json
+import time
+from typing import Callable, Dict
+
+from countdart.database.schemas import DartThrowBase, ResultMessage
+from countdart.utils.result_codec import decode_result, encode_result
+
+
+def per_message(funcs: Dict[str, Callable], count: int, rounds: int = 20):
+    """Returns the runtime per call of each function in microseconds.
+    The functions are timed alternately in multiple rounds and the fastest
+    round is used, to reduce the noise of other processes."""
+    best = {name: float("inf") for name in funcs}
+    calls = max(1, count // rounds)
+    for _ in range(rounds):
+        for name, func in funcs.items():
+            start = time.perf_counter()
+            for _ in range(calls):
+                func()
+            best[name] = min(best[name], (time.perf_counter() - start) / calls)
+    return {name: value * 1e6 for name, value in best.items()}
+
+
+def main():
+    """Runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100000, help="messages")
+    args = parser.parse_args()
+
+    messages = {
+        "hand": ResultMessage(cls="hand"),
+        "dart": ResultMessage(
+            cls="dart",
+            content=DartThrowBase(score="T 20", confidence=0.75, point=(1.5, 100.25)),
+        ),
+    }
+    for name, message in messages.items():
+        encoded_json = message.model_dump_json()
+        encoded_binary = encode_result(message)
+        print(f"{name}: {len(encoded_json)} bytes json, {len(encoded_binary)} bytes")
+        paths = {
+            "json.loads": (
+                message.model_dump_json,
+                lambda: ResultMessage(**json.loads(encoded_json)),
+            ),
+            "model_validate_json": (
+                message.model_dump_json,
+                lambda: ResultMessage.model_validate_json(encoded_json),
+            ),
+            "binary": (
+                lambda: encode_result(message),
+                lambda: decode_result(encoded_binary),
+            ),
+        }
+        encode_costs = per_message({k: v[0] for k, v in paths.items()}, args.count)
+        decode_costs = per_message({k: v[1] for k, v in paths.items()}, args.count)
+        for path in paths:
+            print(
+                f"{name} {path}: encode {encode_costs[path]:.2f} us, "
+                f"decode {decode_costs[path]:.2f} us"
+            )
+
+
+if __name__ == "__main__":
+    main()
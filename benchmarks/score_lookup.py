@@ -0,0 +1,63 @@
+"""Benchmark of the score raster of the DartboardModel.
+
+Compares the per point cost of the analytic get_score with the raster
+lookup of get_scores for a single point and for a large batch of points.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from countdart.utils.dartboard_model import DartboardModel
+
+
+def per_point(func, points: np.ndarray, repeat: int) -> float:
+    """Returns the best runtime per point in microseconds"""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(points)
+        best = min(best, time.perf_counter() - start)
+    return best / len(points) * 1e6
+
+
+def main():
+    """Runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resolution", type=float, default=1.0, help="mm per cell")
+    parser.add_argument("--count", type=int, default=1000000, help="batch size")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    model = DartboardModel(score_resolution=args.resolution)
+    start = time.perf_counter()
+    raster = model.score_raster
+    print(
+        f"raster {raster.shape[0]}x{raster.shape[1]} built in "
+        f"{(time.perf_counter() - start) * 1000:.1f} ms, "
+        f"{np.mean(raster == model.AMBIGUOUS_ID) * 100:.1f} % ambiguous cells"
+    )
+
+    def analytic(points):
+        for point in points:
+            model.get_score(point)
+
+    rng = np.random.default_rng(0)
+    # the analytic loop is too slow for the large batch, the cost per point
+    # does not depend on the batch size anyway
+    for count in (1, args.count):
+        points = rng.uniform(-180, 180, (count, 2))
+        print(f"{count} points:")
+        print(
+            f"  get_score:  "
+            f"{per_point(analytic, points[:10000], args.repeat):.3f} us per point"
+        )
+        print(
+            f"  get_scores: "
+            f"{per_point(model.get_scores, points, args.repeat):.3f} us per point"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ from .cam import router as cam_router
 from .dartboard import router as dartboard_router
 from .games import router as game_router
 from .test import router as test_router
+from .traces import router as traces_router
 
 router = APIRouter(
     prefix="/api/v1",
@@ -16,6 +17,7 @@ router.include_router(test_router)
 router.include_router(dartboard_router)
 router.include_router(cam_router)
 router.include_router(game_router)
+router.include_router(traces_router)
 
 
 @router.get("/health")
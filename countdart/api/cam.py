@@ -3,12 +3,10 @@ Used to retrieve, create, update and delete dartboards
 """
 
 import asyncio
-import base64
 import io
 import json
 from typing import List, Optional
 
-import numpy as np
 import redis
 from celery.contrib.abortable import AbortableAsyncResult
 from fastapi import (
@@ -21,6 +19,14 @@ from fastapi import (
 )
 from PIL import Image
 
+from countdart.api.live_view import (
+    DEFAULT_QUALITY,
+    ENCODINGS,
+    LiveFrame,
+    Subscriber,
+    ViewKey,
+    live_views,
+)
 from countdart.celery_app import celery_app
 from countdart.database import schemas
 from countdart.database.crud import cam as crud
@@ -35,77 +41,78 @@ from countdart.utils.misc import decode_numpy, remove, update_config_list
 router = APIRouter(prefix="/cams", tags=["Camera"])
 
 
+async def receive_views(
+    websocket: WebSocket, subscriber: Subscriber, view: ViewKey
+) -> None:
+    """Receives the operators of the live view and subscribes to the new view,
+    until the websocket is disconnected.
+    """
+    try:
+        while True:
+            operator = await websocket.receive_text()
+            live_views.subscribe(subscriber, view[:1] + (operator,) + view[2:])
+    except WebSocketDisconnect:
+        subscriber.close()
+
+
 @router.websocket("/ws/{cam_id}/live")
-async def websocket_endpoint(cam_id: schemas.IdString, websocket: WebSocket):
+async def websocket_endpoint(
+    cam_id: schemas.IdString,
+    websocket: WebSocket,
+    quality: int = Query(default=DEFAULT_QUALITY, ge=10, le=100),
+    mode: str = Query(default="json", pattern="^(json|binary)$"),
+    encoding: str = Query(default="jpeg", pattern=f"^({'|'.join(ENCODINGS)})$"),
+):
     """Will return websocket, which sends a live stream of given
     camera (cam_id) as a b64 decoded string.
     At default it sends the output of USBCam. To change the output of the live view
     to another operator send a textmessage with the name of the operator.
-    Currently "USBCam", "HomographyWarper" and "ChangeDetector" are supported.
-    If an image is available it will be send, otherwise it will send
-    the string "undefined"
+    Currently "USBCam", "HomographyWarper", "ChangeDetector" and
+    "RunningAverageDetector" are supported.
+    "ResultVisualizer" shows the camera frame with the overlay of the last
+    detection, which is drawn here and not in the worker.
+    Each frame is encoded once for all websockets with the same view, encoding
+    and quality. A slow client skips frames and only receives the latest one.
+
+    In binary mode, frames are sent as binary messages with a header
+    (live_view.FRAME_HEADER: type, encoding, sequence number and encode time),
+    followed by the image bytes. Results and errors are still sent as json.
 
     Args:
-        cam_id (schemas.IdString): _description_
-        websocket (WebSocket): _description_
+        cam_id (schemas.IdString): id of the cam
+        websocket (WebSocket): websocket
+        quality (int, optional): image quality of the frames. Defaults to 80.
+        mode (str, optional): "json" or "binary". Defaults to "json".
+        encoding (str, optional): "jpeg" or "webp". Defaults to "jpeg".
     """
     await websocket.accept()
-    encoded_array = None
-    old_result = None
     # Get cam model
     try:
         cam_db = crud.get_cam(cam_id)
     except NotFoundError as e:
         raise HTTPException(404) from e
-    operator = cam_db.type
-    r = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+    binary = mode == "binary"
+    view = (cam_id, cam_db.type, cam_db.type, encoding, quality)
+    subscriber = Subscriber()
+    live_views.subscribe(subscriber, view)
+    receiver = asyncio.ensure_future(receive_views(websocket, subscriber, view))
     try:
         while True:
-            # Add this try block to yield back control to fastapi and allow
-            # context switch and serve multiple request concurrently
-            # receive_text is also needed to update state of connection:
-            # https://github.com/tiangolo/fastapi/discussions/9031#discussion-4911299
-            # Important: you need to wait as long as 0.001, otherwise disconnections
-            # will not be received, because the wait time is too short
-            try:
-                operator = await asyncio.wait_for(websocket.receive_text(), 0.001)
-            except asyncio.TimeoutError:
-                pass
-
-            # Get result from redis
-            result = r.get(f"cam_{cam_id}_ResultPublisher")
-            if result and result != "" and result != old_result:
-                old_result = result
-                await websocket.send_text(result.decode())
-
-            # Get Frame from redis
-            encoded = r.get(f"cam_{cam_id}_{operator}")
-            # check if value changed, otherwise no update needs to be send
-            if encoded_array == encoded:
-                continue
-            else:
-                encoded_array = encoded
-            # decode numpy array to base64 string
-            try:
-                frame = decode_numpy(encoded_array)
-            except TypeError:
-                await websocket.send_text(
-                    json.dumps({"type": "error", "content": "could not encode image"})
-                )
-                continue
-            # squeeze array for 2d images
-            frame = np.squeeze(frame)
-            img = Image.fromarray(frame)
-            with io.BytesIO() as buf:
-                img.save(buf, format="JPEG")
-                im_bytes = buf.getvalue()
-                base64_str = base64.b64encode(im_bytes).decode("utf-8")
-            # send with websocket
-            await websocket.send_text(
-                json.dumps({"type": "image", "content": base64_str})
-            )
+            messages = await subscriber.next()
+            if subscriber.closed:
+                return
+            for message in messages:
+                if not isinstance(message, LiveFrame):
+                    await websocket.send_text(message)
+                elif binary:
+                    await websocket.send_bytes(message.binary())
+                else:
+                    await websocket.send_text(message.text())
     except WebSocketDisconnect:
         pass
+    finally:
+        receiver.cancel()
+        live_views.unsubscribe(subscriber)
 
 
 @router.get("/find")
@@ -3,20 +3,19 @@ Used to retrieve, create, update and delete dartboards
 """
 
 import json
-from typing import List
+from typing import Dict, List
 
 import redis
-from celery.contrib.abortable import AbortableAsyncResult
 from fastapi import APIRouter, HTTPException, Query
 
 from countdart.api.cam import start_cam, stop_cam
-from countdart.celery_app import celery_app
 from countdart.database import schemas
 from countdart.database.crud import cam as cam_crud
+from countdart.database.crud import dart_throw as dart_throw_crud
 from countdart.database.crud import dartboard as crud
 from countdart.database.db import NameAlreadyTakenError, NotFoundError
 from countdart.procedures.base import PROCEDURES
-from countdart.procedures.collector import MainCollector
+from countdart.services.collector import get_stats, send_control_message
 from countdart.settings import settings
 from countdart.utils.misc import update_config_dict
 
@@ -137,32 +136,20 @@ def start_dartboard(
         dartboard = crud.get_dartboard(dartboard_id)
     except NotFoundError as e:
         raise HTTPException(404) from e
-    # check if dartboard is not active
-    if dartboard.active:
-        r = celery_app.AsyncResult(dartboard.active_task)
-        if r.status == "PENDING":
-            return dartboard
-        elif r.status == "FAILURE":
-            dartboard = crud.update_dartboard(
-                dartboard_id, schemas.DartboardPatch(active=False, active_task=None)
-            )
-            raise HTTPException(
-                500, "Active task failed. Set dartboard to inactive. Retry again"
-            )
-        else:
-            dartboard = crud.update_dartboard(
-                dartboard_id, schemas.DartboardPatch(active=False, active_task=None)
-            )
     # start cams
     for cam_id in dartboard.cams:
         # start cams
         start_cam(cam_id)
 
-    # start main task
-    r = MainCollector().delay(dartboard.model_dump())
+    # activate before telling the collector, the control message also wakes
+    # up game websockets, which check for the active dartboard
     updated_dartboard = crud.update_dartboard(
-        dartboard_id, schemas.DartboardPatch(active=True, active_task=r.id)
+        dartboard_id, schemas.DartboardPatch(active=True, active_task=None)
     )
+    # add dartboard to collector service. Adding an active dartboard again
+    # does no harm, e.g. if the cams changed
+    r = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+    send_control_message(r, "add", updated_dartboard)
     return updated_dartboard
 
 
@@ -170,7 +157,7 @@ def start_dartboard(
 def stop_dartboard(
     dartboard_id: schemas.IdString,
 ) -> schemas.Dartboard:
-    """Will stop the main task and all cameras at the moment
+    """Will stop all cameras and remove the dartboard from the collector service
 
     Returns:
         schemas.TaskOut: Information about the started Task
@@ -184,11 +171,65 @@ def stop_dartboard(
         # stop cams
         for cam_id in dartboard.cams:
             stop_cam(cam_id)
-        # stop task
-        res = AbortableAsyncResult(dartboard.active_task, app=celery_app)
-        res.abort()
         dartboard = crud.update_dartboard(
             dartboard_id, schemas.DartboardPatch(active=False, active_task=None)
         )
+        # remove from collector service
+        r = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+        send_control_message(r, "remove", dartboard)
 
     return dartboard
+
+
+@router.get("/{dartboard_id}/collector_stats")
+def get_collector_stats(
+    dartboard_id: schemas.IdString,
+) -> Dict[str, float]:
+    """Returns latency statistics of the collector service for a dartboard.
+    The latency is the time between the first result of a cam and the
+    fused result.
+
+    Returns:
+        Dict[str, float]: count, last_ms, mean_ms and max_ms
+    """
+    r = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+    stats = get_stats(r, dartboard_id)
+    if stats is None:
+        raise HTTPException(404, "No statistics available")
+    return stats
+
+
+@router.get("/{dartboard_id}/stats")
+def get_throw_stats(dartboard_id: schemas.IdString) -> schemas.DartThrowStats:
+    """Returns statistics of all saved throws of a dartboard.
+    The statistics are updated with every saved throw, so they are
+    not computed from all throws on each request.
+
+    Returns:
+        schemas.DartThrowStats: number of throws, average score and hits
+            per segment
+    """
+    return dart_throw_crud.get_stats(dartboard_id)
+
+
+@router.get("/{dartboard_id}/heatmap")
+def get_throw_heatmap(dartboard_id: schemas.IdString) -> schemas.DartThrowHeatmap:
+    """Returns the heatmap of all saved throws of a dartboard in
+    dartboard coordinates.
+
+    Returns:
+        schemas.DartThrowHeatmap: hits per cell
+    """
+    return dart_throw_crud.get_heatmap(dartboard_id)
+
+
+@router.post("/{dartboard_id}/stats/rebuild")
+def rebuild_throw_stats(dartboard_id: schemas.IdString) -> schemas.DartThrowStats:
+    """Computes the statistics of a dartboard again from all saved throws,
+    e.g. for throws which were saved before the statistics existed.
+
+    Returns:
+        schemas.DartThrowStats: rebuilt statistics
+    """
+    dart_throw_crud.rebuild_stats(dartboard_id)
+    return dart_throw_crud.get_stats(dartboard_id)
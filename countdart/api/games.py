@@ -5,32 +5,197 @@ It automatically loads the current active dartboard and camera.
 
 import asyncio
 import json
+from typing import Any, Awaitable, Dict, List, Optional
 
 import redis
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+import redis.asyncio as aioredis
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
 
+from countdart.database import schemas
 from countdart.database.crud import dartboard as crud_dartboard
+from countdart.procedures.collector import RESULT_STREAM_MAXLEN, result_stream_key
+from countdart.services.collector import CONTROL_STREAM
 from countdart.settings import settings
+from countdart.utils.tracing import record_trace, stamp
 
 router = APIRouter(prefix="/game", tags=["Games"])
 
+# ids of redis stream entries, the sequence number is optional
+RESULT_ID_PATTERN = r"^\d+(-\d+)?$"
+# Maximum wait for a control message before the active dartboards are checked
+# again, e.g. if a dartboard was activated without starting it
+CONTROL_RECHECK_MS = 2000
+
+
+def to_result_entry(entry_id: bytes, fields: Dict[bytes, bytes]) -> schemas.ResultEntry:
+    """Converts an entry of the result stream to a result entry"""
+    return schemas.ResultEntry(
+        id=entry_id.decode(),
+        result=schemas.ResultMessage.model_validate_json(fields[b"data"]),
+    )
+
+
+async def send_result(
+    websocket: WebSocket, entry: schemas.ResultEntry, r: aioredis.Redis
+) -> None:
+    """Sends result with its id over the websocket and records its trace"""
+    message = entry.result.model_dump(mode="json", exclude={"trace"})
+    message["id"] = entry.id
+    await websocket.send_text(json.dumps(message))
+    if entry.result.trace:
+        pipe = r.pipeline(transaction=False)
+        record_trace(pipe, stamp(entry.result.trace, "send"))
+        await pipe.execute()
+
+
+async def receive_until_disconnect(websocket: WebSocket) -> None:
+    """Receives messages until the websocket is disconnected"""
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+
+async def unless_disconnected(awaitable: Awaitable, receiver: asyncio.Future) -> Any:
+    """Waits for the awaitable, but stops waiting if the websocket is
+    disconnected before.
+
+    Args:
+        awaitable (Awaitable): e.g. a blocking read from redis
+        receiver (asyncio.Future): task of receive_until_disconnect
+
+    Raises:
+        WebSocketDisconnect: if the websocket was disconnected
+
+    Returns:
+        Any: result of the awaitable
+    """
+    task = asyncio.ensure_future(awaitable)
+    await asyncio.wait({task, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    if not task.done():
+        task.cancel()
+        raise WebSocketDisconnect()
+    return task.result()
+
+
+def read_results(
+    r: redis.Redis, dartboard_id: str, after: Optional[str] = None, count: int = 100
+) -> List[schemas.ResultEntry]:
+    """Reads fused results of a dartboard from its result stream.
+
+    Args:
+        r (redis.Redis): redis connection
+        dartboard_id (str): id of the dartboard
+        after (Optional[str], optional): only return results after this
+            stream id. Defaults to None, which returns the oldest results.
+        count (int, optional): maximum number of results. Defaults to 100.
+
+    Returns:
+        List[schemas.ResultEntry]: results in order of publishing
+    """
+    start = f"({after}" if after else "-"
+    entries = r.xrange(result_stream_key(dartboard_id), min=start, count=count)
+    return [to_result_entry(entry_id, fields) for entry_id, fields in entries]
+
+
+@router.get("/results")
+def get_results(
+    dartboard_id: schemas.IdString = Query(None),
+    after: Optional[str] = Query(None, pattern=RESULT_ID_PATTERN),
+    count: int = Query(100, ge=1, le=RESULT_STREAM_MAXLEN),
+) -> List[schemas.ResultEntry]:
+    """Returns the fused results of a dartboard, e.g. to catch up after a
+    reconnect. Only the last results are kept.
+
+    Args:
+        dartboard_id (schemas.IdString, optional): id of the dartboard.
+            Defaults to the active dartboard.
+        after (str, optional): only return results after this result id.
+            Defaults to the oldest kept result.
+        count (int, optional): maximum number of results. Defaults to 100.
+
+    Returns:
+        List[schemas.ResultEntry]: results with their ids
+    """
+    if dartboard_id is None:
+        dartboards = crud_dartboard.get_dartboards(active=True)
+        if len(dartboards) != 1:
+            raise HTTPException(404, "No single active dartboard found")
+        dartboard_id = dartboards[0].id
+    r = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+    return read_results(r, dartboard_id, after, count)
+
 
 @router.websocket("/ws")
-async def game_context_endpoint(websocket: WebSocket):
+async def game_context_endpoint(
+    websocket: WebSocket, after: Optional[str] = Query(None, pattern=RESULT_ID_PATTERN)
+):
     """Will return websocket, which sends information about the current active dartboard
-    and its detections
+    and its detections. Each result contains the id of the result, so a client
+    can resume with the 'after' parameter and does not miss results.
 
     Args:
         websocket (WebSocket): _description_
+        after (Optional[str], optional): send all results after this result id.
+            Defaults to None, which starts with the latest result.
     """
     await websocket.accept()
-    r = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+    r = aioredis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+    # receive messages in the background, only to notice disconnects
+    receiver = asyncio.ensure_future(receive_until_disconnect(websocket))
+    try:
+        dartboard_id = await wait_for_active_dartboard(websocket, r, receiver)
+        stream = result_stream_key(dartboard_id)
+        last_id = after
+        if last_id is None:
+            # start with the latest result
+            last_id = "0-0"
+            for entry_id, fields in await r.xrevrange(stream, count=1):
+                entry = to_result_entry(entry_id, fields)
+                last_id = entry.id
+                await send_result(websocket, entry, r)
+
+        while True:
+            # Block until new results are published
+            response = await unless_disconnected(
+                r.xread({stream: last_id}, block=0), receiver
+            )
+            for _, entries in response:
+                for entry_id, fields in entries:
+                    entry = to_result_entry(entry_id, fields)
+                    last_id = entry.id
+                    await send_result(websocket, entry, r)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        await r.aclose()
+
 
+async def wait_for_active_dartboard(
+    websocket: WebSocket, r: aioredis.Redis, receiver: asyncio.Future
+) -> str:
+    """Waits until exactly one dartboard is active and sends errors meanwhile.
+    Dartboards are checked again, when the collector is told to add or remove
+    a dartboard, at the latest after CONTROL_RECHECK_MS.
+
+    Returns:
+        str: id of the active dartboard
+    """
+    loop = asyncio.get_event_loop()
     old_msg = ""
-    # Get active dartboard
-    dartboard = crud_dartboard.get_dartboards(active=True)
-    while len(dartboard) != 1:
-        if len(dartboard) > 1:
+    while True:
+        # remember the position in the control stream before checking the
+        # database, so no start of a dartboard is missed
+        last = await r.xrevrange(CONTROL_STREAM, count=1)
+        control_id = last[0][0] if last else "0-0"
+        dartboards = await loop.run_in_executor(
+            None, lambda: crud_dartboard.get_dartboards(active=True)
+        )
+        if len(dartboards) == 1:
+            return dartboards[0].id
+        if len(dartboards) > 1:
             message = json.dumps(
                 {"type": "error", "content": "Multiple active dartboards found"}
             )
@@ -41,31 +206,7 @@ async def game_context_endpoint(websocket: WebSocket):
         if message != old_msg:
             await websocket.send_text(message)
             old_msg = message
-        await asyncio.sleep(2)
-        dartboard = crud_dartboard.get_dartboards(active=True)
-
-    result_key = f"dartboard_{dartboard[0].id}_result"
-
-    try:
-        while True:
-            # Add this try block to yield back control to fastapi and allow
-            # context switch and serve multiple request concurrently
-            # receive_text is also needed to update state of connection:
-            # https://github.com/tiangolo/fastapi/discussions/9031#discussion-4911299
-            # Important: you need to wait as long as 0.001, otherwise disconnections
-            # will not be received, because the wait time is too short
-            try:
-                _ = await asyncio.wait_for(websocket.receive_text(), 0.001)
-            except asyncio.TimeoutError:
-                pass
-
-            # Get cls from redis
-            msg = r.get(result_key)
-            if msg and msg != old_msg:
-                old_msg = msg
-                await websocket.send_text(msg.decode())
-                continue
-            await asyncio.sleep(0.1)
-
-    except WebSocketDisconnect:
-        pass
+        await unless_disconnected(
+            r.xread({CONTROL_STREAM: control_id}, block=CONTROL_RECHECK_MS),
+            receiver,
+        )
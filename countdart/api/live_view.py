@@ -0,0 +1,376 @@
+"""Live views of the cams, which are sent over websockets.
+
+Each view of a cam (the operator which is shown) is encoded once per frame by
+a FrameBroadcaster and the same message is sent to all viewers with the same
+view, encoding and quality. A broadcaster is started with its first subscriber
+and stopped when its last subscriber leaves.
+
+Frames are sent either as json text messages with the base64 encoded image
+(default) or as binary messages with a fixed header (see FRAME_HEADER),
+followed by the raw image bytes. Results and errors are always sent as json.
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import struct
+import time
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+import cv2
+import numpy as np
+import redis.asyncio as aioredis
+
+from countdart.database import schemas
+from countdart.settings import settings
+from countdart.utils.misc import decode_numpy, notification_channel
+from countdart.utils.result_codec import decode_result
+from countdart.utils.visualization import draw_overlay
+
+__all__ = [
+    "DEFAULT_QUALITY",
+    "ENCODINGS",
+    "FRAME_HEADER",
+    "LiveFrame",
+    "LiveViews",
+    "Subscriber",
+    "ViewKey",
+    "encode_frame",
+    "live_views",
+]
+
+# Live views register as consumer of an operator in redis.
+# The registration expires, if it is not refreshed
+CONSUMER_HEARTBEAT_SEC = 1
+CONSUMER_EXPIRE_SEC = 5
+# This view draws the overlay of the ResultVisualizer onto the camera frame
+OVERLAY_VIEW = "ResultVisualizer"
+DEFAULT_QUALITY = 80
+
+# Header of binary frame messages (big endian): message type, image encoding,
+# sequence number of the frame and the time in seconds at which the API
+# encoded the frame. This is not the capture time of the cam, the frames in
+# redis carry no timestamp
+FRAME_HEADER = struct.Struct(">BBId")
+MESSAGE_TYPE_IMAGE = 1
+# image encodings with their id in the header, file extension and
+# quality parameter of opencv
+ENCODINGS = {
+    "jpeg": (1, ".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (2, ".webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+# cam id, operator, cam type, image encoding and quality
+ViewKey = Tuple[str, str, str, str, int]
+
+
+def encode_frame(
+    encoded: bytes,
+    overlay: Optional[bytes] = None,
+    quality: int = DEFAULT_QUALITY,
+    encoding: str = "jpeg",
+) -> bytes:
+    """Decodes a frame from redis, draws the overlay if given and
+    encodes the frame as image.
+
+    Args:
+        encoded (bytes): frame encoded with encode_numpy
+        overlay (Optional[bytes], optional): json of an OverlayMessage to draw.
+            Defaults to None.
+        quality (int, optional): image quality. Defaults to 80.
+        encoding (str, optional): image encoding, one of ENCODINGS.
+            Defaults to "jpeg".
+
+    Returns:
+        bytes: encoded image
+    """
+    frame = decode_numpy(encoded)
+    if overlay:
+        # decoded frame is read only
+        message = schemas.OverlayMessage.model_validate_json(overlay)
+        frame = draw_overlay(frame.copy(), message)
+    # squeeze array for 2d images
+    frame = np.squeeze(frame)
+    if frame.ndim == 3:
+        # frames are RGB, opencv expects BGR
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+    _, extension, quality_param = ENCODINGS[encoding]
+    _, image = cv2.imencode(extension, frame, [quality_param, quality])
+    return image.tobytes()
+
+
+def view_channels(cam_id: str, operator: str, cam_type: str) -> Set[bytes]:
+    """Returns the notification channels of the keys shown by a live view.
+
+    Args:
+        cam_id (str): id of the cam
+        operator (str): operator of the live view
+        cam_type (str): operator of the camera, e.g. USBCam
+
+    Returns:
+        Set[bytes]: notification channels
+    """
+    operators = [cam_type, OVERLAY_VIEW] if operator == OVERLAY_VIEW else [operator]
+    return {notification_channel(f"cam_{cam_id}_{x}").encode() for x in operators}
+
+
+async def read_view(
+    r: aioredis.Redis, cam_id: str, operator: str, cam_type: str
+) -> Tuple[Optional[bytes], Optional[bytes]]:
+    """Reads the encoded frame of the given operator from redis.
+    For the overlay view, the camera frame and the overlay are read.
+
+    Args:
+        r (aioredis.Redis): async redis connection
+        cam_id (str): id of the cam
+        operator (str): operator of the live view
+        cam_type (str): operator of the camera, e.g. USBCam
+
+    Returns:
+        Tuple[Optional[bytes], Optional[bytes]]: encoded frame and overlay
+    """
+    if operator != OVERLAY_VIEW:
+        return await r.get(f"cam_{cam_id}_{operator}"), None
+    encoded, overlay = await r.mget(
+        f"cam_{cam_id}_{cam_type}", f"cam_{cam_id}_{OVERLAY_VIEW}"
+    )
+    return encoded, overlay
+
+
+class LiveFrame:
+    """Encoded frame of a live view. The messages of both modes are built
+    on first use and shared by all subscribers.
+
+    Args:
+        image (bytes): encoded image
+        encoding (str): image encoding, one of ENCODINGS
+        seq (int): sequence number of the frame in the live view
+        timestamp (float): time at which the frame was encoded
+    """
+
+    def __init__(self, image: bytes, encoding: str, seq: int, timestamp: float):
+        self.image = image
+        self.encoding = encoding
+        self.seq = seq
+        self.timestamp = timestamp
+        self._text: Optional[str] = None
+        self._binary: Optional[bytes] = None
+
+    def text(self) -> str:
+        """Returns json message with the base64 encoded image"""
+        if self._text is None:
+            content = base64.b64encode(self.image).decode("utf-8")
+            self._text = json.dumps({"type": "image", "content": content})
+        return self._text
+
+    def binary(self) -> bytes:
+        """Returns binary message with header and image bytes"""
+        if self._binary is None:
+            header = FRAME_HEADER.pack(
+                MESSAGE_TYPE_IMAGE,
+                ENCODINGS[self.encoding][0],
+                self.seq & 0xFFFFFFFF,
+                self.timestamp,
+            )
+            self._binary = header + self.image
+        return self._binary
+
+
+class Subscriber:
+    """Messages for a single viewer. Results are queued, of the frames only
+    the latest one is kept, so a slow viewer skips frames."""
+
+    def __init__(self):
+        self.view: Optional[ViewKey] = None
+        self.closed = False
+        self._frame: Union[LiveFrame, str, None] = None
+        self._messages = deque()
+        self._event = asyncio.Event()
+
+    def push_frame(self, message: Union[LiveFrame, str]) -> None:
+        """Replaces the pending frame"""
+        self._frame = message
+        self._event.set()
+
+    def push(self, message: str) -> None:
+        """Queues a message"""
+        self._messages.append(message)
+        self._event.set()
+
+    def close(self) -> None:
+        """Wakes up the viewer to stop"""
+        self.closed = True
+        self._event.set()
+
+    async def next(self) -> List[Union[LiveFrame, str]]:
+        """Waits for new messages and returns all of them. Frames which could
+        not be encoded are json error messages."""
+        await self._event.wait()
+        self._event.clear()
+        messages = list(self._messages)
+        self._messages.clear()
+        if self._frame is not None:
+            messages.append(self._frame)
+            self._frame = None
+        return messages
+
+
+class FrameBroadcaster:
+    """Reads the frames of a view and the results of the cam on each change,
+    encodes them once and pushes them to all subscribers.
+
+    Args:
+        view (ViewKey): cam id, operator, cam type, image encoding and quality
+    """
+
+    def __init__(self, view: ViewKey):
+        self.view = view
+        self.subscribers: Set[Subscriber] = set()
+        # latest messages, sent to new subscribers
+        self.frame: Union[LiveFrame, str, None] = None
+        self.result: Optional[str] = None
+        self._seq = 0
+        self._task = asyncio.ensure_future(self._run())
+
+    def add(self, subscriber: Subscriber) -> None:
+        """Adds subscriber and sends the latest result and frame"""
+        self.subscribers.add(subscriber)
+        if self.result is not None:
+            subscriber.push(self.result)
+        if self.frame is not None:
+            subscriber.push_frame(self.frame)
+
+    @property
+    def running(self) -> bool:
+        """False, if the broadcaster was stopped or failed"""
+        return not self._task.done()
+
+    def stop(self) -> None:
+        """Stops reading and encoding frames"""
+        self._task.cancel()
+
+    async def _broadcast_result(self, r: aioredis.Redis) -> None:
+        """Reads the result of the cam and pushes it to all subscribers"""
+        cam_id = self.view[0]
+        result = await r.get(f"cam_{cam_id}_ResultPublisher")
+        if result:
+            self.result = decode_result(result).model_dump_json()
+            for subscriber in self.subscribers:
+                subscriber.push(self.result)
+
+    async def _broadcast_frame(self, r: aioredis.Redis, last: Tuple) -> Tuple:
+        """Reads and encodes the frame, if it changed since the last one and
+        pushes it to all subscribers. Returns the read frame and overlay."""
+        cam_id, operator, cam_type, encoding, quality = self.view
+        encoded, overlay = await read_view(r, cam_id, operator, cam_type)
+        if (encoded, overlay) == last:
+            return last
+        try:
+            # encode in a thread, so other websockets are not blocked
+            loop = asyncio.get_event_loop()
+            image = await loop.run_in_executor(
+                None, encode_frame, encoded, overlay, quality, encoding
+            )
+            self._seq += 1
+            self.frame = LiveFrame(image, encoding, self._seq, time.time())
+        except TypeError:
+            self.frame = json.dumps(
+                {"type": "error", "content": "could not encode image"}
+            )
+        for subscriber in self.subscribers:
+            subscriber.push_frame(self.frame)
+        return encoded, overlay
+
+    async def _run(self) -> None:
+        """Waits for notifications of the view and the result until stopped"""
+        cam_id, operator, cam_type, _, _ = self.view
+        result_channel = notification_channel(f"cam_{cam_id}_ResultPublisher")
+        channels = view_channels(cam_id, operator, cam_type)
+        r = aioredis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+        pubsub = r.pubsub()
+        await pubsub.subscribe(result_channel, *channels)
+        # send the current frame and result on start
+        changed = channels | {result_channel.encode()}
+        last = (None, None)
+        last_heartbeat = 0
+        try:
+            while True:
+                # Register as consumer of the operator, so lazy operators
+                # (e.g. HomographyWarper) produce their result
+                if time.time() - last_heartbeat > CONSUMER_HEARTBEAT_SEC:
+                    await r.set(
+                        f"cam_{cam_id}_{operator}_consumers",
+                        1,
+                        ex=CONSUMER_EXPIRE_SEC,
+                    )
+                    last_heartbeat = time.time()
+                if result_channel.encode() in changed:
+                    await self._broadcast_result(r)
+                if changed & channels:
+                    last = await self._broadcast_frame(r, last)
+                # wait for the next change and collect all other queued changes
+                changed = set()
+                timeout = CONSUMER_HEARTBEAT_SEC
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=timeout
+                    )
+                    if message is None:
+                        break
+                    changed.add(message["channel"])
+                    timeout = 0
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # stop the websockets of this view, instead of leaving them waiting
+            logging.exception(f"Live view {self.view} failed")
+            for subscriber in self.subscribers:
+                subscriber.close()
+        finally:
+            await pubsub.aclose()
+            await r.aclose()
+
+
+class LiveViews:
+    """Registry of all running broadcasters of the API process"""
+
+    def __init__(self):
+        self._broadcasters: Dict[ViewKey, FrameBroadcaster] = {}
+
+    def subscribe(self, subscriber: Subscriber, view: ViewKey) -> None:
+        """Subscribes to a view. The subscriber leaves its previous view.
+
+        Args:
+            subscriber (Subscriber): subscriber of a websocket
+            view (ViewKey): cam id, operator, cam type, image encoding and
+                quality
+        """
+        self.unsubscribe(subscriber)
+        broadcaster = self._broadcasters.get(view)
+        # a failed broadcaster is replaced, its subscribers were closed
+        if broadcaster is None or not broadcaster.running:
+            broadcaster = FrameBroadcaster(view)
+            self._broadcasters[view] = broadcaster
+        subscriber.view = view
+        broadcaster.add(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Removes subscriber from its view and stops the broadcaster of the
+        view, if it was the last subscriber.
+
+        Args:
+            subscriber (Subscriber): subscriber of a websocket
+        """
+        broadcaster = self._broadcasters.get(subscriber.view)
+        subscriber.view = None
+        if broadcaster is None or subscriber not in broadcaster.subscribers:
+            return
+        broadcaster.subscribers.discard(subscriber)
+        if not broadcaster.subscribers:
+            broadcaster.stop()
+            del self._broadcasters[broadcaster.view]
+
+
+live_views = LiveViews()
@@ -0,0 +1,28 @@
+"""REST API endpoint for traces.
+Provides the latency of the hops of a result from capturing the frame
+until sending the result to the game.
+"""
+
+from typing import Dict
+
+import redis
+from fastapi import APIRouter
+
+from countdart.settings import settings
+from countdart.utils.tracing import get_hop_percentiles
+
+router = APIRouter(prefix="/traces", tags=["Traces"])
+
+
+@router.get("/latency")
+def get_latency() -> Dict[str, Dict[str, float]]:
+    """Returns rolling percentiles of the latency of each hop of a result:
+    detect (capture to detection), publish, fuse, send and total
+    (capture to sending to the game).
+
+    Returns:
+        Dict[str, Dict[str, float]]: count, p50, p90 and p99 in milliseconds
+            per hop
+    """
+    r = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+    return get_hop_percentiles(r)
@@ -0,0 +1,338 @@
+"""
+CRUD operations for dart throw model
+"""
+
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pymongo
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+import countdart.database.schemas as schemas
+from countdart.database.db import database
+from countdart.utils.dartboard_model import DartboardModel
+
+collection = database["DartThrows"]
+# Incrementally updated statistics, one document per dartboard. Contains
+# the number of throws, the sum of scores, the hits per segment and the
+# hits per heatmap cell, so they do not need to be computed from all throws
+stats_collection = database["DartThrowStats"]
+# Number of stream ids of the latest throws, which are kept in the statistics
+# document. The increments of a throw are only applied, if its stream id is
+# not in the list, so retrying a batch does not count throws twice
+APPLIED_IDS = 1000
+
+# error code of mongodb for a violated unique index
+DUPLICATE_KEY_ERROR = 11000
+
+# cell size and extent of the heatmap in mm
+HEATMAP_BIN_SIZE = 10
+HEATMAP_RADIUS = 180
+
+_model = DartboardModel()
+SCORE_VALUES: Dict[str, int] = dict(
+    zip(_model.score_labels.tolist(), _model.score_values.tolist())
+)
+
+
+def heatmap_cell(point: Tuple[float, float]) -> Optional[Tuple[int, int]]:
+    """Returns the heatmap cell (column, row) of a point in dartboard coordinates.
+
+    Args:
+        point: point in dartboard coordinates
+
+    Returns:
+        cell of the point or None, if the point is outside of the heatmap
+    """
+    col = int((point[0] + HEATMAP_RADIUS) // HEATMAP_BIN_SIZE)
+    row = int((point[1] + HEATMAP_RADIUS) // HEATMAP_BIN_SIZE)
+    size = 2 * HEATMAP_RADIUS // HEATMAP_BIN_SIZE
+    if 0 <= col < size and 0 <= row < size:
+        return col, row
+    return None
+
+
+def stats_increments(
+    dart_throws: Iterable[schemas.DartThrowCreate],
+) -> Dict[str, Dict[str, int]]:
+    """Sums up the changes of the statistics caused by new throws.
+
+    Args:
+        dart_throws: new throws
+
+    Returns:
+        $inc update of the statistics document per dartboard
+    """
+    increments = defaultdict(Counter)
+    for dart_throw in dart_throws:
+        inc = increments[dart_throw.dartboard_id]
+        inc["count"] += 1
+        inc["score_sum"] += SCORE_VALUES.get(dart_throw.score, 0)
+        inc[f"segments.{dart_throw.score}"] += 1
+        cell = heatmap_cell(dart_throw.point)
+        if cell:
+            inc[f"heatmap.{cell[0]}_{cell[1]}"] += 1
+    return {dartboard_id: dict(inc) for dartboard_id, inc in increments.items()}
+
+
+def create_indexes() -> None:
+    """Creates the indexes of the collection. Throws are queried by dartboard
+    and time, the stream id is unique, so redelivered throws are ignored."""
+    collection.create_index(
+        [("dartboard_id", pymongo.ASCENDING), ("timestamp", pymongo.ASCENDING)]
+    )
+    collection.create_index("stream_id", unique=True)
+
+
+def create_dart_throws(dart_throws: List[schemas.DartThrowCreate]) -> int:
+    """Saves multiple dart throws with a single request and updates the
+    statistics of their dartboards. Throws which are already saved
+    (same stream id) are skipped.
+
+    Each throw is marked, once its statistics are applied. If updating the
+    statistics failed, they are applied when the batch is saved again,
+    although the throws are already saved.
+
+    Args:
+        dart_throws: throws to save
+
+    Returns:
+        number of saved throws
+    """
+    if not dart_throws:
+        return 0
+    documents = [
+        dict(dart_throw.model_dump(), stats_applied=False) for dart_throw in dart_throws
+    ]
+    skipped = 0
+    try:
+        collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error["code"] != DUPLICATE_KEY_ERROR for error in errors):
+            raise
+        skipped = len(errors)
+    stream_ids = [dart_throw.stream_id for dart_throw in dart_throws]
+    pending = {
+        document["stream_id"]
+        for document in collection.find(
+            {"stream_id": {"$in": stream_ids}, "stats_applied": False},
+            {"stream_id": 1},
+        )
+    }
+    update_stats([x for x in dart_throws if x.stream_id in pending])
+    collection.update_many(
+        {"stream_id": {"$in": list(pending)}}, {"$set": {"stats_applied": True}}
+    )
+    return len(dart_throws) - skipped
+
+
+def stats_updates(
+    dart_throws: Iterable[schemas.DartThrowCreate],
+    applied_ids: Dict[str, Set[str]],
+) -> List[UpdateOne]:
+    """Creates the updates of the statistics for new throws. Throws whose
+    stream id is already applied to the statistics are skipped.
+
+    Args:
+        dart_throws: new throws
+        applied_ids: stream ids in the statistics document of each dartboard
+
+    Returns:
+        update per dartboard
+    """
+    new_throws = [
+        x
+        for x in dart_throws
+        if x.stream_id not in applied_ids.get(x.dartboard_id, set())
+    ]
+    updates = []
+    for dartboard_id, inc in stats_increments(new_throws).items():
+        ids = [x.stream_id for x in new_throws if x.dartboard_id == dartboard_id]
+        updates.append(
+            UpdateOne(
+                # the filter fails, if another writer applied the throws
+                # meanwhile. The upsert then raises a duplicate key error
+                {"_id": dartboard_id, "applied_ids": {"$nin": ids}},
+                {
+                    "$inc": inc,
+                    "$push": {"applied_ids": {"$each": ids, "$slice": -APPLIED_IDS}},
+                },
+                upsert=True,
+            )
+        )
+    return updates
+
+
+def update_stats(dart_throws: List[schemas.DartThrowCreate]) -> None:
+    """Adds new throws to the statistics of their dartboards.
+
+    Args:
+        dart_throws: new throws
+    """
+    if not dart_throws:
+        return
+    dartboard_ids = list({x.dartboard_id for x in dart_throws})
+    applied_ids = {
+        document["_id"]: set(document.get("applied_ids", []))
+        for document in stats_collection.find(
+            {"_id": {"$in": dartboard_ids}}, {"applied_ids": 1}
+        )
+    }
+    updates = stats_updates(dart_throws, applied_ids)
+    if updates:
+        stats_collection.bulk_write(updates, ordered=False)
+
+
+def rebuild_stats(dartboard_id: schemas.IdString) -> None:
+    """Computes the statistics of a dartboard from all of its throws with
+    an aggregation pipeline. Only needed for throws, which were saved before
+    the statistics existed or if an update of the statistics failed.
+
+    Throws saved while rebuilding are not part of the aggregation. They are
+    added afterwards like new throws, so they are counted exactly once.
+
+    Args:
+        dartboard_id: id of the dartboard
+    """
+    # only aggregate the throws saved until now
+    match = {"dartboard_id": dartboard_id}
+    latest = collection.find_one(match, {"_id": 1}, sort=[("_id", -1)])
+    newer = {"dartboard_id": dartboard_id}
+    if latest:
+        match["_id"] = {"$lte": latest["_id"]}
+        newer["_id"] = {"$gt": latest["_id"]}
+
+    def cell(axis: int) -> dict:
+        coordinate = {"$arrayElemAt": ["$point", axis]}
+        return {
+            "$floor": {
+                "$divide": [{"$add": [coordinate, HEATMAP_RADIUS]}, HEATMAP_BIN_SIZE]
+            }
+        }
+
+    pipeline = [
+        {"$match": match},
+        {
+            "$facet": {
+                "segments": [{"$group": {"_id": "$score", "count": {"$sum": 1}}}],
+                "heatmap": [
+                    {
+                        "$group": {
+                            "_id": {"col": cell(0), "row": cell(1)},
+                            "count": {"$sum": 1},
+                        }
+                    }
+                ],
+            }
+        },
+    ]
+    facets = next(collection.aggregate(pipeline))
+    segments = {x["_id"]: x["count"] for x in facets["segments"]}
+    size = 2 * HEATMAP_RADIUS // HEATMAP_BIN_SIZE
+    heatmap = {}
+    for x in facets["heatmap"]:
+        col, row = int(x["_id"]["col"]), int(x["_id"]["row"])
+        if 0 <= col < size and 0 <= row < size:
+            heatmap[f"{col}_{row}"] = x["count"]
+    document = {
+        "count": sum(segments.values()),
+        "score_sum": sum(SCORE_VALUES.get(k, 0) * v for k, v in segments.items()),
+        "segments": segments,
+        "heatmap": heatmap,
+        # the latest aggregated throws, so their pending updates are skipped
+        "applied_ids": [
+            x["stream_id"]
+            for x in collection.find(match, {"stream_id": 1})
+            .sort("_id", pymongo.DESCENDING)
+            .limit(APPLIED_IDS)
+        ][::-1],
+    }
+    stats_collection.replace_one({"_id": dartboard_id}, document, upsert=True)
+    collection.update_many(
+        dict(match, stats_applied=False), {"$set": {"stats_applied": True}}
+    )
+    # throws saved meanwhile. Their updates may have been applied to the
+    # replaced document
+    dart_throws = [schemas.DartThrow(**x) for x in collection.find(newer)]
+    update_stats(dart_throws)
+    collection.update_many(
+        {"stream_id": {"$in": [x.stream_id for x in dart_throws]}},
+        {"$set": {"stats_applied": True}},
+    )
+
+
+def get_stats(dartboard_id: schemas.IdString) -> schemas.DartThrowStats:
+    """Retrieve the statistics of the throws of a dartboard.
+
+    Args:
+        dartboard_id: id of the dartboard
+
+    Returns:
+        statistics of the throws
+    """
+    document = stats_collection.find_one(
+        {"_id": dartboard_id}, {"heatmap": 0, "applied_ids": 0}
+    )
+    if not document:
+        return schemas.DartThrowStats(dartboard_id=dartboard_id)
+    count = document.get("count", 0)
+    return schemas.DartThrowStats(
+        dartboard_id=dartboard_id,
+        count=count,
+        average_score=document.get("score_sum", 0) / count if count else 0,
+        segments=document.get("segments", {}),
+    )
+
+
+def get_heatmap(dartboard_id: schemas.IdString) -> schemas.DartThrowHeatmap:
+    """Retrieve the heatmap of the hits of a dartboard.
+
+    Args:
+        dartboard_id: id of the dartboard
+
+    Returns:
+        heatmap of the hits
+    """
+    document = stats_collection.find_one({"_id": dartboard_id}, {"heatmap": 1})
+    size = 2 * HEATMAP_RADIUS // HEATMAP_BIN_SIZE
+    counts = [[0] * size for _ in range(size)]
+    for key, count in (document or {}).get("heatmap", {}).items():
+        col, row = map(int, key.split("_"))
+        counts[row][col] = count
+    return schemas.DartThrowHeatmap(
+        dartboard_id=dartboard_id,
+        bin_size=HEATMAP_BIN_SIZE,
+        radius=HEATMAP_RADIUS,
+        counts=counts,
+    )
+
+
+def get_dart_throws(
+    dartboard_id: schemas.IdString,
+    start: datetime = None,
+    end: datetime = None,
+    limit: int = 0,
+) -> List[schemas.DartThrow]:
+    """Retrieve dart throws of a dartboard, ordered by time.
+
+    Args:
+        dartboard_id: id of the dartboard
+        start: only return throws at or after this time
+        end: only return throws before this time
+        limit: maximum number of throws, 0 means no limit
+
+    Returns:
+        List of dart throws
+    """
+    _filter = {"dartboard_id": dartboard_id}
+    if start or end:
+        _filter["timestamp"] = {}
+        if start:
+            _filter["timestamp"]["$gte"] = start
+        if end:
+            _filter["timestamp"]["$lt"] = end
+    result = collection.find(_filter).sort("timestamp", pymongo.ASCENDING).limit(limit)
+    return [schemas.DartThrow(**r) for r in result]
@@ -38,12 +38,19 @@ from .config import (  # noqa: F401
     IntConfigModel,
     SelectConfigModel,
 )
-from .dart_throw import DartThrow, DartThrowBase  # noqa: F401
+from .dart_throw import DartThrow, DartThrowBase, DartThrowCreate  # noqa: F401
+from .dart_throw_stats import DartThrowHeatmap, DartThrowStats  # noqa: F401
 from .dartboard import (  # noqa: F401
     Dartboard,
     DartboardBase,
     DartboardCreate,
     DartboardPatch,
 )
-from .messages import BaseMessage, ResultMessage  # noqa: F401
+from .messages import (  # noqa: F401
+    BaseMessage,
+    OverlayMessage,
+    ResultEntry,
+    ResultMessage,
+    Trace,
+)
 from .task import TaskOut  # noqa: F401
@@ -49,6 +49,9 @@ class Cam(CamBase):
     model_config = ConfigDict(populate_by_name=True)
     active_task: Union[str, None] = None
     calibration_points: List[CalibrationPoint] = []
+    # optional lens distortion, see opencv camera calibration
+    camera_matrix: Optional[List[List[float]]] = None
+    dist_coeffs: Optional[List[float]] = None
 
 
 class CamCreate(CamBase):
@@ -67,6 +70,8 @@ class CamPatch(BaseModel):
     active_task: Optional[Union[str, None]] = None
     calibration_points: Optional[List[CalibrationPoint]] = None
     cam_config: Optional[List[AllConfigModel]] = None
+    camera_matrix: Optional[List[List[float]]] = None
+    dist_coeffs: Optional[List[float]] = None
 
 
 class CamHardware(BaseModel):
@@ -2,6 +2,7 @@
 Schema for a single dart throw
 """
 
+from datetime import datetime
 from typing import Tuple
 
 from pydantic import ConfigDict, Field
@@ -11,6 +12,7 @@ from .base import BaseModel, PyObjectId
 __all__ = (
     "DartThrow",
     "DartThrowBase",
+    "DartThrowCreate",
 )
 
 
@@ -29,7 +31,23 @@ class DartThrowBase(BaseModel):
     point: Tuple[float, float]
 
 
-class DartThrow(BaseModel):
+class DartThrowCreate(DartThrowBase):
+    """
+    Schema to store a confirmed dart throw of a dartboard
+
+    Attributes:
+        dartboard_id: PyObjectId: The dartboard the dart was thrown at
+        timestamp: datetime: The time the dart was detected
+        stream_id: str: The id of the throw in the redis throw stream. Used to
+            store each throw only once, if it is delivered again.
+    """
+
+    dartboard_id: PyObjectId
+    timestamp: datetime
+    stream_id: str
+
+
+class DartThrow(DartThrowCreate):
     """
     Dart throw schema which is stored in the database as a collection
 
@@ -0,0 +1,50 @@
+"""
+Schemas for statistics of the dart throws of a dartboard
+"""
+
+from typing import Dict, List
+
+from .base import BaseModel, PyObjectId
+
+__all__ = (
+    "DartThrowHeatmap",
+    "DartThrowStats",
+)
+
+
+class DartThrowStats(BaseModel):
+    """
+    Statistics of all stored dart throws of a dartboard
+
+    Attributes:
+        dartboard_id: PyObjectId: The dartboard of the throws
+        count: int: Number of throws
+        average_score: float: Average score of a throw
+        segments: Dict[str, int]: Number of hits per score, e.g. "T 20"
+    """
+
+    dartboard_id: PyObjectId
+    count: int = 0
+    average_score: float = 0
+    segments: Dict[str, int] = {}
+
+
+class DartThrowHeatmap(BaseModel):
+    """
+    2D histogram of the hits of a dartboard in dartboard coordinates (mm).
+    counts[i][j] is the number of hits with
+    x in [-radius + j * bin_size, -radius + (j + 1) * bin_size) and
+    y in [-radius + i * bin_size, -radius + (i + 1) * bin_size).
+    Hits outside the radius are not counted.
+
+    Attributes:
+        dartboard_id: PyObjectId: The dartboard of the throws
+        bin_size: float: Size of a cell in mm
+        radius: float: Half of the width of the heatmap in mm
+        counts: List[List[int]]: Number of hits per cell
+    """
+
+    dartboard_id: PyObjectId
+    bin_size: float
+    radius: float
+    counts: List[List[int]]
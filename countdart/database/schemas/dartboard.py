@@ -36,6 +36,9 @@ class Dartboard(DartboardBase):
     cams: List[PyObjectId] = []
     op_configs: Optional[Dict[str, List[AllConfigModel]]] = None
     active_task: Union[str, None] = None
+    # number of agreeing cams to publish a result without waiting for the
+    # remaining cams. None means the majority of cams
+    quorum: Optional[int] = Field(default=None, ge=1)
 
 
 class DartboardCreate(DartboardBase):
@@ -53,4 +56,5 @@ class DartboardPatch(BaseModel):
     active: Optional[bool] = None
     cams: Optional[List[PyObjectId]] = None
     active_task: Optional[Union[str, None]] = None
+    quorum: Optional[int] = Field(default=None, ge=1)
     op_configs: Optional[Dict[str, List[AllConfigModel]]] = None
@@ -2,7 +2,7 @@
 Schema for message objects. They are either send
 to backend via redis or returned to the frontend.
 """
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 from countdart.database.schemas import DartThrowBase
 
@@ -10,7 +10,10 @@ from .base import BaseModel
 
 __all__ = (
     "BaseMessage",
+    "Trace",
     "ResultMessage",
+    "ResultEntry",
+    "OverlayMessage",
 )
 
 
@@ -27,6 +30,21 @@ class BaseMessage(BaseModel):
     content: str
 
 
+class Trace(BaseModel):
+    """
+    Trace of a result through the system, to measure the latency
+    from capturing a frame until sending the result to the game.
+
+    Attributes:
+        id (str): The id of the trace, i.e. of the captured frame.
+        stamps (Dict[str, float]): Time (unix time) at which the result
+            passed each stage, see countdart.utils.tracing.HOPS.
+    """
+
+    id: str
+    stamps: Dict[str, float] = {}
+
+
 class ResultMessage(BaseMessage):
     """
     Message class for result messages.
@@ -34,8 +52,51 @@ class ResultMessage(BaseMessage):
     Attributes:
         type (str): The type of the message, default is "result".
         content (Optional[DartThrowBase]): The content of the message, default is None.
+        trace (Optional[Trace]): The trace of the result, default is None.
     """
 
     type: str = "result"
     cls: str
     content: Optional[DartThrowBase] = None
+    trace: Optional[Trace] = None
+
+
+class ResultEntry(BaseModel):
+    """
+    Entry of the result stream of a dartboard.
+
+    Attributes:
+        id (str): id of the entry in the stream. Used to resume reading.
+        result (ResultMessage): the fused result.
+    """
+
+    id: str
+    result: ResultMessage
+
+
+class OverlayMessage(BaseModel):
+    """
+    Message class for the visualization of a detection result.
+    The overlay is drawn onto the live view by the API, so the worker
+    does not need to draw and publish a full frame.
+
+    Attributes:
+        type (str): The type of the message, default is "overlay".
+        bbox (Tuple[float, float, float, float]): bounding box (x, y, w, h) in
+            percentages of the frame.
+        label (str): classified label of the bounding box.
+        line (Optional[Tuple[float, float, float, float]]): found line
+            (x1, y1, x2, y2) in percentages of the bounding box.
+        score (str): calculated dart score.
+        confidence (float): confidence of the calculated score.
+        tip (Optional[Tuple[float, float]]): dart tip (x, y) in percentages
+            of the frame.
+    """
+
+    type: str = "overlay"
+    bbox: Tuple[float, float, float, float]
+    label: str
+    line: Optional[Tuple[float, float, float, float]] = None
+    score: str
+    confidence: float
+    tip: Optional[Tuple[float, float]] = None
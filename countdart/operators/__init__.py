@@ -8,7 +8,9 @@ from .img.dart_segmentor import DartSegmentor  # noqa: F401
 from .img.homography_warper import HomographyWarper  # noqa: F401
 from .img.hough_line_detector import HoughLineDetector  # noqa: F401
 from .img.motion_detector import MotionDetector  # noqa: F401
+from .img.principal_axis_detector import PrincipalAxisDetector  # noqa: F401
 from .img.result_visualizer import ResultVisualizer  # noqa: F401
+from .img.running_average_detector import RunningAverageDetector  # noqa: F401
 from .io import FrameGrabber, USBCam, VideoReader, VideoWriter  # noqa: F401
 from .operator import BaseOperator  # noqa: F401
 from .result_publisher import ResultPublisher  # noqa: F401
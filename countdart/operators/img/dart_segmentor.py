@@ -1,11 +1,14 @@
 """Dart Segmentor Operator"""
 
+from typing import Optional
+
 import cv2
 import logfire
 import numpy as np
 
 from countdart.database.schemas.config import FloatConfigModel, IntConfigModel
 from countdart.operators.operator import OPERATORS, BaseOperator
+from countdart.utils.misc import BBox
 
 __all__ = "DartSegmentor"
 
@@ -42,48 +45,110 @@ class DartSegmentor(BaseOperator):
         min_value=0,
     )
 
+    roi_padding = IntConfigModel(
+        name="roi_padding",
+        default_value=50,
+        description="Padding in pixel around the motion region, which is segmented.",
+        max_value=500,
+        min_value=0,
+    )
+
     def __init__(self, **kwargs):
         self._last_image = None
+        self._source_shape = None
+        self._crop_px = None
+        # region of the last segmented mask in percentages of the input image
+        self.crop = BBox(0, 0, 1, 1)
         super().__init__(**kwargs)
 
-    def call(self, image: np.array, **kwargs) -> np.array:
+    def _segment(self, last_image: np.array, image: np.array) -> np.array:
+        """Segments changes between two images of same shape with
+        hysteresis thresholding"""
+        # calculate diff
+        with logfire.span("diff"):
+            diff = cv2.absdiff(last_image, image)
+        # to grayscale
+        with logfire.span("grayscale"):
+            diff = cv2.cvtColor(diff, cv2.COLOR_RGB2GRAY)
+        # Gaussian blur
+        blur = cv2.GaussianBlur(diff, (5, 5), 0)
+        # Threshold
+        with logfire.span("threshold"):
+            high_mask = blur >= self.high_thresh.value
+            low_mask = (blur >= self.low_thresh.value) & (blur < self.high_thresh.value)
+            num_labels, labels = cv2.connectedComponents(high_mask.astype(np.uint8))
+            thresh = np.zeros_like(blur, dtype=np.uint8)
+            for label in range(1, num_labels + 1):
+                component_mask = labels == label
+                if np.any(component_mask & high_mask):
+                    thresh[component_mask | low_mask] = 255
+        return np.array(thresh, dtype=np.uint8)
+
+    def _crop(self, image: np.array, roi: BBox) -> Optional[np.array]:
+        """Pads the region of interest, crops the image to it and resizes the crop.
+        Only the crop is resized, so the cost depends on the size of the region.
+        The padded region is saved in 'self.crop'.
+        Returns None, if the region is empty.
+        """
+        img_h, img_w = image.shape[:2]
+        last_h, last_w = self._last_image.shape[:2]
+        padding = self.roi_padding.value
+        crop = roi.pad(padding / img_w, padding / img_h)
+        # snap the crop to the pixel grid of the resized image
+        rx, ry, rw, rh = crop.to_pixel(last_h, last_w)
+        if rw == 0 or rh == 0:
+            return None
+        self._crop_px = (rx, ry, rw, rh)
+        self.crop = BBox.from_pixel(self._crop_px, last_h, last_w)
+        x, y, w, h = self.crop.to_pixel(img_h, img_w)
+        return cv2.resize(image[y : y + h, x : x + w], (rw, rh))
+
+    def call(self, image: np.array, roi: Optional[BBox] = None, **kwargs) -> np.array:
         """Add new frame to change detector and return trigger signal.
         Resizes the image.
+
+        If a region of interest is given, e.g. the bounding box of the motion,
+        only this region (with additional roi_padding) is segmented. The returned
+        mask then only covers this region, which is saved in 'self.crop' in
+        percentages of the given image.
+
+        Args:
+            image (np.array): input image
+            roi (Optional[BBox], optional): region of interest in percentages
+                of the image. Defaults to None.
+
+        Returns:
+            np.array: segmented mask of the image or the region of interest
         """
+        self.crop = BBox(0, 0, 1, 1)
+        # the image shape changes, if the region of interest changed.
+        # Start again with the new image in this case
+        if self._last_image is None or self._source_shape != image.shape:
+            self.reset(image)
+            return np.zeros(self._last_image.shape[:2], dtype=np.uint8)
+        cropped = None
+        if roi is not None and roi.w > 0 and roi.h > 0:
+            with logfire.span("crop"):
+                cropped = self._crop(image, roi)
+        if cropped is not None:
+            image = cropped
+            x, y, w, h = self._crop_px
+            last_image = self._last_image[y : y + h, x : x + w]
+            mask = self._segment(last_image, image)
+            with logfire.span("copy image"):
+                last_image[:] = image
+            return mask
         # resize image with scaling factor
         with logfire.span("resize"):
             image = cv2.resize(image, None, fx=self.resize.value, fy=self.resize.value)
-
-        if self._last_image is not None:
-            # calculate diff
-            with logfire.span("diff"):
-                diff = cv2.absdiff(self._last_image, image)
-            # to grayscale
-            with logfire.span("grayscale"):
-                diff = cv2.cvtColor(diff, cv2.COLOR_RGB2GRAY)
-            # Gaussian blur
-            blur = cv2.GaussianBlur(diff, (5, 5), 0)
-            # Threshold
-            with logfire.span("threshold"):
-                high_mask = blur >= self.high_thresh.value
-                low_mask = (blur >= self.low_thresh.value) & (
-                    blur < self.high_thresh.value
-                )
-                num_labels, labels = cv2.connectedComponents(high_mask.astype(np.uint8))
-                thresh = np.zeros_like(blur, dtype=np.uint8)
-                for label in range(1, num_labels + 1):
-                    component_mask = labels == label
-                    if np.any(component_mask & high_mask):
-                        thresh[component_mask | low_mask] = 255
-            with logfire.span("copy image"):
-                self._last_image = image
-            return np.array(thresh, dtype=np.uint8)
-        else:
+        mask = self._segment(self._last_image, image)
+        with logfire.span("copy image"):
             self._last_image = image
-            return np.zeros((image.shape[0], image.shape[1]), dtype=np.uint8)
+        return mask
 
     def reset(self, image: np.array) -> bool:
         """Reset the operator to initial state"""
+        self._source_shape = image.shape
         image = cv2.resize(image, None, fx=self.resize.value, fy=self.resize.value)
         self._last_image = image
         return True
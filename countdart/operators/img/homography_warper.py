@@ -2,15 +2,21 @@
 which help to warp the source image into the dartboard world
 coordinates.
 """
-from typing import List, Tuple
+from typing import Any, Callable, List, Optional, Tuple
 
 import cv2
 import numpy as np
 
 from countdart.database.schemas import CalibrationPoint
-from countdart.database.schemas.config import BooleanConfigModel, IntConfigModel
+from countdart.database.schemas.config import (
+    AllConfigModel,
+    BooleanConfigModel,
+    IntConfigModel,
+)
 from countdart.operators.operator import OPERATORS, BaseOperator
 from countdart.utils.dartboard_model import DartboardModel
+from countdart.utils.misc import BBox
+from countdart.utils.warp_cache import WarpCache
 
 __all__ = "HomographyWarper"
 
@@ -36,29 +42,120 @@ class HomographyWarper(BaseOperator):
         "This will slow down startup time, but may speed up fps.",
     )
 
+    roi_margin = IntConfigModel(
+        name="roi_margin",
+        default_value=30,
+        description="Margin in mm around the dartboard, which defines the region "
+        "of interest. Everything outside this region is cropped before processing.",
+        max_value=200,
+        min_value=0,
+    )
+
+    # score id of image pixels outside of the score raster
+    OUTSIDE_ID = 254
+    # scores of pixels within this distance in pixel to a wire are calculated
+    # analytically, so diagonal neighbours of a wire are included
+    WIRE_BAND = 1.5
+    # version of the cached maps, increased when they are calculated differently
+    CACHE_VERSION = 2
+
     def __init__(
         self,
         calib_points: List[CalibrationPoint],
         img_shape: np.ndarray,
         dartboard_model: DartboardModel = None,
+        camera_matrix: Optional[List[List[float]]] = None,
+        dist_coeffs: Optional[List[float]] = None,
         **kwargs,
     ) -> None:
-        super().__init__(**kwargs)
         self._dartboard_model = dartboard_model
         if self._dartboard_model is None:
             self._dartboard_model = DartboardModel()
         self._img_shape = img_shape
         self._calib_points = calib_points
+        # lens distortion is optional, without it a pinhole camera is assumed
+        self._camera_matrix = None
+        self._dist_coeffs = None
+        if camera_matrix is not None and dist_coeffs is not None:
+            self._camera_matrix = np.array(camera_matrix, dtype=np.float64)
+            self._dist_coeffs = np.array(dist_coeffs, dtype=np.float64)
+        self._h = None
+        self._map1 = None
+        self._map2 = None
+        self._score_map = None
+        self._wire_map = None
+        self._cache = WarpCache()
+        self._consumers: List[Callable[[np.ndarray], Any]] = []
+        super().__init__(**kwargs)
         # This will initialize following variables:
-        # self._h, self._h_inv, self._map_y, self._map_x
-        # self._translate
+        # self._h, self._h_inv, self._map1, self._map2
+        # self._score_map, self._wire_map
+        # self._translate, self.roi_polygon, self.roi
         self.update_warp()
 
+    def configure(self, configs=List[AllConfigModel]):
+        """Configure operator and update the warp afterwards,
+        because it depends on the configs"""
+        super().configure(configs)
+        if self._h is not None:
+            self.update_warp()
+
     @property
     def size(self):
         """Return size of resulting image"""
         return (self._dartboard_model.outer_double_ring + self.margin.value) * 2
 
+    @property
+    def has_distortion(self) -> bool:
+        """Returns True, if lens distortion parameters are given"""
+        return self._camera_matrix is not None
+
+    def _undistort_points(self, points: np.ndarray) -> np.ndarray:
+        """Maps points of the distorted camera image to the undistorted
+        (pinhole) image. Without distortion parameters points are returned as is.
+
+        Args:
+            points (np.ndarray): N x 2 array of points in the camera image
+
+        Returns:
+            np.ndarray: N x 2 array of points in the undistorted image
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if not self.has_distortion:
+            return pts
+        undistorted = cv2.undistortPoints(
+            pts.reshape(-1, 1, 2),
+            self._camera_matrix,
+            self._dist_coeffs,
+            P=self._camera_matrix,
+        )
+        return undistorted.reshape(-1, 2)
+
+    def _distort_points(self, points: np.ndarray) -> np.ndarray:
+        """Maps points of the undistorted (pinhole) image to the distorted
+        camera image. Without distortion parameters points are returned as is.
+
+        Args:
+            points (np.ndarray): N x 2 array of points in the undistorted image
+
+        Returns:
+            np.ndarray: N x 2 array of points in the camera image
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if not self.has_distortion:
+            return pts
+        # normalized image coordinates as 3d points in front of the camera
+        normalized = cv2.convertPointsToHomogeneous(pts).reshape(-1, 3)
+        normalized = normalized @ np.linalg.inv(self._camera_matrix).T
+        distorted, _ = cv2.projectPoints(
+            normalized,
+            np.zeros(3),
+            np.zeros(3),
+            self._camera_matrix,
+            self._dist_coeffs,
+        )
+        return distorted.reshape(-1, 2)
+
     def _warp_point(
         self, matrix: np.ndarray, pt: Tuple[float, float]
     ) -> Tuple[float, float]:
@@ -80,39 +177,37 @@ class HomographyWarper(BaseOperator):
         )
         return (px, py)
 
-    def _update_maps(self, img_shape: np.array, matrix: np.array) -> None:
-        """Calculates and updates the warp maps 'self._map_x' and 'self._map_y'
-        for given image and homography matrix.
-        This maps can be used in cv2.remap
+    def _update_maps(self, size: int, matrix: np.array) -> None:
+        """Calculates and updates the warp maps 'self._map1' and 'self._map2'
+        for given output size and homography matrix.
+        The maps are calculated vectorized for all output pixels and converted
+        to fixed-point representation, which is faster in cv2.remap.
+        If distortion parameters are given, the lens distortion is added
+        to the maps, so undistortion and warp are done in a single remap.
 
         Args:
-            image (np.array): image shape
-            matrix (np.array): homography matrix
-
-        Returns:
-            np.array: _description_
+            size (int): size of the quadratic output image
+            matrix (np.array): homography matrix, which maps output
+                pixels to (undistorted) input pixels
         """
-        # https://stackoverflow.com/a/57400980
-        self._map_y = np.zeros((img_shape[0], img_shape[1]), dtype=np.float32)
-        self._map_x = np.zeros((img_shape[0], img_shape[1]), dtype=np.float32)
-        for y in range(img_shape[0]):
-            for x in range(img_shape[1]):
-                pt_warped = self._warp_point(matrix, (x, y))
-                self._map_x[y, x] = int(pt_warped[0])
-                self._map_y[y, x] = int(pt_warped[1])
+        xs, ys = np.meshgrid(
+            np.arange(size, dtype=np.float32), np.arange(size, dtype=np.float32)
+        )
+        pts = np.stack([xs, ys], axis=-1).reshape(-1, 1, 2)
+        warped = cv2.perspectiveTransform(pts, matrix)
+        if self.has_distortion:
+            warped = self._distort_points(warped)
+        warped = warped.reshape(size, size, 2).astype(np.float32)
+        self._map1, self._map2 = cv2.convertMaps(
+            warped, None, cv2.CV_16SC2, nninterpolation=True
+        )
 
-    def update_warp(self) -> None:
-        """Calculates warp homograpyh and a warp mapping,
-        based on calibration points and image shape.
-        The warp mapping also contains a translation (based on image size),
-        avoiding a result image with negative coordinates.
-        Output shape is based on the dartboard schemata.
-        Saves the warp matrix in the class object
+    def _find_homography(self) -> np.ndarray:
+        """Finds homography from dartboard model to image, based on
+        calibration points and image shape.
 
-        Args:
-            calib_points (CalibrationPoint): calibration points in percentage of
-                        image shape
-            img_shape (np.ndarray): input image shape
+        Returns:
+            np.ndarray: homography matrix
         """
         img_points = []
         obj_points = []
@@ -124,25 +219,202 @@ class HomographyWarper(BaseOperator):
             # get corresponding obj point from dartboard model
             corr_dartboard_point = self._dartboard_model.get_outer_point(point.label)
             obj_points.append(corr_dartboard_point)
-        self._img_points = np.array(img_points)
+        # the homography is defined on the undistorted image
+        self._img_points = self._undistort_points(img_points)
         self._obj_points = np.array(obj_points)
         # find homography from object points to image points
-        self._h, _ = cv2.findHomography(self._obj_points, self._img_points)
+        h, _ = cv2.findHomography(self._obj_points, self._img_points)
+        return h
+
+    def _cache_key(self) -> str:
+        """Returns key for the warp cache, based on all parameters
+        the homography and warp maps depend on"""
+        model = self._dartboard_model
+        return WarpCache.create_key(
+            version=self.CACHE_VERSION,
+            calib_points=[p.model_dump() for p in self._calib_points],
+            img_shape=[int(x) for x in self._img_shape],
+            margin=self.margin.value,
+            model=[
+                model.outer_double_ring,
+                model.degree_of_segment,
+                model.start_degree,
+                model.point_mapping,
+                model.score_resolution,
+            ],
+            distortion=[
+                None if self._camera_matrix is None else self._camera_matrix.tolist(),
+                None if self._dist_coeffs is None else self._dist_coeffs.tolist(),
+            ],
+        )
+
+    def update_warp(self) -> None:
+        """Calculates warp homograpyh and a warp mapping,
+        based on calibration points and image shape.
+        The warp mapping also contains a translation (based on image size),
+        avoiding a result image with negative coordinates, and a vertical flip,
+        because the origin of the image is on the top left and not bottom left.
+        Output shape is based on the dartboard schemata.
+        Saves the warp matrix in the class object.
+        The homography and warp mapping are cached on disk, so they are only
+        calculated once for the same parameters.
+        """
+        key = self._cache_key()
+        h = self._cache.load(key, "homography")
+        if h is None:
+            h = self._find_homography()
+            self._cache.save(key, "homography", h)
+        self._h = np.array(h)
         # find inverse, because we want to map points from image plane to object plane
         self._h_inv = np.linalg.inv(self._h)
-        if self.use_remap.value:
-            # translation matrix, because the world plane has negative points
-            # and the top should be 20-1
-            translate_warp = np.array(
-                [[1, 0, -self.size / 2], [0, 1, -self.size / 2], [0, 0, 1]]
-            )
-            warp_remap = np.matmul(self._h, translate_warp)
-            self._update_maps(self._img_shape, warp_remap)
+        # translation matrix, because the world plane has negative points
+        # and flip, because the top should be 20-1
+        translate_flip = np.array(
+            [[1, 0, -self.size / 2], [0, -1, self.size / 2 - 1], [0, 0, 1]]
+        )
+        # lens distortion can only be applied with remap
+        if self.use_remap.value or self.has_distortion:
+            warp_remap = np.matmul(self._h, translate_flip)
+            map1 = self._cache.load(key, "map1")
+            if map1 is None:
+                self._update_maps(self.size, warp_remap)
+                self._cache.save(key, "map1", self._map1)
+            else:
+                self._map1, self._map2 = map1, None
         # create homography for warping with cv2.warpPerspective
-        translate_homography = np.array(
-            [[1, 0, self.size / 2], [0, 1, self.size / 2], [0, 0, 1]]
+        self._warp_homography = np.matmul(np.linalg.inv(translate_flip), self._h_inv)
+        self._update_roi()
+        # render score map now, so the first throw does not need to wait
+        self._update_score_map()
+
+    def _update_roi(self) -> None:
+        """Calculates the region of interest of the dartboard in the image.
+        A circle around the dartboard (with additional roi_margin) is warped
+        into the image as polygon 'self.roi_polygon'.
+        The bounding rectangle of this polygon, clipped to the image, is saved
+        in 'self.roi_px' (x, y, w, h) in pixel and in 'self.roi' as percentages
+        of the image.
+        """
+        img_h, img_w = self._img_shape[0], self._img_shape[1]
+        radius = self._dartboard_model.outer_double_ring + self.roi_margin.value
+        angles = np.linspace(0, 2 * np.pi, 72, endpoint=False)
+        circle = np.stack([np.sin(angles), np.cos(angles)], axis=1) * radius
+        polygon = cv2.perspectiveTransform(circle.reshape(-1, 1, 2), self._h)
+        polygon = self._distort_points(polygon)
+        self.roi_polygon = polygon.reshape(-1, 2).astype(np.int32)
+        # clip bounding rect of polygon to image
+        x1, y1 = np.clip(self.roi_polygon.min(axis=0), 0, (img_w, img_h))
+        x2, y2 = np.clip(self.roi_polygon.max(axis=0) + 1, 0, (img_w, img_h))
+        if x2 <= x1 or y2 <= y1:
+            # board is not visible, so fall back to the full image
+            x1, y1, x2, y2 = 0, 0, img_w, img_h
+        self.roi_px = (int(x1), int(y1), int(x2 - x1), int(y2 - y1))
+        self.roi = BBox.from_pixel(self.roi_px, img_h, img_w)
+
+    def _update_score_map(self) -> None:
+        """Renders the score raster of the dartboard model into image
+        coordinates as 'self._score_map', so each pixel holds the score id of
+        the board field it shows. Additionally 'self._wire_map' holds the
+        distance in pixel of each pixel to the nearest wire, which is used as
+        confidence. Both maps are cached on disk like the warp maps.
+        """
+        key = self._cache_key()
+        self._score_map = self._cache.load(key, "score_map")
+        self._wire_map = self._cache.load(key, "wire_map")
+        if self._score_map is not None and self._wire_map is not None:
+            return
+        model = self._dartboard_model
+        img_h, img_w = self._img_shape[0], self._img_shape[1]
+        if self.has_distortion:
+            # image pixel -> undistorted pixel -> model -> raster pixel
+            xs, ys = np.meshgrid(np.arange(img_w), np.arange(img_h))
+            pts = self._undistort_points(np.stack([xs.ravel(), ys.ravel()], axis=1))
+            matrix = np.matmul(model.model_to_raster, self._h_inv)
+            raster_pts = cv2.perspectiveTransform(pts.reshape(-1, 1, 2), matrix)
+            raster_pts = raster_pts.reshape(img_h, img_w, 2).astype(np.float32)
+            score_map = cv2.remap(
+                model.score_raster,
+                raster_pts,
+                None,
+                cv2.INTER_NEAREST,
+                borderMode=cv2.BORDER_CONSTANT,
+                borderValue=self.OUTSIDE_ID,
+            )
+        else:
+            # raster pixel -> model -> image pixel
+            matrix = np.matmul(self._h, np.linalg.inv(model.model_to_raster))
+            score_map = cv2.warpPerspective(
+                model.score_raster,
+                matrix,
+                (img_w, img_h),
+                flags=cv2.INTER_NEAREST,
+                borderMode=cv2.BORDER_CONSTANT,
+                borderValue=self.OUTSIDE_ID,
+            )
+        # wires are the ambiguous cells of the raster and all edges between
+        # different scores, which are thinner than a raster cell in the image.
+        # Pixels on both sides of an edge are marked, as the edge may pass
+        # through either of them
+        inside = score_map != self.OUTSIDE_ID
+        wires = score_map == model.AMBIGUOUS_ID
+        edges_x = (
+            (score_map[:, 1:] != score_map[:, :-1]) & inside[:, 1:] & inside[:, :-1]
+        )
+        edges_y = (score_map[1:] != score_map[:-1]) & inside[1:] & inside[:-1]
+        wires[:, 1:] |= edges_x
+        wires[:, :-1] |= edges_x
+        wires[1:] |= edges_y
+        wires[:-1] |= edges_y
+        wire_map = cv2.distanceTransform(
+            (~wires).astype(np.uint8), cv2.DIST_L2, cv2.DIST_MASK_PRECISE
         )
-        self._warp_homography = np.matmul(translate_homography, self._h_inv)
+        self._cache.save(key, "score_map", score_map)
+        self._cache.save(key, "wire_map", wire_map)
+        self._score_map, self._wire_map = score_map, wire_map
+
+    def score_at(self, x: float, y: float) -> Tuple[int, float]:
+        """Returns the score id (see DartboardModel.score_labels) and the
+        distance to the nearest wire in pixel for a point in the image.
+        The score is looked up in the precomputed score map. Points close to
+        a wire or outside of the image are calculated analytically.
+
+        Args:
+            x (float): x in image coordinates
+            y (float): y in image coordinates
+
+        Returns:
+            Tuple[int, float]: score id and distance to nearest wire in pixel
+        """
+        if self._score_map is None:
+            self._update_score_map()
+        img_h, img_w = self._score_map.shape
+        col, row = int(round(x)), int(round(y))
+        score_id, wire_distance = self.OUTSIDE_ID, 0.0
+        if 0 <= col < img_w and 0 <= row < img_h:
+            score_id = int(self._score_map[row, col])
+            wire_distance = float(self._wire_map[row, col])
+        # the pixel or its diagonal neighbours may contain a wire, so the
+        # lookup is not exact
+        if wire_distance <= self.WIRE_BAND or score_id in (
+            self.OUTSIDE_ID,
+            self._dartboard_model.AMBIGUOUS_ID,
+        ):
+            point = self.warp_points_to_model(np.array([[x, y]]))
+            score_id = int(self._dartboard_model.get_score_ids_analytic(point)[0])
+        return score_id, wire_distance
+
+    def crop_to_roi(self, image: np.ndarray) -> np.ndarray:
+        """Crops the given image to the region of interest of the dartboard.
+        The crop is a view, so no data is copied.
+
+        Args:
+            image (np.ndarray): full image with same shape as the warper input
+
+        Returns:
+            np.ndarray: image cropped to self.roi_px
+        """
+        x, y, w, h = self.roi_px
+        return image[y : y + h, x : x + w]
 
     def _warp_with_remap(self, image: np.array) -> np.array:
         """Maps image with calculated remap from self.update_warp_map
@@ -153,12 +425,9 @@ class HomographyWarper(BaseOperator):
         Returns:
             np.array: warped image
         """
-        if self._map_x is None:
+        if self._map1 is None:
             self.update_warp()
-        warped_image = cv2.remap(image, self._map_x, self._map_y, cv2.INTER_NEAREST)
-        # cut to output size
-        cutted = warped_image[0 : self.size, 0 : self.size]
-        return cutted
+        return cv2.remap(image, self._map1, self._map2, cv2.INTER_NEAREST)
 
     def _warp_with_homography(self, image: np.array) -> np.array:
         """Warps image with calculated homography and translation
@@ -179,27 +448,76 @@ class HomographyWarper(BaseOperator):
             flags=cv2.INTER_NEAREST,
         )
 
-    def call(self, image: np.array, **kwargs) -> np.array:
+    def register_consumer(self, consumer: Callable[[np.ndarray], Any]) -> None:
+        """Registers a consumer of the warped image, e.g. a recorder.
+        Each consumer is called with the warped image on every call.
+
+        Args:
+            consumer (Callable[[np.ndarray], Any]): function to call with the
+                warped image
+        """
+        self._consumers.append(consumer)
+
+    def unregister_consumer(self, consumer: Callable[[np.ndarray], Any]) -> None:
+        """Removes a registered consumer of the warped image.
+
+        Args:
+            consumer (Callable[[np.ndarray], Any]): registered consumer
+        """
+        self._consumers.remove(consumer)
+
+    def send_result_to_redis(self, data: Optional[np.ndarray]):
+        """Overwrite base class to only send, if the image was warped and
+        somebody consumes the image over redis."""
+        if data is not None and self.has_consumers():
+            super().send_result_to_redis(data)
+
+    def call(self, image: np.array, **kwargs) -> Optional[np.array]:
         """Gets input image and warps it onto a dartboard model and
         translate the image to non-negative
         Will also add a translation so the image is not negative.
 
+        Warping the full image is expensive and the warped image is only
+        needed for visualization. Therefore the image is only warped, if
+        a consumer is registered or consumes the result via redis (see
+        has_consumers). The warp of points is always possible and is updated
+        if the image shape changes.
+
         Args:
             image (np.array): input image
 
         Returns:
-            np.array: warped image
+            Optional[np.array]: warped image or None if there is no consumer
         """
         if image.shape != self._img_shape:
             self._img_shape = image.shape
             self.update_warp()
-        # warp image
-        if self.use_remap.value:
+        if not self._consumers and not self.has_consumers():
+            return None
+        # warp image. The flip is already part of the warp
+        if self.use_remap.value or self.has_distortion:
             warped = self._warp_with_remap(image)
         else:
             warped = self._warp_with_homography(image)
-        # flip image because origin is on top left and not bottom left
-        return cv2.flip(warped, 0)
+        for consumer in self._consumers:
+            consumer(warped)
+        return warped
+
+    def warp_points_to_model(self, points: np.ndarray) -> np.ndarray:
+        """Warps multiple points to dartboard model in one vectorized call.
+        Will not add translation. Points are undistorted first, if distortion
+        parameters are given.
+
+        Args:
+            points (np.ndarray): N points (x, y) in image coordinates as N x 2 array
+
+        Returns:
+            np.ndarray: N x 2 array with points in dartboard world coordinates
+        """
+        pts = self._undistort_points(points)
+        matrix = self._h_inv
+        denom = pts @ matrix[2, :2] + matrix[2, 2]
+        return (pts @ matrix[:2, :2].T + matrix[:2, 2]) / denom[:, None]
 
     def warp_point_to_model(self, x: float, y: float) -> Tuple[float, float]:
         """Warps single point to dartboard model. Will not add translation.
@@ -211,5 +529,5 @@ class HomographyWarper(BaseOperator):
         Returns:
             Tuple[int, int]: point in dartboard world coordinate
         """
-        p = (x, y)
-        return self._warp_point(self._h_inv, p)
+        px, py = self.warp_points_to_model(np.array([[x, y]]))[0]
+        return (float(px), float(py))
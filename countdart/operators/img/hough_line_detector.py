@@ -94,16 +94,11 @@ class HoughLineDetector(BaseOperator):
         )
         # select longest line
         new_line = None
-        max_dist = 0
         if lines is not None:
-            for i in range(0, len(lines)):
-                line = lines[i][0]
-                # calculate distance
-                dist = np.linalg.norm(
-                    np.array([line[0], line[1]]) - np.array([line[2], line[3]])
-                )
-                if dist > max_dist:
-                    # convert to percentages
-                    new_line = Line.from_pixel(line, roi_h, roi_w)
-                    max_dist = dist
+            lines = lines.reshape(-1, 4)
+            lengths = np.hypot(lines[:, 2] - lines[:, 0], lines[:, 3] - lines[:, 1])
+            longest = np.argmax(lengths)
+            if lengths[longest] > 0:
+                # convert to percentages
+                new_line = Line.from_pixel(lines[longest], roi_h, roi_w)
         return new_line
@@ -1,7 +1,6 @@
 """Motion Detector Operator"""
 
-from collections import deque
-from typing import Any
+from typing import Any, Optional
 
 import cv2
 import logfire
@@ -39,61 +38,126 @@ class MotionDetector(BaseOperator):
         min_value=0,
     )
 
+    consistency_frames = IntConfigModel(
+        name="consistency_frames",
+        default_value=5,
+        description="Number of consecutive frames which need to contain motion, "
+        "before the motion is reported.",
+        max_value=100,
+        min_value=1,
+    )
+
+    idle_timeout = IntConfigModel(
+        name="idle_timeout",
+        default_value=10,
+        description="Seconds without motion, after which the procedure is idle. "
+        "While idle only every k-th frame is processed at a lower resolution.",
+        max_value=3600,
+        min_value=1,
+    )
+
+    idle_frame_skip = IntConfigModel(
+        name="idle_frame_skip",
+        default_value=3,
+        description="Process only every k-th frame while idle.",
+        max_value=30,
+        min_value=1,
+    )
+
+    idle_resize = FloatConfigModel(
+        name="idle_resize",
+        default_value=0.1,
+        description="Factor to resize image while idle",
+        max_value=1,
+        min_value=0,
+    )
+
     def __init__(self, **kwargs):
         self._last_image = None
-        self.motion_buffer = deque(maxlen=5)  # Buffer to store the last 5 frames
+        # Number of consecutive frames with motion. Only a counter is kept
+        # instead of the last masks, so memory and runtime do not depend on the
+        # frame size or the length of the consistency window
+        self._motion_count = 0
+        self.had_motion = False
         super().__init__(**kwargs)
 
     def send_result_to_redis(self, data: Any):
         """Overwrite base class to only send, if data is not None."""
         if self._r:
             # encode if data is numpy
-            if not np.all(data == 0):
-                data = encode_numpy(data)
-                redis_result_key = f"{self._r_key}_{self.__class__.__name__}"
-                self._r.set(redis_result_key, data)
+            if cv2.countNonZero(data) > 0:
+                self.set_result(encode_numpy(data))
 
-    def call(self, image: np.array, **kwargs) -> np.array:
+    def call(
+        self, image: np.array, resize: Optional[float] = None, **kwargs
+    ) -> np.array:
         """Add new frame to change detector and return trigger signal.
         Resizes the image.
+
+        The background is always kept at the resolution of the resize config.
+        If another resize is given, the background is downscaled to the
+        resolution of the frame, so switching between idle and active frames
+        does not lose the background (e.g. a dart which landed while idle).
+
+        Args:
+            image (np.array): input image
+            resize (Optional[float], optional): factor to resize image, overwrites
+                the resize config, e.g. with idle_resize. Defaults to None.
+
+        Returns:
+            np.array: motion mask
         """
+        if resize is None:
+            resize = self.resize.value
+        img_h, img_w = image.shape[:2]
+        # size of the background and of the resized frame
+        size = (round(img_w * self.resize.value), round(img_h * self.resize.value))
+        frame_size = (round(img_w * resize), round(img_h * resize))
+        # the image shape changes, if the region of interest changed.
+        # Start again with the new image in this case
+        if self._last_image is None or self._last_image.shape[1::-1] != size:
+            with logfire.span("resize"):
+                self._last_image = cv2.resize(image, size)
+            self._motion_count = 0
+            self.had_motion = False
+            return np.zeros((frame_size[1], frame_size[0]), dtype=np.uint8)
+
+        full_image = image
         # resize image with scaling factor
         with logfire.span("resize"):
-            image = cv2.resize(image, None, fx=self.resize.value, fy=self.resize.value)
-
-        if self._last_image is not None:
-            # calculate diff
-            with logfire.span("diff"):
-                diff = cv2.absdiff(self._last_image, image)
-            # to grayscale
-            with logfire.span("grayscale"):
-                diff = cv2.cvtColor(diff, cv2.COLOR_RGB2GRAY)
-            # Gaussian blur
-            blur = cv2.GaussianBlur(diff, (3, 3), 0)
-            # Threshold
-            with logfire.span("threshold"):
-                _, thresh = cv2.threshold(
-                    blur, self.threshold.value, 255, cv2.THRESH_BINARY
+            if frame_size == size:
+                image = cv2.resize(image, size)
+                background = self._last_image
+            else:
+                image = cv2.resize(image, frame_size, interpolation=cv2.INTER_AREA)
+                background = cv2.resize(
+                    self._last_image, frame_size, interpolation=cv2.INTER_AREA
                 )
+        # calculate diff
+        with logfire.span("diff"):
+            diff = cv2.absdiff(background, image)
+        # to grayscale
+        with logfire.span("grayscale"):
+            diff = cv2.cvtColor(diff, cv2.COLOR_RGB2GRAY)
+        # Gaussian blur
+        blur = cv2.GaussianBlur(diff, (3, 3), 0)
+        # Threshold
+        with logfire.span("threshold"):
+            _, thresh = cv2.threshold(
+                blur, self.threshold.value, 255, cv2.THRESH_BINARY
+            )
 
-            self.motion_buffer.append(thresh)
-
-            # Check if motion is consistent across all frames in the buffer
-            if len(self.motion_buffer) == self.motion_buffer.maxlen:
-                consistent_motion = np.all(
-                    [np.any(frame) for frame in self.motion_buffer]
-                )
-                if consistent_motion:
-                    with logfire.span("copy image"):
-                        self._last_image = image
-                    return np.array(thresh, dtype=np.uint8)
+        # Check if motion is consistent across the last frames
+        self.had_motion = cv2.countNonZero(thresh) > 0
+        self._motion_count = self._motion_count + 1 if self.had_motion else 0
+        if self._motion_count >= self.consistency_frames.value:
+            with logfire.span("copy image"):
+                if frame_size == size:
+                    self._last_image = image
                 else:
-                    return np.zeros((image.shape[0], image.shape[1]), dtype=np.uint8)
-            else:
-                return np.zeros((image.shape[0], image.shape[1]), dtype=np.uint8)
-        else:
-            self._last_image = image
-            return np.zeros((image.shape[0], image.shape[1]), dtype=np.uint8)
+                    self._last_image = cv2.resize(full_image, size)
+            return np.array(thresh, dtype=np.uint8)
+        return np.zeros((image.shape[0], image.shape[1]), dtype=np.uint8)
 
     def reset(self, image: np.array) -> bool:
         """Reset the operator to initial state"""
@@ -0,0 +1,150 @@
+""" This module contains a line detector based on the principal axis of a mask """
+
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from countdart.database.schemas.config import BooleanConfigModel, IntConfigModel
+from countdart.operators.operator import OPERATORS, BaseOperator
+from countdart.utils.misc import BBox, Line
+
+__all__ = "PrincipalAxisDetector"
+
+
+@OPERATORS.register_class
+class PrincipalAxisDetector(BaseOperator):
+    """The PrincipalAxisDetector is an alternative to the HoughLineDetector.
+    It estimates the axis of the dart directly from the segmented mask,
+    by fitting a line through the nonzero pixels (cv2.fitLine).
+    A robust first estimate on the pixels of the mask, downscaled by 'scale',
+    is refined with the full resolution pixels close to it, which reduces the
+    influence of noise. Only the region around the first estimate is searched
+    at full resolution, so this is cheaper than the hough transform.
+    """
+
+    enabled = BooleanConfigModel(
+        name="enabled",
+        default_value=False,
+        description="Use the principal axis of the mask instead of the "
+        "HoughLineDetector to find the dart",
+    )
+
+    min_pixels = IntConfigModel(
+        name="min_pixels",
+        default_value=20,
+        description="Minimum number of pixels in the region of interest. "
+        "If there are less pixels, no line is returned",
+        max_value=10000,
+        min_value=2,
+    )
+
+    max_distance = IntConfigModel(
+        name="max_distance",
+        default_value=10,
+        description="Maximum distance in pixel of a pixel to the fitted line. "
+        "Pixels with higher distance are ignored to find the end points",
+        max_value=500,
+        min_value=1,
+    )
+
+    # number of pixels used for the robust first estimate of the line
+    sample_size = 128
+    # downscale factor of the mask for the first estimate, a power of two
+    scale = 4
+
+    @staticmethod
+    def _distance(
+        points: np.ndarray, vx: float, vy: float, x0: float, y0: float
+    ) -> np.ndarray:
+        """Distance of points (N x 2) to the line through (x0, y0)
+        with normalized direction (vx, vy)"""
+        return np.abs((points[:, 0] - x0) * vy - (points[:, 1] - y0) * vx)
+
+    def _estimate(self, roi: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Robust estimate of the line on the downscaled mask.
+
+        Args:
+            roi (np.ndarray): binary mask of the region of interest
+
+        Returns:
+            Optional[Tuple[np.ndarray, np.ndarray]]: line (vx, vy, x0, y0) and
+                bounding rectangle (x, y, w, h) of the pixels close to it, both
+                in full resolution
+        """
+        # a pixel of the downscaled mask is set, if at least two pixels of its
+        # block are set. Thin lines are kept at every position, single noise
+        # pixels are removed. Halving repeatedly is much faster than a single
+        # area resize by the scale
+        small = roi
+        for _ in range(self.scale.bit_length() - 1):
+            small = cv2.resize(
+                small, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA
+            )
+        points = cv2.findNonZero((small > 1.5 * 255 / self.scale**2).astype(np.uint8))
+        min_pixels = max(2, self.min_pixels.value // self.scale**2)
+        if points is None or len(points) < min_pixels:
+            return None
+        # center of the blocks in full resolution
+        points = points.reshape(-1, 2).astype(np.float32) * self.scale
+        points += (self.scale - 1) / 2
+        # the fit is iterative, an accuracy of one pixel is enough, as it is
+        # refined afterwards
+        sample = points[:: max(1, len(points) // self.sample_size)]
+        line = cv2.fitLine(sample, cv2.DIST_HUBER, 0, 1, 0.01).ravel()
+        inliers = self._distance(points, *line) <= self.max_distance.value
+        if inliers.sum() < min_pixels:
+            return None
+        x, y, w, h = cv2.boundingRect(points[inliers])
+        # margin for the pixels lost by downscaling
+        margin = self.max_distance.value + self.scale
+        x0, y0 = max(0, x - margin), max(0, y - margin)
+        x1 = min(roi.shape[1], x + w + margin)
+        y1 = min(roi.shape[0], y + h + margin)
+        return line, np.array([x0, y0, x1 - x0, y1 - y0])
+
+    def call(self, image: np.ndarray, roi: BBox) -> Optional[Line]:
+        """Receives an image and a region of interest as bounding box.
+        The image is cropped to the bounding box and a line is fitted through
+        a subsample of the nonzero pixels of the downscaled mask. It is refined
+        with all pixels close to the line (max_distance). The end points of the
+        line are the outermost of these pixels projected onto the line.
+
+        It will return the line in percentages of the given region of
+        interest, the same way as the HoughLineDetector.
+
+        Args:
+            image (np.ndarray): full binary mask
+            roi (BBox): region of interest in percentages of the full image
+
+        Returns:
+            Optional[Line]: the found line in percentages of the roi
+        """
+        img_h, img_w = image.shape
+        # convert to pixel
+        x, y, w, h = roi.to_pixel(img_h, img_w)
+        roi = image[y : y + h, x : x + w]
+        roi_h, roi_w = roi.shape
+        estimate = self._estimate(roi)
+        if estimate is None:
+            return None
+        line, (rx, ry, rw, rh) = estimate
+        # fit again with all pixels close to the line, to ignore noise
+        points = cv2.findNonZero(np.ascontiguousarray(roi[ry : ry + rh, rx : rx + rw]))
+        if points is None:
+            return None
+        points = points.reshape(-1, 2).astype(np.float32) + (rx, ry)
+        points = points[self._distance(points, *line) <= self.max_distance.value]
+        if len(points) < self.min_pixels.value:
+            return None
+        vx, vy, x0, y0 = cv2.fitLine(points, cv2.DIST_L2, 0, 0.01, 0.01).ravel()
+        # project points onto the line to find the end points
+        projection = (points[:, 0] - x0) * vx + (points[:, 1] - y0) * vy
+        t_min, t_max = projection.min(), projection.max()
+        line = (
+            x0 + t_min * vx,
+            y0 + t_min * vy,
+            x0 + t_max * vx,
+            y0 + t_max * vy,
+        )
+        return Line.from_pixel(line, roi_h, roi_w)
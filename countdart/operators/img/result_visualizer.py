@@ -1,10 +1,10 @@
 """This module contains a visualizer. This is mostly for debug purpose"""
 
-from typing import Tuple
+from typing import Optional, Tuple
 
-import cv2
 import numpy as np
 
+from countdart.database.schemas import OverlayMessage
 from countdart.operators.operator import OPERATORS, BaseOperator
 from countdart.utils.misc import BBox, Line
 
@@ -14,27 +14,32 @@ __all__ = "ResultVisualizer"
 @OPERATORS.register_class
 class ResultVisualizer(BaseOperator):
     """An operator to visualize all results in an image.
-    Returns the visualized image
+    Returns the results as overlay. The overlay is only drawn
+    by the live view of the API (see countdart.utils.visualization),
+    so no frame needs to be copied and published by the worker.
     """
 
+    def send_result_to_redis(self, data: OverlayMessage):
+        """Overwrite base class to send the overlay as json"""
+        if self._r:
+            self.set_result(data.model_dump_json())
+
     def call(
         self,
         image: np.ndarray,
         bbox: BBox,
         label: str,
-        line: Line,
+        line: Optional[Line],
         score: str,
         conf: float,
-        img_tip: Tuple[int, int],
-    ) -> np.ndarray:
-        """Visualize results in one image.
-        Draws the bounding box on the given image, adds a label and finally
-        draws the found hough line into the original image.
-
-        Returns the visualized image
+        img_tip: Optional[Tuple[int, int]],
+    ) -> OverlayMessage:
+        """Collects all results into one overlay.
+        The overlay contains the bounding box, its label, the found hough line,
+        the dart tip and the score.
 
         Args:
-            image (np.ndarray): full image
+            image (np.ndarray): full image, only used for its shape
             bbox (BBox): found bounding box in percentage
             label (str): classified label of bounding box
             line (np.ndarray): found hough line in percentage of bbox
@@ -43,50 +48,14 @@ class ResultVisualizer(BaseOperator):
             img_tip(Tuple): Point2D of dart tip
 
         Returns:
-            np.ndarray: visualized image
+            OverlayMessage: overlay with all results
         """
-        img_h, img_w, _ = image.shape
-        x, y, w, h = bbox.to_pixel(img_h, img_w)
-        vis_img = image.copy()
-        # draw bbox on image
-        vis_img = cv2.rectangle(
-            vis_img, (x, y), (x + w, y + h), color=(255, 0, 0), thickness=2
-        )
-        # draw label
-        vis_img = cv2.putText(
-            vis_img,
-            label,
-            (x, y),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            fontScale=2,
-            color=(255, 0, 0),
-            thickness=2,
+        img_h, img_w = image.shape[:2]
+        return OverlayMessage(
+            bbox=(bbox.x, bbox.y, bbox.w, bbox.h),
+            label=label,
+            line=(line.x1, line.y1, line.x2, line.y2) if line else None,
+            score=score,
+            confidence=conf,
+            tip=(img_tip[0] / img_w, img_tip[1] / img_h) if img_tip else None,
         )
-        # draw score
-        vis_img = cv2.putText(
-            vis_img,
-            f"{score}, {round(conf,1)}",
-            (0, img_h),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            fontScale=2,
-            color=(255, 0, 0),
-            thickness=4,
-        )
-
-        # draw line
-        if line:
-            # convert from percentage to pixel
-            lx1, ly1, lx2, ly2 = line.to_pixel(h, w)
-            # draw line with offset of bounding box
-            vis_img = cv2.line(
-                vis_img,
-                (lx1 + x, ly1 + y),
-                (lx2 + x, ly2 + y),
-                color=(0, 0, 255),
-                thickness=2,
-            )
-
-        # draw point
-        if img_tip:
-            vis_img = cv2.circle(vis_img, img_tip, 2, color=(0, 255, 0), thickness=-1)
-        return vis_img
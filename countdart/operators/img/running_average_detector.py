@@ -0,0 +1,92 @@
+"""Running Average Detector Operator"""
+
+import cv2
+import numpy as np
+
+from countdart.database.schemas.config import FloatConfigModel, IntConfigModel
+from countdart.operators.operator import OPERATORS, BaseOperator
+
+__all__ = "RunningAverageDetector"
+
+
+@OPERATORS.register_class
+class RunningAverageDetector(BaseOperator):
+    """Change detector based on a running average of the background.
+    Faster alternative to the ChangeDetector, because it works on downscaled
+    grayscale images and updates the background incrementally.
+    The background is not adapted while changes are present, so objects
+    stay in the mask until the operator is reset.
+    This operator will also resize the image if the resize parameter
+    is less than 1.
+    """
+
+    resize = FloatConfigModel(
+        name="resize",
+        default_value=0.25,
+        description="Factor to resize image",
+        max_value=1,
+        min_value=0,
+    )
+
+    alpha = FloatConfigModel(
+        name="alpha",
+        default_value=0.05,
+        description="Learning rate of the background. "
+        "Higher values adapt faster to lighting changes.",
+        max_value=1,
+        min_value=0,
+    )
+
+    threshold = IntConfigModel(
+        name="threshold",
+        default_value=25,
+        description="Threshold for the difference to the background. "
+        "Lower thresholds may pick up more background noise.",
+        max_value=255,
+        min_value=0,
+    )
+
+    def __init__(self, **kwargs):
+        self._background = None
+        self.had_motion = False
+        super().__init__(**kwargs)
+
+    def _preprocess(self, image: np.array) -> np.array:
+        """Resizes image and converts it to blurred grayscale"""
+        image = cv2.resize(image, None, fx=self.resize.value, fy=self.resize.value)
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        return cv2.GaussianBlur(image, (5, 5), 0)
+
+    def call(self, image: np.array, learning_rate=-1, **kwargs) -> np.array:
+        """Add new frame to change detector and return mask.
+        Resizes the image.
+
+        Args:
+            image (np.array): input image
+            learning_rate (int, optional): learning rate of the background.
+                Negative values use the alpha config. Defaults to -1.
+
+        Returns:
+            np.array: mask of changed pixels
+        """
+        gray = self._preprocess(image)
+        # start again, if the image shape changes
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.astype(np.float32)
+            self.had_motion = False
+            return np.zeros(gray.shape, dtype=np.uint8)
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        _, mask = cv2.threshold(diff, self.threshold.value, 255, cv2.THRESH_BINARY)
+        self.had_motion = cv2.countNonZero(mask) > 0
+        # freeze the background while something changes
+        alpha = self.alpha.value if learning_rate < 0 else learning_rate
+        if not self.had_motion and alpha > 0:
+            cv2.accumulateWeighted(gray, self._background, alpha)
+        return mask
+
+    def reset(self, image: np.array) -> bool:
+        """Reset the operator to initial state"""
+        self._background = self._preprocess(image).astype(np.float32)
+        self.had_motion = False
+        return True
@@ -1,14 +1,18 @@
 """This module contains the base class of frame grabbers"""
 
+import time
+import uuid
 from abc import ABC, abstractmethod
 from typing import Tuple
 
 import numpy as np
 
 import countdart.operators.io as io
+from countdart.database.schemas import Trace
 from countdart.database.schemas.cam import Cam
 from countdart.operators.operator import BaseOperator
 from countdart.utils.registry import Registry
+from countdart.utils.tracing import new_trace
 
 __all__ = ["FrameGrabber"]
 
@@ -18,9 +22,15 @@ FRAME_GRABBERS = Registry("frame_grabbers")
 class FrameGrabber(BaseOperator, ABC):
     """Base class for frame grabbers.
 
-    Describes the common interfaces for all frame grabbers
+    Describes the common interfaces for all frame grabbers.
+    Counts the frames and keeps the capture time of the latest frame,
+    so a trace can be started for a frame with a detection.
     """
 
+    frame_index = 0
+    capture_time = 0.0
+    _trace_prefix = None
+
     @property
     @abstractmethod
     def image_size(self) -> Tuple[int, int, int]:
@@ -40,7 +50,21 @@ class FrameGrabber(BaseOperator, ABC):
 
     def call(self) -> np.ndarray:
         """Proxies the get_frame method"""
-        return self.get_frame()
+        frame = self.get_frame()
+        self.capture_time = time.time()
+        self.frame_index += 1
+        return frame
+
+    def trace(self) -> Trace:
+        """Starts a trace for the latest frame
+
+        Returns:
+            Trace: trace with the capture time of the latest frame
+        """
+        if self._trace_prefix is None:
+            # unique per frame grabber, the frame index is appended
+            self._trace_prefix = uuid.uuid4().hex[:8]
+        return new_trace(f"{self._trace_prefix}-{self.frame_index}", self.capture_time)
 
     def teardown(self):
         """calls framegrabber stop function and super()
@@ -1,7 +1,8 @@
 """ Base Operator """
 import json
+import time
 from abc import ABC, abstractmethod
-from typing import Any, List
+from typing import Any, List, Union
 
 import logfire
 import numpy as np
@@ -10,7 +11,7 @@ from pydantic import TypeAdapter
 
 from countdart.database.schemas.config import AllConfigModel, ConfigBaseModel
 from countdart.settings import settings
-from countdart.utils.misc import encode_numpy
+from countdart.utils.misc import encode_numpy, notification_channel
 from countdart.utils.registry import Registry
 
 __all__ = "BaseOperator"
@@ -27,6 +28,9 @@ class BaseOperator(ABC):
     the call function will be send to redis.
     """
 
+    # seconds to cache the result of has_consumers
+    consumer_check_interval = 1
+
     def __init__(self, redis_key: str = None, config: List[AllConfigModel] = None):
         if redis_key:
             self._r = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
@@ -34,6 +38,8 @@ class BaseOperator(ABC):
         else:
             self._r = None
             self._r_key = None
+        self._has_consumers = False
+        self._consumers_checked = 0
         # set changed config
         self.config = config
         if self.config:
@@ -60,8 +66,48 @@ class BaseOperator(ABC):
                     data = json.dumps(data)
                 except TypeError:
                     return
-            redis_result_key = f"{self._r_key}_{self.__class__.__name__}"
-            self._r.set(redis_result_key, data)
+            self.set_result(data)
+
+    def set_result(self, data: Union[bytes, str], pipe=None):
+        """Sets the result key ("{redis_key}_{class name}") and announces the
+        change on its notification channel, so consumers (e.g. live views) do
+        not need to poll the key.
+
+        Args:
+            data (Union[bytes, str]): encoded result
+            pipe (optional): redis pipeline to add the commands to. Defaults to
+                None, which executes them in an own pipeline.
+        """
+        redis_result_key = f"{self._r_key}_{self.__class__.__name__}"
+        execute = pipe is None
+        if execute:
+            pipe = self._r.pipeline(transaction=False)
+        pipe.set(redis_result_key, data)
+        pipe.publish(notification_channel(redis_result_key), b"")
+        if execute:
+            pipe.execute()
+
+    def has_consumers(self) -> bool:
+        """Check redis if the result of this operator is consumed by someone,
+        e.g. a live view. Consumers register themselves by setting the key
+        "{redis_key}_{class name}_consumers" with an expiry time and refresh
+        it as long as they consume the results.
+
+        The result is cached for consumer_check_interval seconds, to avoid a
+        request to redis on each call. Without redis connection there are
+        never consumers.
+
+        Returns:
+            bool: True if the result is consumed
+        """
+        if self._r is None:
+            return False
+        now = time.time()
+        if now - self._consumers_checked > self.consumer_check_interval:
+            consumer_key = f"{self._r_key}_{self.__class__.__name__}_consumers"
+            self._has_consumers = bool(self._r.exists(consumer_key))
+            self._consumers_checked = now
+        return self._has_consumers
 
     def receive_config_from_redis(self):
         """Check redis if config for this operator changed.
@@ -1,7 +1,11 @@
 """ Operator to publish results in redis"""
 
-from countdart.database.schemas import DartThrowBase, ResultMessage
+from typing import Optional
+
+from countdart.database.schemas import DartThrowBase, ResultMessage, Trace
 from countdart.operators.operator import OPERATORS, BaseOperator
+from countdart.utils.result_codec import add_trace, encode_result
+from countdart.utils.tracing import stamp
 
 __all__ = "ResultPublisher"
 
@@ -11,8 +15,13 @@ class ResultPublisher(BaseOperator):
     """This class will publish the result
     of dart and hand recognition as a dict."""
 
+    # maximum length of the result stream
+    stream_maxlen = 1000
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self._last_published = None
+        self._trace = None
         if self._r:
             self._r.delete(f"{self._r_key}_{self.__class__.__name__}")
 
@@ -24,14 +33,46 @@ class ResultPublisher(BaseOperator):
         was given on initialization. Else it will do nothing.
 
         Will append class name of operator to redis_key.
+        The message is encoded with encode_result. The latest result is set
+        as value for live views and each changed result is appended to a
+        stream ({redis_key}_stream), so the collector does not miss any result.
+        The trace of the result is stamped and appended, but not compared.
 
         """
         if self._r:
             redis_result_key = f"{self._r_key}_{self.__class__.__name__}"
-            self._r.set(redis_result_key, data.model_dump_json())
-            # self._r.lpush(redis_result_key, data)
+            encoded = encode_result(data)
+            # results are published on every frame, but only changes matter
+            if encoded == self._last_published:
+                return
+            self._last_published = encoded
+            if self._trace:
+                encoded = add_trace(encoded, stamp(self._trace, "publish"))
+            pipe = self._r.pipeline()
+            self.set_result(encoded, pipe)
+            pipe.xadd(
+                f"{redis_result_key}_stream",
+                {"data": encoded},
+                maxlen=self.stream_maxlen,
+                approximate=True,
+            )
+            pipe.execute()
 
-    def call(self, detection: str, data: DartThrowBase = None, **kwargs):
-        """Call when new result was received"""
+    def call(
+        self,
+        detection: str,
+        data: DartThrowBase = None,
+        trace: Optional[Trace] = None,
+        **kwargs,
+    ):
+        """Call when new result was received
+
+        Args:
+            detection (str): detected class
+            data (DartThrowBase, optional): detected dart throw. Defaults to None.
+            trace (Optional[Trace], optional): trace of the frame with the
+                detection. Defaults to None.
+        """
+        self._trace = trace
         message = ResultMessage(cls=detection, content=data)
         return message
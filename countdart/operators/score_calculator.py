@@ -1,8 +1,7 @@
 """ Calculates score """
 from typing import Tuple
 
-import numpy as np
-
+from countdart.database.schemas.config import FloatConfigModel
 from countdart.operators.operator import OPERATORS, BaseOperator
 from countdart.utils.dartboard_model import DartboardModel
 
@@ -12,31 +11,37 @@ __all__ = "ScoreCalculator"
 @OPERATORS.register_class
 class ScoreCalculator(BaseOperator):
     """Calculates score with the help of the dartboard model.
-    Will also calculate a confidence, based on distance of the point
+    Will also calculate a confidence, based on the distance of the point
+    to the nearest wire
     """
 
+    wire_tolerance = FloatConfigModel(
+        name="wire_tolerance",
+        default_value=3,
+        description="Distance to the nearest wire in pixel, below which "
+        "the confidence of the score decreases.",
+        max_value=50,
+        min_value=0.1,
+    )
+
     def __init__(self, dartboard_model: DartboardModel, **kwargs):
         self._dartboard_model = dartboard_model
         super().__init__(**kwargs)
 
-    def call(self, point_2d: Tuple[float, float], point_2d_conf: Tuple[float, float]):
-        """Given a point in dartboard world coordinate system,
-        returns score as a Tuple with string representation
-        and actual score.
+    def call(self, score_id: int, wire_distance: float) -> Tuple[str, float]:
+        """Given a score id (see HomographyWarper.score_at), returns
+        the string representation of the score and a confidence.
 
-        The point_2d_conf is used to calculate a confidence of the score.
-        point_2d_conf should be the warped point_2d but with an offset of 1
-        in x and y axis. The resulting distance between point_2d and
-        point_2d_conf is a good indicator for the confidence
+        The confidence is based on the distance of the dart tip to the nearest
+        wire in pixel. Close to a wire, a small error of the detected tip
+        may change the score, so the confidence is lower.
 
         Args:
-            point_2d (Tuple[float, float]): point in dartboard world coordinate system
-            point_2d_conf (Tuple[float, float]): point with offset 1 in
-            dartboard world coordinate system
+            score_id (int): score id of the dartboard model
+            wire_distance (float): distance to the nearest wire in pixel
 
         Returns:
-            _type_: calculated score
+            Tuple[str, float]: calculated score and confidence
         """
-        conf = np.linalg.norm(np.array(point_2d) - np.array(point_2d_conf))
-        score_str, score = self._dartboard_model.get_score(point_2d)
-        return score_str, 1 / max(conf, 1)
+        score_str = str(self._dartboard_model.score_labels[score_id])
+        return score_str, min(1.0, wire_distance / self.wire_tolerance.value)
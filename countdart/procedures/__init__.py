@@ -1,5 +1,4 @@
 """ This module contains all procedures for counting darts """
 
-from .collector import MainCollector  # noqa: F401
 from .debug_recorder import DebugRecorder  # noqa: F401
 from .standard import StandardProcedure  # noqa: F401
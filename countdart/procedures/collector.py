@@ -1,29 +1,168 @@
-"""This module contains the default/standard algorithm to detect darts."""
+"""This module contains the fusion of the results of all cams of a dartboard."""
 
 
-import json
-import time
-from time import sleep
+import math
 from typing import Dict, List, Optional, Tuple
 
-import redis
-from celery.contrib.abortable import AbortableTask
-from celery.utils.log import get_task_logger
-
-from countdart.celery_app import celery_app
-from countdart.database import schemas
 from countdart.database.schemas import ResultMessage
-from countdart.settings import settings
+from countdart.utils.tracing import stamp
+
+# number of fused results kept in the result stream of a dartboard
+RESULT_STREAM_MAXLEN = 1000
+
+
+# stream of all confirmed dart throws, which are persisted by the ThrowWriter
+THROW_STREAM = "dart_throws"
+THROW_STREAM_MAXLEN = 100000
+
+
+def throw_fields(
+    dartboard_id: str, timestamp: float, result: ResultMessage
+) -> Dict[str, str]:
+    """Returns the fields of an entry of the throw stream.
+
+    Args:
+        dartboard_id (str): id of the dartboard
+        timestamp (float): time of the throw
+        result (ResultMessage): confirmed result of a dart
+
+    Returns:
+        Dict[str, str]: fields of the stream entry
+    """
+    return {
+        "dartboard_id": dartboard_id,
+        "timestamp": repr(timestamp),
+        "data": result.content.model_dump_json(),
+    }
+
+
+def result_key(dartboard_id: str) -> str:
+    """Returns the redis key of the latest fused result of a dartboard"""
+    return f"dartboard_{dartboard_id}_result"
+
+
+def result_stream_key(dartboard_id: str) -> str:
+    """Returns the redis key of the capped stream of all fused results
+    of a dartboard. Clients can resume from the id of the last entry
+    they received."""
+    return f"dartboard_{dartboard_id}_result_stream"
+
+
+class CamLag:
+    """Online estimate of the lag of a cam, i.e. the seconds between the first
+    result of a throw (from any cam) and the result of this cam.
+    Mean and variance are exponential moving averages, so the estimate
+    follows slow changes, e.g. a cam under more load.
+
+    Args:
+        smoothing (float, optional): weight of a new sample. Defaults to 0.1.
+    """
 
-logger = get_task_logger(__name__)
+    def __init__(self, smoothing: float = 0.1):
+        self.smoothing = smoothing
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
 
+    @property
+    def std(self) -> float:
+        """Standard deviation of the lag"""
+        return math.sqrt(self.var)
 
-class MainCollector(AbortableTask):
-    """Main task to collect results of procedures."""
+    def update(self, lag: float) -> None:
+        """Adds a new lag sample.
 
-    def __init__(self):
-        # use class name as name, otherwise celery will not find the task
-        self.name = self.__name__
+        Args:
+            lag (float): lag in seconds
+        """
+        if not self.count:
+            self.mean = lag
+        else:
+            diff = lag - self.mean
+            self.mean += self.smoothing * diff
+            self.var = (1 - self.smoothing) * (self.var + self.smoothing * diff**2)
+        self.count += 1
+
+
+class DartboardFusion:
+    """Fuses the results of all cams of one dartboard.
+    A fused result is published early, as soon as a quorum of cams agrees
+    on the class (and score). Otherwise it is published once all cams
+    sent a result, or the remaining cams are overdue. A cam is overdue if
+    its lag exceeds its usual lag plus `lag_stds` standard deviations,
+    bounded by `min_timeout` and `timeout`. Cams which never reported
+    are waited for `timeout` seconds.
+
+    If the late cams change the fused result, the corrected result is
+    published as well. If a cam sends a new result while its previous one
+    is not fused yet, the pending results are fused first, so no result is
+    overwritten.
+
+    Args:
+        cams (List[str]): ids of all cams of the dartboard
+        quorum (Optional[int], optional): number of agreeing cams for an early
+            result. Defaults to None, which means the majority of cams.
+        timeout (float, optional): maximum seconds to wait for the remaining
+            cams. Defaults to 1.
+        min_timeout (float, optional): minimum seconds to wait for the
+            remaining cams. Defaults to 0.05.
+        lag_stds (float, optional): standard deviations of the lag of a cam,
+            which are waited additionally to its mean lag. Defaults to 3.
+    """
+
+    def __init__(
+        self,
+        cams: List[str],
+        quorum: Optional[int] = None,
+        timeout: float = 1,
+        min_timeout: float = 0.05,
+        lag_stds: float = 3,
+    ):
+        self.cams = cams
+        self.quorum = quorum if quorum else len(cams) // 2 + 1
+        self.timeout = timeout
+        self.min_timeout = min_timeout
+        self.lag_stds = lag_stds
+        self.lags = {cam_id: CamLag() for cam_id in cams}
+        # The latest result of each cam and if it was already fused
+        self.results: Dict[str, Optional[ResultMessage]] = dict.fromkeys(cams, None)
+        self._fused = dict.fromkeys(cams, True)
+        self._first_receive_time: Optional[float] = None
+        # trace of the first received result, used for the fused result
+        self._trace = None
+        # result, which was already published for the pending results
+        self._published: Optional[ResultMessage] = None
+        # seconds between the first received result and the fused result
+        self.latency = 0
+        # final fused results with the time of their first received result,
+        # not changed by late cams anymore
+        self.confirmed: List[Tuple[float, ResultMessage]] = []
+
+    def wait_time(self, cam_id: str) -> float:
+        """Seconds after the first result of a throw, after which the result
+        of the given cam is overdue.
+
+        Args:
+            cam_id (str): id of the cam
+
+        Returns:
+            float: seconds to wait for the cam
+        """
+        lag = self.lags[cam_id]
+        if not lag.count:
+            return self.timeout
+        wait = lag.mean + self.lag_stds * lag.std
+        return min(self.timeout, max(self.min_timeout, wait))
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """Time at which pending results are fused, if no other cam reports.
+        None if there are no pending results."""
+        if self._first_receive_time is None:
+            return None
+        missing = [cam_id for cam_id, fused in self._fused.items() if fused]
+        wait = max((self.wait_time(cam_id) for cam_id in missing), default=0)
+        return self._first_receive_time + wait
 
     @staticmethod
     def all_same(items: List[str]) -> bool:
@@ -59,97 +198,141 @@ class MainCollector(AbortableTask):
                 value = x
         return value, [i for i, x in enumerate(items) if x == value]
 
-    def run(self, dartboard_db: schemas.Dartboard):
-        """start image processing to detect darts."""
-        # initialize vars
-        dartboard_db = schemas.Dartboard(**dartboard_db)
-
-        r = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
-        # key where results are published
-        result_key = f"dartboard_{dartboard_db.id}_result"
-
-        # create result key
-        # The result is a dict for each cam with the result and if it was published
-        all_results: Dict[str, Optional[ResultMessage]]
-        all_results = dict.fromkeys(dartboard_db.cams, None)
-        result_publish_status = dict.fromkeys(dartboard_db.cams, True)
-        prev_results = dict.fromkeys(dartboard_db.cams, None)
-
-        # delete redis list and init prev_result
-        # prev results contains tuple of result and if it was published
-        for cam_id in dartboard_db.cams:
-            r.delete(f"cam_{cam_id}_ResultPublisher")
-
-        # timeout variables to retrieve results from all cams
-        receive_time = 0
-        timout_sec = 1
-
-        # endless loop. Needs to be canceled by celery
-        while not self.is_aborted():
-            # check for new result
-            for cam_id in dartboard_db.cams:
-                result = r.get(f"cam_{cam_id}_ResultPublisher")
-                result = ResultMessage(**json.loads(result)) if result else None
-                if result and result != prev_results[cam_id]:
-                    all_results[cam_id] = result
-                    prev_results[cam_id] = result
-                    result_publish_status[cam_id] = False
-                    receive_time = time.time()
-
-            # conditions for result publishing
-            all_results_unpublished = all(
-                [not x for x in result_publish_status.values()]
+    @classmethod
+    def fuse(cls, results: List[Optional[ResultMessage]]) -> Optional[ResultMessage]:
+        """Fuses the results of all cams of a dartboard into one result.
+        The class with the most occurrences wins. For darts the score with a
+        majority is used, otherwise the score with the highest confidence.
+
+        Args:
+            results (List[Optional[ResultMessage]]): latest result of each cam
+
+        Returns:
+            Optional[ResultMessage]: fused result or None, if there is nothing
+                to publish
+        """
+        majority_cls, _ = cls.majority([x.cls for x in results if x])
+        if majority_cls == "hand":
+            return ResultMessage(cls="hand")
+        elif majority_cls == "dart":
+            # get all scores and also use majority
+            scores = [x.content.score if x and x.content else None for x in results]
+            # check if there is a majority score
+            _, indices = cls.majority(scores)
+            if len(indices) > len(scores) / 2:
+                return results[indices[0]]
+            # get max conf score
+            return max(
+                (x for x in results if x and x.content),
+                key=lambda x: x.content.confidence,
             )
-            wait_timout = receive_time != 0 and time.time() - receive_time > timout_sec
-
-            if all_results_unpublished or wait_timout:
-                # get majority class
-                majority_cls, _ = self.majority(
-                    [x.cls for x in all_results.values() if x]
-                )
-                if majority_cls == "hand":
-                    r.set(result_key, ResultMessage(cls="hand").model_dump_json())
-                elif majority_cls == "dart":
-                    # get all scores and also use majority
-                    scores = [
-                        x.content.score if x.content else None
-                        for x in all_results.values()
-                    ]
-                    confs = [
-                        x.content.confidence if x.content else None
-                        for x in all_results.values()
-                    ]
-                    # check if there is a majority score
-                    _, indices = self.majority(scores)
-                    if len(indices) > len(scores) / 2:
-                        r.set(
-                            result_key,
-                            all_results[
-                                dartboard_db.cams[indices[0]]
-                            ].model_dump_json(),
-                        )
-                    else:
-                        # get max conf score
-                        best_result = all_results[
-                            dartboard_db.cams[indices[confs.index(max(confs))]]
-                        ]
-                        r.set(result_key, best_result.model_dump_json())
-                elif majority_cls == "none":
-                    r.set(result_key, ResultMessage(cls="none").model_dump_json())
-
-                # Update publish status
-                result_publish_status = dict.fromkeys(dartboard_db.cams, True)
-
-                receive_time = 0
-            else:
-                sleep(0.1)
-        # Shutdown gracefully
-        r.set(result_key, ResultMessage(cls="off").model_dump_json())
-
-    def __call__(self, *args, **kwargs):
-        """will call run"""
-        return self.run(*args, **kwargs)
-
-
-# Add to celery tasks
-celery_app.register_task(MainCollector)
+        elif majority_cls == "none":
+            return ResultMessage(cls="none")
+        return None
+
+    @staticmethod
+    def _key(result: Optional[ResultMessage]) -> Tuple[str, Optional[str]]:
+        """Returns class and score of a result, to compare results"""
+        if result is None:
+            return "", None
+        return result.cls, result.content.score if result.content else None
+
+    def add(
+        self, cam_id: str, result: ResultMessage, now: float
+    ) -> List[ResultMessage]:
+        """Adds the result of a cam and returns all fused results, which
+        need to be published.
+
+        Args:
+            cam_id (str): id of the cam
+            result (ResultMessage): result of the cam
+            now (float): time of receiving the result
+
+        Returns:
+            List[ResultMessage]: fused results, in order of fusion
+        """
+        fused = []
+        # fuse pending results first, so no result is overwritten
+        if not self._fused[cam_id]:
+            fused.append(self.flush(now))
+        if self._first_receive_time is None:
+            self._first_receive_time = now
+            self._trace = result.trace
+        self.lags[cam_id].update(now - self._first_receive_time)
+        self.results[cam_id] = result
+        self._fused[cam_id] = False
+        pending = [self.results[x] for x, done in self._fused.items() if not done]
+        if len(pending) == len(self.cams):
+            # all cams sent a result
+            fused.append(self.flush(now))
+        elif (
+            self._published is None
+            and len(pending) >= self.quorum
+            and self.all_same([self._key(x) for x in pending])
+        ):
+            # quorum agrees, publish early and wait for the remaining cams
+            early = self._traced(self.fuse(pending), now)
+            if early:
+                self._published = early
+                self.latency = now - self._first_receive_time
+                fused.append(early)
+        return [x for x in fused if x]
+
+    def _traced(
+        self, fused: Optional[ResultMessage], now: float
+    ) -> Optional[ResultMessage]:
+        """Returns a copy of the fused result with the stamped trace of the
+        first received result"""
+        if fused is None or self._trace is None:
+            return fused
+        return fused.model_copy(update={"trace": stamp(self._trace, "fuse", now)})
+
+    def pop_confirmed(self) -> List[Tuple[float, ResultMessage]]:
+        """Returns and clears the confirmed results, i.e. results which will
+        not be corrected anymore by late cams.
+
+        Returns:
+            List[Tuple[float, ResultMessage]]: time of the first received result
+                and the fused result
+        """
+        confirmed, self.confirmed = self.confirmed, []
+        return confirmed
+
+    def poll(self, now: float) -> Optional[ResultMessage]:
+        """Returns the fused result, if the remaining cams are overdue.
+
+        Args:
+            now (float): current time
+
+        Returns:
+            Optional[ResultMessage]: fused result or None
+        """
+        deadline = self.deadline
+        if deadline is not None and now > deadline:
+            return self.flush(now)
+        return None
+
+    def flush(self, now: float) -> Optional[ResultMessage]:
+        """Fuses all results and resets the pending state.
+
+        Args:
+            now (float): current time
+
+        Returns:
+            Optional[ResultMessage]: fused result or None, if there is nothing
+                to publish or the result was already published early
+        """
+        first_receive_time = self._first_receive_time
+        if first_receive_time is not None:
+            self.latency = now - first_receive_time
+        published = self._published
+        fused = self._traced(self.fuse(list(self.results.values())), now)
+        self._fused = dict.fromkeys(self.cams, True)
+        self._first_receive_time = None
+        self._published = None
+        self._trace = None
+        if fused is not None:
+            self.confirmed.append((first_receive_time or now, fused))
+        if published is not None and self._key(fused) == self._key(published):
+            return None
+        return fused
@@ -20,6 +20,7 @@ from countdart.operators import (
     HomographyWarper,
     HoughLineDetector,
     MotionDetector,
+    PrincipalAxisDetector,
     ResultPublisher,
     ResultVisualizer,
     ScoreCalculator,
@@ -27,6 +28,9 @@ from countdart.operators import (
 )
 from countdart.procedures.base import PROCEDURES, BaseProcedure
 from countdart.utils.dartboard_model import DartboardModel
+from countdart.utils.idle_monitor import IdleMonitor
+from countdart.utils.misc import BBox
+from countdart.utils.tracing import stamp
 
 logger = get_task_logger(__name__)
 
@@ -66,6 +70,7 @@ class StandardProcedure(BaseProcedure):
             BBoxDetector,
             SizeClassifier,
             HoughLineDetector,
+            PrincipalAxisDetector,
             DartTipCalculator,
             ScoreCalculator,
             ResultVisualizer,
@@ -97,6 +102,8 @@ class StandardProcedure(BaseProcedure):
             warper = HomographyWarper(
                 cam_db.calibration_points,
                 cam.image_size,
+                camera_matrix=cam_db.camera_matrix,
+                dist_coeffs=cam_db.dist_coeffs,
                 config=op_configs["HomographyWarper"],
                 redis_key=f"cam_{cam_db.id}",
             )
@@ -115,6 +122,10 @@ class StandardProcedure(BaseProcedure):
         line_detector = HoughLineDetector(
             config=op_configs["HoughLineDetector"], redis_key=f"cam_{cam_db.id}"
         )
+        axis_detector = PrincipalAxisDetector(
+            config=op_configs.get("PrincipalAxisDetector"),
+            redis_key=f"cam_{cam_db.id}",
+        )
         tip_calculator = DartTipCalculator()
         scorer = ScoreCalculator(dartboard_model, redis_key=f"cam_{cam_db.id}")
         visualizer = ResultVisualizer(redis_key=f"cam_{cam_db.id}")
@@ -123,47 +134,71 @@ class StandardProcedure(BaseProcedure):
 
         segmentor_last_update = time.time()
         segmentor_delay = 2  # second
+        idle_monitor = IdleMonitor()
 
         # endless loop. Needs to be canceled by celery
         while not self.is_aborted():
             frame = cam()
+            # skip frames, if there was no motion for some time
+            idle = idle_monitor.is_idle(motion.idle_timeout.value)
+            if idle_monitor.skip_frame(
+                motion.idle_timeout.value, motion.idle_frame_skip.value
+            ):
+                continue
             # calculate result
+            # crop frame to the dartboard, to avoid processing the background
+            roi_frame = frame
+            roi = BBox(0, 0, 1, 1)
             if warper:
                 warper(frame)
-            motion_mask = motion(frame)
-            _, size = bbox_detector(motion_mask)
-            cls = classifier(size)
+                roi_frame = warper.crop_to_roi(frame)
+                roi = warper.roi
+            motion_mask = motion(
+                roi_frame, resize=motion.idle_resize.value if idle else None
+            )
+            # first motion while idle switches back to full rate and resolution
+            idle_monitor.update(motion.had_motion)
+            motion_bbox, size = bbox_detector(motion_mask)
+            # size classifier expects size in relation to the full frame
+            cls = classifier(size * roi.w * roi.h)
             if cls == "dart":
-                segmented_image = segmentor(frame)
-                bbox_full, _ = bbox_detector(segmented_image)
-                line = line_detector(segmented_image, bbox_full)
+                # only segment the region with motion
+                segmented_image = segmentor(roi_frame, roi=motion_bbox)
+                bbox, _ = bbox_detector(segmented_image)
+                # check config here, because axis detector may not be called
+                axis_detector.receive_config_from_redis()
+                if axis_detector.enabled.value:
+                    line = axis_detector(segmented_image, bbox)
+                else:
+                    line = line_detector(segmented_image, bbox)
+                # map bounding box back to the full frame
+                bbox_full = bbox.to_parent(segmentor.crop).to_parent(roi)
                 img_tip = tip_calculator(frame, bbox_full, line)
                 if img_tip and warper:
                     dartboard_pt = warper.warp_point_to_model(img_tip[0], img_tip[1])
-                    dartboard_pt_conf = warper.warp_point_to_model(
-                        img_tip[0] + 1, img_tip[1] + 1
-                    )
-                    score, conf = scorer(dartboard_pt, dartboard_pt_conf)
+                    score_id, wire_distance = warper.score_at(img_tip[0], img_tip[1])
+                    score, conf = scorer(score_id, wire_distance)
                     visualizer(frame, bbox_full, cls, line, score, conf, img_tip)
                     publisher(
                         cls,
                         DartThrowBase(score=score, confidence=conf, point=dartboard_pt),
+                        trace=stamp(cam.trace(), "detect"),
                     )
                 # reset segmentor
-                motion.reset(frame)
-                segmentor.reset(frame)
+                motion.reset(roi_frame)
+                segmentor.reset(roi_frame)
             elif cls == "hand":
                 # take out in progress
-                publisher(cls)
-                motion.reset(frame)
-                segmentor.reset(frame)
+                publisher(cls, trace=stamp(cam.trace(), "detect"))
+                motion.reset(roi_frame)
+                segmentor.reset(roi_frame)
                 segmentor_last_update = time.time()
             fps_calculator()
             # update segmentor
             if time.time() - segmentor_last_update < segmentor_delay:
                 publisher(cls)
-                motion.reset(frame)
-                segmentor.reset(frame)
+                motion.reset(roi_frame)
+                segmentor.reset(roi_frame)
 
         # task was aborted so shutdown gracefully
         publisher("off")
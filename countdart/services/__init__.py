@@ -0,0 +1 @@
+"""Long running services, which run next to the API and the celery workers"""
@@ -0,0 +1,278 @@
+"""Collector service, which fuses the results of all active dartboards.
+
+A single asyncio process reads the result streams of all cams with one
+blocking XREAD. Dartboards are added and removed with control messages
+(see send_control_message), so no celery worker is blocked per dartboard.
+
+Run with: python -m countdart.services.collector
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+import redis
+import redis.asyncio as aioredis
+
+from countdart.database import schemas
+from countdart.database.schemas import ResultMessage
+from countdart.procedures.collector import (
+    RESULT_STREAM_MAXLEN,
+    THROW_STREAM,
+    THROW_STREAM_MAXLEN,
+    DartboardFusion,
+    result_key,
+    result_stream_key,
+    throw_fields,
+)
+from countdart.settings import settings
+from countdart.utils.result_codec import decode_result
+
+__all__ = ["CollectorService", "get_stats", "send_control_message"]
+
+CONTROL_STREAM = "collector_control"
+CONTROL_STREAM_MAXLEN = 1000
+# factor of the exponential moving average of the fusion latency
+LATENCY_SMOOTHING = 0.1
+
+
+def send_control_message(
+    r: redis.Redis, action: str, dartboard: schemas.Dartboard
+) -> None:
+    """Sends a control message to the collector service.
+
+    Args:
+        r (redis.Redis): redis connection
+        action (str): "add" or "remove"
+        dartboard (schemas.Dartboard): dartboard to add or remove
+    """
+    r.xadd(
+        CONTROL_STREAM,
+        {
+            "action": action,
+            "id": dartboard.id,
+            "cams": json.dumps(dartboard.cams),
+            "quorum": dartboard.quorum or 0,
+        },
+        maxlen=CONTROL_STREAM_MAXLEN,
+        approximate=True,
+    )
+
+
+def stats_key(dartboard_id: str) -> str:
+    """Returns the redis key of the latency statistics of a dartboard"""
+    return f"dartboard_{dartboard_id}_collector_stats"
+
+
+class CollectorService:
+    """Fuses the results of all active dartboards in one event loop.
+
+    Args:
+        r (aioredis.Redis): async redis connection
+    """
+
+    def __init__(self, r: aioredis.Redis):
+        self._r = r
+        self._boards: Dict[str, DartboardFusion] = {}
+        # last read id of each stream
+        self._streams: Dict[str, str] = {}
+        # stream name -> (dartboard id, cam id)
+        self._stream_cams: Dict[bytes, Tuple[str, str]] = {}
+
+    async def _last_id(self, stream: str) -> str:
+        """Returns id of the last entry of a stream, to only read new entries"""
+        last = await self._r.xrevrange(stream, count=1)
+        return last[0][0].decode() if last else "0-0"
+
+    async def add_dartboard(
+        self, dartboard_id: str, cams: List[str], quorum: Optional[int] = None
+    ) -> None:
+        """Starts to collect the results of the given dartboard.
+
+        Args:
+            dartboard_id (str): id of the dartboard
+            cams (List[str]): ids of all cams of the dartboard
+            quorum (Optional[int], optional): number of agreeing cams for an
+                early result. Defaults to None, the majority of cams.
+        """
+        await self.remove_dartboard(dartboard_id, publish_off=False)
+        self._boards[dartboard_id] = DartboardFusion(cams, quorum=quorum)
+        for cam_id in cams:
+            stream = f"cam_{cam_id}_ResultPublisher_stream"
+            self._streams[stream] = await self._last_id(stream)
+            self._stream_cams[stream.encode()] = (dartboard_id, cam_id)
+        await self._r.delete(stats_key(dartboard_id))
+        logging.info(f"Collecting results of dartboard {dartboard_id}")
+
+    async def remove_dartboard(self, dartboard_id: str, publish_off=True) -> None:
+        """Stops to collect the results of the given dartboard.
+
+        Args:
+            dartboard_id (str): id of the dartboard
+            publish_off (bool, optional): publish the "off" result.
+                Defaults to True.
+        """
+        if self._boards.pop(dartboard_id, None) is None:
+            return
+        for stream, (board_id, _) in list(self._stream_cams.items()):
+            if board_id == dartboard_id:
+                del self._stream_cams[stream]
+                del self._streams[stream.decode()]
+        if publish_off:
+            await self._publish(dartboard_id, ResultMessage(cls="off"))
+        logging.info(f"Stopped collecting results of dartboard {dartboard_id}")
+
+    async def _publish(
+        self, dartboard_id: str, result: ResultMessage, latency: float = None
+    ) -> None:
+        """Publishes fused result and updates latency statistics"""
+        encoded = result.model_dump_json()
+        pipe = self._r.pipeline()
+        pipe.set(result_key(dartboard_id), encoded)
+        pipe.xadd(
+            result_stream_key(dartboard_id),
+            {"data": encoded},
+            maxlen=RESULT_STREAM_MAXLEN,
+            approximate=True,
+        )
+        if latency is not None:
+            key = stats_key(dartboard_id)
+            stats = await self._r.hgetall(key)
+            mean = float(stats.get(b"mean_ms", latency * 1000))
+            mean += LATENCY_SMOOTHING * (latency * 1000 - mean)
+            pipe.hincrby(key, "count", 1)
+            pipe.hset(
+                key,
+                mapping={
+                    "last_ms": latency * 1000,
+                    "mean_ms": mean,
+                    "max_ms": max(float(stats.get(b"max_ms", 0)), latency * 1000),
+                },
+            )
+        await pipe.execute()
+
+    async def _publish_throws(self, dartboard_id: str, fusion: DartboardFusion):
+        """Appends confirmed darts to the throw stream. They are persisted
+        by the ThrowWriter, so the service never waits for the database."""
+        throws = [
+            (timestamp, x)
+            for timestamp, x in fusion.pop_confirmed()
+            if x.cls == "dart" and x.content
+        ]
+        if not throws:
+            return
+        pipe = self._r.pipeline()
+        for timestamp, throw in throws:
+            pipe.xadd(
+                THROW_STREAM,
+                throw_fields(dartboard_id, timestamp, throw),
+                maxlen=THROW_STREAM_MAXLEN,
+                approximate=True,
+            )
+        await pipe.execute()
+
+    async def _handle_control(self, fields: Dict[bytes, bytes]) -> None:
+        """Handles a control message"""
+        action = fields[b"action"].decode()
+        dartboard_id = fields[b"id"].decode()
+        if action == "add":
+            await self.add_dartboard(
+                dartboard_id,
+                json.loads(fields[b"cams"]),
+                quorum=int(fields.get(b"quorum", 0)),
+            )
+        elif action == "remove":
+            await self.remove_dartboard(dartboard_id)
+        else:
+            logging.warning(f"Unknown control action {action}")
+
+    def _block_ms(self) -> int:
+        """Returns milliseconds until the next deadline of a dartboard,
+        at most one second"""
+        deadlines = [b.deadline for b in self._boards.values() if b.deadline]
+        if not deadlines:
+            return 1000
+        return min(1000, max(1, int((min(deadlines) - time.time()) * 1000)))
+
+    async def restore(self) -> None:
+        """Adds all dartboards, which are active in the database.
+        Used on startup, to continue after a restart of the service."""
+        # import here, so the service can be used without database
+        from countdart.database.crud import dartboard as crud_dartboard
+
+        loop = asyncio.get_event_loop()
+        dartboards = await loop.run_in_executor(
+            None, lambda: crud_dartboard.get_dartboards(active=True)
+        )
+        for dartboard in dartboards:
+            await self.add_dartboard(dartboard.id, dartboard.cams, dartboard.quorum)
+
+    async def step(self) -> None:
+        """Waits for new results or control messages and handles them"""
+        response = await self._r.xread(self._streams, block=self._block_ms())
+        for stream, entries in response or []:
+            for entry_id, fields in entries:
+                if stream == CONTROL_STREAM.encode():
+                    self._streams[CONTROL_STREAM] = entry_id
+                    await self._handle_control(fields)
+                    continue
+                if stream not in self._stream_cams:
+                    # dartboard was removed by a control message
+                    break
+                self._streams[stream.decode()] = entry_id
+                dartboard_id, cam_id = self._stream_cams[stream]
+                fusion = self._boards[dartboard_id]
+                result = decode_result(fields[b"data"])
+                for fused in fusion.add(cam_id, result, time.time()):
+                    await self._publish(dartboard_id, fused, fusion.latency)
+        for dartboard_id, fusion in list(self._boards.items()):
+            fused = fusion.poll(time.time())
+            if fused:
+                await self._publish(dartboard_id, fused, fusion.latency)
+            await self._publish_throws(dartboard_id, fusion)
+
+    async def run(self, restore: bool = True) -> None:
+        """Runs the service until it is cancelled.
+
+        Args:
+            restore (bool, optional): add active dartboards of the database.
+                Defaults to True.
+        """
+        self._streams[CONTROL_STREAM] = await self._last_id(CONTROL_STREAM)
+        if restore:
+            await self.restore()
+        try:
+            while True:
+                await self.step()
+        finally:
+            for dartboard_id in list(self._boards):
+                await self.remove_dartboard(dartboard_id)
+
+
+def get_stats(r: redis.Redis, dartboard_id: str) -> Optional[Dict[str, float]]:
+    """Returns the latency statistics of a dartboard, published by the service.
+
+    Args:
+        r (redis.Redis): redis connection
+        dartboard_id (str): id of the dartboard
+
+    Returns:
+        Optional[Dict[str, float]]: count, last_ms, mean_ms and max_ms or None
+    """
+    stats = r.hgetall(stats_key(dartboard_id))
+    if not stats:
+        return None
+    return {k.decode(): float(v) for k, v in stats.items()}
+
+
+def main():
+    """Starts the collector service"""
+    logging.basicConfig(level=logging.INFO)
+    r = aioredis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+    asyncio.run(CollectorService(r).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Writer service, which persists the confirmed dart throws in the database.
+
+The collector appends confirmed throws to the throw stream, so it never waits
+for the database. The writer reads the stream as member of a consumer group,
+buffers the throws and saves them with a single insert_many, once the buffer
+is full or the oldest buffered throw waited for the flush interval.
+
+Entries are only acknowledged after they were saved. After a restart, the
+unacknowledged entries are read again, so every throw is saved at least once.
+Throws which are saved twice are skipped by the unique stream id.
+
+Run with: python -m countdart.services.throw_writer
+"""
+
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import redis
+
+from countdart.database import schemas
+from countdart.procedures.collector import THROW_STREAM
+from countdart.settings import settings
+
+__all__ = ["ThrowWriter", "to_dart_throw"]
+
+THROW_GROUP = "throw_writer"
+
+
+def to_dart_throw(
+    entry_id: bytes, fields: Dict[bytes, bytes]
+) -> schemas.DartThrowCreate:
+    """Converts an entry of the throw stream to a dart throw.
+
+    Args:
+        entry_id (bytes): id of the stream entry
+        fields (Dict[bytes, bytes]): fields of the stream entry
+
+    Returns:
+        schemas.DartThrowCreate: dart throw to save
+    """
+    throw = schemas.DartThrowBase.model_validate_json(fields[b"data"])
+    return schemas.DartThrowCreate(
+        **throw.model_dump(),
+        dartboard_id=fields[b"dartboard_id"].decode(),
+        timestamp=datetime.fromtimestamp(float(fields[b"timestamp"]), timezone.utc),
+        stream_id=entry_id.decode(),
+    )
+
+
+class ThrowWriter:
+    """Saves the throws of the throw stream in batches.
+
+    Args:
+        r (redis.Redis): redis connection
+        save (Callable[[List[schemas.DartThrowCreate]], int]): saves a batch of
+            throws, e.g. crud.dart_throw.create_dart_throws
+        batch_size (int, optional): maximum number of throws per batch.
+            Defaults to 100.
+        flush_interval (float, optional): maximum seconds a throw is buffered.
+            Defaults to 1.
+        consumer (str, optional): name in the consumer group. Needs to be the
+            same after a restart, to read the unacknowledged throws again.
+            Defaults to "writer".
+    """
+
+    def __init__(
+        self,
+        r: redis.Redis,
+        save: Callable[[List[schemas.DartThrowCreate]], int],
+        batch_size: int = 100,
+        flush_interval: float = 1,
+        consumer: str = "writer",
+    ):
+        self._r = r
+        self._save = save
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.consumer = consumer
+        self._buffer: List[Tuple[bytes, schemas.DartThrowCreate]] = []
+        self._first_buffered: Optional[float] = None
+        # earliest time to save again after saving failed
+        self._retry_time = 0.0
+        # Start with the unacknowledged entries of this consumer, then read
+        # new entries (">")
+        self._read_id = "0"
+
+    def create_group(self) -> None:
+        """Creates the consumer group, if it does not exist yet"""
+        try:
+            self._r.xgroup_create(THROW_STREAM, THROW_GROUP, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def add(
+        self, entry_id: bytes, fields: Optional[Dict[bytes, bytes]], now: float
+    ) -> None:
+        """Buffers an entry of the throw stream. Entries which can not be
+        converted are logged and acknowledged, so they are not read again
+        after a restart. The fields of pending entries are None, if the
+        entries were trimmed from the stream.
+
+        Args:
+            entry_id (bytes): id of the stream entry
+            fields (Optional[Dict[bytes, bytes]]): fields of the stream entry
+            now (float): current time
+        """
+        try:
+            throw = to_dart_throw(entry_id, fields)
+        except (KeyError, TypeError, ValueError):
+            logging.exception(f"Skip invalid throw stream entry {entry_id}: {fields}")
+            self._r.xack(THROW_STREAM, THROW_GROUP, entry_id)
+            return
+        self._buffer.append((entry_id, throw))
+        if self._first_buffered is None:
+            self._first_buffered = now
+
+    def due(self, now: float) -> bool:
+        """Returns true, if the buffered throws need to be saved"""
+        if not self._buffer or now < self._retry_time:
+            return False
+        return (
+            len(self._buffer) >= self.batch_size
+            or now - self._first_buffered >= self.flush_interval
+        )
+
+    def _block_ms(self, now: float) -> int:
+        """Milliseconds until the buffered throws need to be saved"""
+        if self._first_buffered is None:
+            return int(self.flush_interval * 1000)
+        wait = max(self._first_buffered + self.flush_interval, self._retry_time) - now
+        return max(1, int(wait * 1000))
+
+    def flush(self, now: float) -> int:
+        """Saves all buffered throws and acknowledges them. If saving fails,
+        the throws stay buffered and are saved again after the flush interval.
+
+        Args:
+            now (float): current time
+
+        Returns:
+            int: number of saved throws
+        """
+        if not self._buffer:
+            return 0
+        try:
+            saved = self._save([throw for _, throw in self._buffer])
+        except Exception:
+            logging.exception(f"Could not save {len(self._buffer)} dart throws")
+            self._retry_time = now + self.flush_interval
+            return 0
+        self._r.xack(THROW_STREAM, THROW_GROUP, *[x for x, _ in self._buffer])
+        self._buffer = []
+        self._first_buffered = None
+        return saved
+
+    def step(self) -> None:
+        """Reads new throws and saves them, if the buffer is due"""
+        count = self.batch_size - len(self._buffer)
+        if count > 0:
+            response = self._r.xreadgroup(
+                THROW_GROUP,
+                self.consumer,
+                {THROW_STREAM: self._read_id},
+                count=count,
+                block=self._block_ms(time.time()),
+            )
+            entries = response[0][1] if response else []
+            for entry_id, fields in entries:
+                self.add(entry_id, fields, time.time())
+            if self._read_id != ">":
+                # continue with the next unacknowledged entries, or with
+                # new entries once all of them were read
+                self._read_id = entries[-1][0].decode() if entries else ">"
+        else:
+            # buffer is full, but could not be saved
+            time.sleep(self._block_ms(time.time()) / 1000)
+        if self.due(time.time()):
+            self.flush(time.time())
+
+    def run(self) -> None:
+        """Runs the writer until it is interrupted"""
+        self.create_group()
+        try:
+            while True:
+                self.step()
+        finally:
+            self.flush(time.time())
+
+
+def main():
+    """Starts the throw writer"""
+    # import here, so the writer can be tested without database
+    from countdart.database.crud import dart_throw as crud_dart_throw
+
+    logging.basicConfig(level=logging.INFO)
+    crud_dart_throw.create_indexes()
+    r = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+    ThrowWriter(r, crud_dart_throw.create_dart_throws).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -38,5 +38,10 @@ class Settings(BaseSettings):
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
 
+    # Directory to cache homographies and warp maps. Empty string disables cache
+    WARP_CACHE_DIR: str = os.path.join(os.path.expanduser("~"), ".cache", "countdart")
+    # Maximum size of the cache in MB. The least recently used arrays are removed
+    WARP_CACHE_MAX_MB: int = 512
+
 
 settings = Settings()
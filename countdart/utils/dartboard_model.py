@@ -49,6 +49,32 @@ class DartboardModel:
         5,
     ]
 
+    # score ids in the score raster, to mark cells which need the analytic path
+    AMBIGUOUS_ID = 255
+
+    def __init__(self, score_resolution: float = 1.0):
+        """Initialize model.
+
+        Args:
+            score_resolution (float, optional): size of one cell in the score raster
+                in mm. Defaults to 1.0.
+        """
+        self.score_resolution = score_resolution
+        self._score_raster = None
+        # Each score has an id. The first 80 ids are the combination of
+        # ring (miss, single, double, triple) and segment, followed by bull
+        # and double bull
+        labels = []
+        values = []
+        for prefix, factor in (("M", 0), ("S", 1), ("D", 2), ("T", 3)):
+            for base_score in self.point_mapping:
+                labels.append(f"{prefix} {base_score}")
+                values.append(factor * base_score)
+        labels += ["BULL", "D BULL"]
+        values += [25, 50]
+        self.score_labels = np.array(labels, dtype=object)
+        self.score_values = np.array(values, dtype=np.int32)
+
     def get_outer_point(self, label: str) -> Tuple[int, int]:
         """Returns coordinates of the outer crosspoint in the dartboard
         coordinate system, between two given segments.
@@ -93,6 +119,143 @@ class DartboardModel:
         y = self.outer_double_ring * np.cos(np.radians(degree))
         return (x, y)
 
+    @property
+    def raster_radius(self) -> float:
+        """Radius in mm which is covered by the score raster"""
+        return self.outer_double_ring + self.score_resolution
+
+    @property
+    def model_to_raster(self) -> np.ndarray:
+        """Matrix to transform points in dartboard coordinate system
+        into pixel coordinates of the score raster.
+        The y axis is flipped, so the raster looks like the dartboard (20 on top).
+        Pixel centers are on integer coordinates, like in opencv.
+        """
+        scale = 1 / self.score_resolution
+        offset = self.raster_radius * scale - 0.5
+        return np.array([[scale, 0, offset], [0, -scale, offset], [0, 0, 1]])
+
+    @property
+    def score_raster(self) -> np.ndarray:
+        """Dense raster of score ids over the dartboard coordinate system.
+        Cells, which contain a ring or segment boundary have the
+        id AMBIGUOUS_ID. The raster is built on first access.
+        """
+        if self._score_raster is None:
+            self._score_raster = self._build_score_raster()
+        return self._score_raster
+
+    def _build_score_raster(self) -> np.ndarray:
+        """Builds score raster with the analytic path for each cell center
+        and marks all cells as ambiguous, which are crossed by a boundary.
+
+        Returns:
+            np.ndarray: score raster
+        """
+        res = self.score_resolution
+        radius = self.raster_radius
+        size = int(np.ceil(2 * radius / res))
+        centers = -radius + (np.arange(size) + 0.5) * res
+        xs, ys = np.meshgrid(centers, -centers)
+        points = np.stack([xs.ravel(), ys.ravel()], axis=1)
+        raster = self.get_score_ids_analytic(points).astype(np.uint8)
+        # distance of cell centers to the nearest ring and segment boundary
+        distance = np.hypot(points[:, 0], points[:, 1])
+        rings = np.array(
+            [
+                self.double_bull,
+                self.bull,
+                self.inner_triple_ring,
+                self.outer_triple_ring,
+                self.inner_double_ring,
+                self.outer_double_ring,
+            ]
+        )
+        ring_dist = np.abs(distance[:, None] - rings[None, :]).min(axis=1)
+        degree = np.rad2deg(np.arctan2(points[:, 0], points[:, 1]))
+        offset = (degree - self.start_degree) % self.degree_of_segment
+        offset = np.minimum(offset, self.degree_of_segment - offset)
+        segment_dist = distance * np.sin(np.radians(offset))
+        # add small tolerance for rounding errors
+        half_diagonal = res * np.sqrt(2) / 2 * (1 + 1e-6)
+        ambiguous = (ring_dist <= half_diagonal) | (segment_dist <= half_diagonal)
+        raster[ambiguous] = self.AMBIGUOUS_ID
+        return raster.reshape(size, size)
+
+    def get_score_ids_analytic(self, points: np.ndarray) -> np.ndarray:
+        """Returns score ids of given points in dartboard coordinate system.
+        The ids are calculated analytically from the distance and angle of each
+        point, like in get_score. This is exact, but slower than the score raster.
+
+        Args:
+            points (np.ndarray): N x 2 array of points
+
+        Returns:
+            np.ndarray: N score ids
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        x, y = points[:, 0], points[:, 1]
+        distance = np.sqrt(x * x + y * y)
+        # get degree in range [0, 360]
+        degree = np.rad2deg(np.arctan2(x, y)) % 360
+        # calculate in which segment the point is, with help of start degree
+        segment = (degree + self.start_degree) / self.degree_of_segment
+        segment = segment.astype(np.int64) % len(self.point_mapping)
+        n = len(self.point_mapping)
+        # check if double, triple, bull or miss
+        return np.select(
+            [
+                distance > self.outer_double_ring,
+                distance > self.inner_double_ring,
+                (distance > self.inner_triple_ring)
+                & (distance < self.outer_triple_ring),
+                (distance > self.double_bull) & (distance < self.bull),
+                distance < self.double_bull,
+            ],
+            [segment, 2 * n + segment, 3 * n + segment, 4 * n, 4 * n + 1],
+            default=n + segment,
+        )
+
+    def get_score_ids(self, points: np.ndarray) -> np.ndarray:
+        """Returns score ids of given points in dartboard coordinate system.
+        The ids are looked up in the score raster. Points outside the raster
+        or close to a boundary are calculated with the analytic path.
+
+        Args:
+            points (np.ndarray): N x 2 array of points
+
+        Returns:
+            np.ndarray: N score ids
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        raster = self.score_raster
+        size = raster.shape[0]
+        radius = self.raster_radius
+        cols = np.floor((points[:, 0] + radius) / self.score_resolution)
+        rows = np.floor((radius - points[:, 1]) / self.score_resolution)
+        inside = (cols >= 0) & (cols < size) & (rows >= 0) & (rows < size)
+        ids = np.full(len(points), self.AMBIGUOUS_ID, dtype=np.int64)
+        ids[inside] = raster[
+            rows[inside].astype(np.int64), cols[inside].astype(np.int64)
+        ]
+        exact = ids == self.AMBIGUOUS_ID
+        if np.any(exact):
+            ids[exact] = self.get_score_ids_analytic(points[exact])
+        return ids
+
+    def get_scores(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the scores of multiple points, like get_score.
+        Uses the score raster for a fast lookup.
+
+        Args:
+            points (np.ndarray): N x 2 array of points in dartboard coordinate system
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: N descriptional strings and N scores
+        """
+        ids = self.get_score_ids(points)
+        return self.score_labels[ids], self.score_values[ids]
+
     def get_score(self, point_2d: Tuple[float, float]) -> Tuple[str, int]:
         """Returns the score in a descriptional string and as integer,
         given a 2d point (x, y) in dartboard coordinate system.
@@ -104,6 +267,7 @@ class DartboardModel:
          - BULL for bull
          - D BULL for double bull
 
+        Use get_scores for many points.
 
         Args:
             point_2d (np.ndarray[float, float]): 2d point in dartboard coordinate system
@@ -111,9 +275,12 @@ class DartboardModel:
         Returns:
             Tuple[str, int]: descriptional string and score
         """
-        distance = np.linalg.norm(point_2d)
+        x, y = float(point_2d[0]), float(point_2d[1])
+        # same formula as in get_score_ids_analytic, so that both
+        # return the same score for points on the boundaries
+        distance = np.sqrt(x * x + y * y)
         # get degree in range [0, 360]
-        degree = np.rad2deg(np.arctan2(point_2d[0], point_2d[1])) % 360
+        degree = np.rad2deg(np.arctan2(x, y)) % 360
         # calculate in which segment the point is, with help of start degree
         segment = (degree + self.start_degree) / self.degree_of_segment
         # get base_score from point mapping
@@ -0,0 +1,52 @@
+"""Monitor to decide, if a procedure is idle and may skip frames."""
+
+import time
+
+__all__ = ["IdleMonitor"]
+
+
+class IdleMonitor:
+    """Keeps track of the last motion in a procedure.
+    If there was no motion for a given timeout, the procedure is idle
+    and only needs to process every k-th frame. On the first motion
+    the procedure is active again and processes every frame.
+    """
+
+    def __init__(self):
+        self._last_motion = time.time()
+        self._frame_count = 0
+
+    def is_idle(self, timeout: float) -> bool:
+        """Returns True, if there was no motion for the given timeout.
+
+        Args:
+            timeout (float): seconds without motion until idle
+        """
+        return time.time() - self._last_motion > timeout
+
+    def skip_frame(self, timeout: float, frame_skip: int) -> bool:
+        """Returns True, if the current frame should not be processed.
+        Should be called once for each frame.
+
+        Args:
+            timeout (float): seconds without motion until idle
+            frame_skip (int): process only every k-th frame while idle
+
+        Returns:
+            bool: True, if the frame should be skipped
+        """
+        if not self.is_idle(timeout):
+            self._frame_count = 0
+            return False
+        self._frame_count += 1
+        return self._frame_count % frame_skip != 0
+
+    def update(self, motion: bool) -> None:
+        """Updates the monitor with the motion of a processed frame.
+
+        Args:
+            motion (bool): True, if the frame contained motion
+        """
+        if motion:
+            self._last_motion = time.time()
+            self._frame_count = 0
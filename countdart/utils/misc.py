@@ -8,6 +8,19 @@ import numpy as np
 from countdart.database.schemas.config import AllConfigModel
 
 
+def notification_channel(key: str) -> str:
+    """Returns the pub/sub channel, on which changes of a redis key are
+    announced. Consumers subscribe to it instead of polling the key.
+
+    Args:
+        key (str): redis key
+
+    Returns:
+        str: name of the channel
+    """
+    return f"{key}_notify"
+
+
 def encode_numpy(array: np.ndarray) -> bytes:
     """Encodes numpy array to bytes. Will save shape of array in bytes string.
     The decode function assumes the array is in uint8.
@@ -174,6 +187,40 @@ class BBox:
         """
         return BBox(bbox[0] / img_w, bbox[1] / img_h, bbox[2] / img_w, bbox[3] / img_h)
 
+    def to_parent(self, parent: "BBox") -> "BBox":
+        """Converts this bounding box, given in percentages of a region inside an
+        image, to percentages of the whole image. The region is given by the parent
+        bounding box in percentages of the whole image.
+        This is used to map results on cropped images back to the full image.
+
+        Args:
+            parent (BBox): region in which this bounding box lies
+
+        Returns:
+            BBox: bounding box in percentages of the whole image
+        """
+        return BBox(
+            parent.x + self.x * parent.w,
+            parent.y + self.y * parent.h,
+            self.w * parent.w,
+            self.h * parent.h,
+        )
+
+    def pad(self, pad_x: float, pad_y: float) -> "BBox":
+        """Pads this bounding box on each side and clips it to the image.
+
+        Args:
+            pad_x (float): padding in percentages of the image width
+            pad_y (float): padding in percentages of the image height
+
+        Returns:
+            BBox: padded bounding box
+        """
+        x1, y1 = max(self.x - pad_x, 0), max(self.y - pad_y, 0)
+        x2 = min(self.x + self.w + pad_x, 1)
+        y2 = min(self.y + self.h + pad_y, 1)
+        return BBox(x1, y1, x2 - x1, y2 - y1)
+
 
 @dataclass
 class Line:
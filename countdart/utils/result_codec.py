@@ -0,0 +1,173 @@
+"""Compact binary encoding of result messages.
+
+Results are published by each cam and read by the collector and the live
+views. The encoding is a header (version, flags, id of cls) followed by the
+content and the trace of the message, see encode_result.
+"""
+
+import struct
+from typing import Dict, Optional, Tuple
+
+from countdart.database.schemas import ResultMessage, Trace
+from countdart.utils.tracing import HOPS
+
+__all__ = [
+    "RESULT_CLASSES",
+    "RESULT_SCORES",
+    "RESULT_VERSION",
+    "add_trace",
+    "decode_result",
+    "encode_result",
+]
+
+# Version of the binary layout. Needs to be increased with any change of the
+# layout or of the tables below
+RESULT_VERSION = 2
+# Header: version, flags, id of cls
+_RESULT_HEADER = struct.Struct(">BBB")
+# Content: confidence, point x, point y, id of score
+_RESULT_CONTENT = struct.Struct(">dddB")
+_RESULT_HAS_CONTENT = 1
+# Trace: length of id, id, number of stamps and stamps (index of hop, time)
+_RESULT_HAS_TRACE = 2
+_TRACE_STAMP = struct.Struct(">Bd")
+# Known classes and scores are encoded as index in these tables. Other
+# strings are encoded as _STRING_ID followed by length and string.
+# The tables are part of the format, entries may only be appended
+RESULT_CLASSES = ("none", "hand", "dart", "off")
+# sectors clockwise from the top, for each ring (miss, single, double, triple)
+_SECTORS = (20, 1, 18, 4, 13, 6, 10, 15, 2, 17, 3, 19, 7, 16, 8, 11, 14, 9, 12, 5)
+RESULT_SCORES = tuple(f"{ring} {x}" for ring in "MSDT" for x in _SECTORS) + (
+    "BULL",
+    "D BULL",
+)
+_STRING_ID = 255
+_CLASS_IDS = {x: i for i, x in enumerate(RESULT_CLASSES)}
+_SCORE_IDS = {x: i for i, x in enumerate(RESULT_SCORES)}
+
+
+def _encode_id(value: str, ids: Dict[str, int]) -> bytes:
+    """Encodes a string as id of a table or as length and string"""
+    if value in ids:
+        return bytes([ids[value]])
+    encoded = value.encode()
+    return bytes([_STRING_ID, len(encoded)]) + encoded
+
+
+def _decode_string(data: bytes, offset: int) -> Tuple[str, int]:
+    """Decodes a string, which is not in a table (see _encode_id), where offset
+    points to its length. Returns the string and the offset after it."""
+    end = offset + 1 + data[offset]
+    return data[offset + 1 : end].decode(), end
+
+
+def encode_result(message: ResultMessage) -> bytes:
+    """Encodes result message to a compact versioned binary format.
+    The format is a header (version, flags, id of cls) followed by the
+    confidence, the point and the id of the score of the dart throw, if the
+    message has a content. Ids are indices of RESULT_CLASSES and
+    RESULT_SCORES, other strings are appended after the id. The trace is
+    appended last, see add_trace.
+
+    Args:
+        message (ResultMessage): result message
+
+    Returns:
+        bytes: encoded message
+    """
+    content = message.content
+    flags = _RESULT_HAS_CONTENT if content else 0
+    cls = _encode_id(message.cls, _CLASS_IDS)
+    encoded = _RESULT_HEADER.pack(RESULT_VERSION, flags, cls[0]) + cls[1:]
+    if content:
+        score = _encode_id(content.score, _SCORE_IDS)
+        encoded += (
+            _RESULT_CONTENT.pack(
+                content.confidence, content.point[0], content.point[1], score[0]
+            )
+            + score[1:]
+        )
+    if message.trace:
+        encoded = add_trace(encoded, message.trace)
+    return encoded
+
+
+def add_trace(encoded: bytes, trace: Trace) -> bytes:
+    """Appends a trace to a result message encoded with encode_result.
+    Allows to compare encoded messages without their traces.
+
+    Args:
+        encoded (bytes): encoded message without trace
+        trace (Trace): trace to append
+
+    Returns:
+        bytes: encoded message with trace
+    """
+    trace_id = trace.id.encode()
+    stamps = [(HOPS.index(hop), t) for hop, t in trace.stamps.items()]
+    return b"".join(
+        [
+            encoded[:1],
+            bytes([encoded[1] | _RESULT_HAS_TRACE]),
+            encoded[2:],
+            bytes([len(trace_id)]),
+            trace_id,
+            bytes([len(stamps)]),
+        ]
+        + [_TRACE_STAMP.pack(*x) for x in stamps]
+    )
+
+
+def _decode_trace(data: bytes, offset: int) -> Trace:
+    """Decodes the trace appended by add_trace, which starts at offset"""
+    id_len = data[offset]
+    trace_id = data[offset + 1 : offset + 1 + id_len].decode()
+    offset += 1 + id_len
+    stamps = {}
+    for _ in range(data[offset]):
+        hop, t = _TRACE_STAMP.unpack_from(data, offset + 1)
+        stamps[HOPS[hop]] = t
+        offset += _TRACE_STAMP.size
+    return Trace(id=trace_id, stamps=stamps)
+
+
+def decode_result(data: bytes) -> ResultMessage:
+    """Decodes result message encoded with encode_result.
+    Json encoded messages are still supported.
+
+    Args:
+        data (bytes): encoded message
+
+    Raises:
+        ValueError: if the version of the message is not supported
+
+    Returns:
+        ResultMessage: decoded message
+    """
+    if data[0] == 123:  # "{"
+        return ResultMessage.model_validate_json(data)
+    version, flags, cls_id = _RESULT_HEADER.unpack_from(data)
+    if version != RESULT_VERSION:
+        raise ValueError(f"Result message version {version} is not supported")
+    offset = _RESULT_HEADER.size
+    if cls_id == _STRING_ID:
+        cls, offset = _decode_string(data, offset)
+    else:
+        cls = RESULT_CLASSES[cls_id]
+    content: Optional[dict] = None
+    if flags & _RESULT_HAS_CONTENT:
+        confidence, x, y, score_id = _RESULT_CONTENT.unpack_from(data, offset)
+        offset += _RESULT_CONTENT.size
+        if score_id == _STRING_ID:
+            score, offset = _decode_string(data, offset)
+        else:
+            score = RESULT_SCORES[score_id]
+        content = {"score": score, "confidence": confidence, "point": (x, y)}
+    trace = None
+    if flags & _RESULT_HAS_TRACE:
+        trace = _decode_trace(data, offset)
+    # validated with a single call, which is cheaper than creating the
+    # content and the message separately
+    return ResultMessage.model_validate(
+        {"cls": cls, "content": content, "trace": trace}
+    )
@@ -0,0 +1,112 @@
+"""Tracing of results from capturing a frame until sending the result to the game.
+
+A trace is started for the frame in which a result was detected and stamped
+with the current time at each stage (see HOPS). When the result is sent to
+the game, the duration of each hop is pushed to a capped redis list, from
+which rolling percentiles are calculated.
+
+All stages need to run on machines with synchronized clocks, as the
+timestamps of different processes are compared.
+"""
+
+import time
+from typing import Dict, Optional
+
+import numpy as np
+import redis
+
+from countdart.database.schemas import Trace
+
+__all__ = ["HOPS", "get_hop_percentiles", "new_trace", "record_trace", "stamp"]
+
+# stages of a result in order. The duration of a hop is the time between
+# the previous stage and this stage
+HOPS = ("capture", "detect", "publish", "fuse", "send")
+# number of durations kept per hop
+TRACE_HISTORY = 1000
+PERCENTILES = (50, 90, 99)
+
+
+def hop_key(hop: str) -> str:
+    """Returns redis key of the list of durations of a hop"""
+    return f"trace_hop_{hop}"
+
+
+def new_trace(trace_id: str, capture_time: float) -> Trace:
+    """Starts a new trace.
+
+    Args:
+        trace_id (str): unique id of the trace
+        capture_time (float): time at which the frame was captured
+
+    Returns:
+        Trace: new trace
+    """
+    return Trace(id=trace_id, stamps={"capture": capture_time})
+
+
+def stamp(trace: Optional[Trace], hop: str, now: float = None) -> Optional[Trace]:
+    """Returns a copy of the trace with the time of the given hop.
+    The trace is copied, because it may be shared by multiple results.
+
+    Args:
+        trace (Optional[Trace]): trace to stamp. None is passed through.
+        hop (str): name of the hop, one of HOPS
+        now (float, optional): time of the hop. Defaults to the current time.
+
+    Returns:
+        Optional[Trace]: stamped trace
+    """
+    if trace is None:
+        return None
+    stamps = dict(trace.stamps)
+    stamps[hop] = time.time() if now is None else now
+    return Trace(id=trace.id, stamps=stamps)
+
+
+def record_trace(pipe: redis.client.Pipeline, trace: Trace) -> None:
+    """Adds the commands to push the durations of all hops of a trace and the
+    total duration to their capped lists. The pipeline needs to be executed
+    by the caller, so it can be a pipeline of a sync or an async connection.
+
+    Args:
+        pipe (redis.client.Pipeline): redis pipeline
+        trace (Trace): trace to record
+    """
+    stamps = [(hop, trace.stamps[hop]) for hop in HOPS if hop in trace.stamps]
+    if len(stamps) < 2:
+        return
+    durations = {
+        hop: (t - prev_t) * 1000
+        for (_, prev_t), (hop, t) in zip(stamps[:-1], stamps[1:])
+    }
+    durations["total"] = (stamps[-1][1] - stamps[0][1]) * 1000
+    for hop, duration in durations.items():
+        pipe.lpush(hop_key(hop), duration)
+        pipe.ltrim(hop_key(hop), 0, TRACE_HISTORY - 1)
+
+
+def get_hop_percentiles(r: redis.Redis) -> Dict[str, Dict[str, float]]:
+    """Calculates the percentiles of the latest durations of each hop.
+
+    Args:
+        r (redis.Redis): redis connection
+
+    Returns:
+        Dict[str, Dict[str, float]]: count and percentiles (p50, p90, p99) in
+            milliseconds for each hop with recorded durations
+    """
+    hops = HOPS[1:] + ("total",)
+    pipe = r.pipeline()
+    for hop in hops:
+        pipe.lrange(hop_key(hop), 0, -1)
+    result = {}
+    for hop, values in zip(hops, pipe.execute()):
+        if not values:
+            continue
+        durations = np.array(values, dtype=np.float64)
+        stats = {"count": float(len(durations))}
+        for p, value in zip(PERCENTILES, np.percentile(durations, PERCENTILES)):
+            stats[f"p{p}"] = float(value)
+        result[hop] = stats
+    return result
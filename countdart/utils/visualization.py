@@ -0,0 +1,61 @@
+"""Functions to visualize detection results in images"""
+
+import cv2
+import numpy as np
+
+from countdart.database.schemas import OverlayMessage
+from countdart.utils.misc import BBox, Line
+
+
+def draw_overlay(image: np.ndarray, overlay: OverlayMessage) -> np.ndarray:
+    """Draws the bounding box with its label, the found line, the dart tip
+    and the score onto the given image. The image is modified in place.
+
+    Args:
+        image (np.ndarray): RGB image with 3 channels
+        overlay (OverlayMessage): overlay to draw
+
+    Returns:
+        np.ndarray: visualized image
+    """
+    img_h, img_w = image.shape[:2]
+    x, y, w, h = BBox(*overlay.bbox).to_pixel(img_h, img_w)
+    # draw bbox on image
+    cv2.rectangle(image, (x, y), (x + w, y + h), color=(255, 0, 0), thickness=2)
+    # draw label
+    cv2.putText(
+        image,
+        overlay.label,
+        (x, y),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        fontScale=2,
+        color=(255, 0, 0),
+        thickness=2,
+    )
+    # draw score
+    cv2.putText(
+        image,
+        f"{overlay.score}, {round(overlay.confidence, 1)}",
+        (0, img_h),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        fontScale=2,
+        color=(255, 0, 0),
+        thickness=4,
+    )
+    # draw line
+    if overlay.line:
+        # convert from percentage to pixel
+        lx1, ly1, lx2, ly2 = Line(*overlay.line).to_pixel(h, w)
+        # draw line with offset of bounding box
+        cv2.line(
+            image,
+            (lx1 + x, ly1 + y),
+            (lx2 + x, ly2 + y),
+            color=(0, 0, 255),
+            thickness=2,
+        )
+    # draw point
+    if overlay.tip:
+        tip = (int(overlay.tip[0] * img_w), int(overlay.tip[1] * img_h))
+        cv2.circle(image, tip, 2, color=(0, 255, 0), thickness=-1)
+    return image
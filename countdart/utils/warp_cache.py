@@ -0,0 +1,132 @@
+"""Persistent cache for arrays which are expensive to calculate,
+e.g. homographies and warp maps. The arrays are saved as .npy files
+and loaded as memory-mapped arrays, so loading them is almost instant.
+The least recently used arrays are removed, once the cache exceeds its size.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Optional
+
+import numpy as np
+
+from countdart.settings import settings
+
+__all__ = ["WarpCache"]
+
+
+class WarpCache:
+    """Cache to save and load numpy arrays on disk.
+    Each entry is identified by a key, which should be created with
+    'create_key' from all parameters the arrays depend on, and a name.
+
+    If no cache directory is given, the directory from the settings is used.
+    If the directory is an empty string, the cache is disabled.
+
+    Args:
+        cache_dir (str, optional): directory to save the arrays in
+        max_bytes (int, optional): maximum size of all arrays in the cache.
+            Defaults to WARP_CACHE_MAX_MB from the settings.
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        self.cache_dir = settings.WARP_CACHE_DIR if cache_dir is None else cache_dir
+        if max_bytes is None:
+            max_bytes = settings.WARP_CACHE_MAX_MB * 1024 * 1024
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def create_key(**params: Any) -> str:
+        """Creates a key by hashing the given parameters.
+        All parameters need to be json serializable.
+
+        Returns:
+            str: hash of the parameters
+        """
+        encoded = json.dumps(params, sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()[:32]
+
+    def _path(self, key: str, name: str) -> str:
+        """Returns the file path of an entry"""
+        return os.path.join(self.cache_dir, f"{key}_{name}.npy")
+
+    def load(self, key: str, name: str) -> Optional[np.ndarray]:
+        """Loads array with given key and name as memory-mapped read only array.
+
+        Args:
+            key (str): key created with 'create_key'
+            name (str): name of the array
+
+        Returns:
+            Optional[np.ndarray]: cached array or None, if it does not exist
+        """
+        if not self.cache_dir:
+            return None
+        path = self._path(key, name)
+        if not os.path.exists(path):
+            return None
+        try:
+            array = np.load(path, mmap_mode="r")
+            # modification time marks the last use for the eviction
+            os.utime(path)
+            return array
+        except (OSError, ValueError):
+            logging.warning(f"Could not load cached array {path}")
+            return None
+
+    def save(self, key: str, name: str, array: np.ndarray) -> None:
+        """Saves array with given key and name. The file is written
+        to a temporary file first and then renamed, so concurrent
+        readers never see a partially written file.
+
+        Args:
+            key (str): key created with 'create_key'
+            name (str): name of the array
+            array (np.ndarray): array to save
+        """
+        if not self.cache_dir:
+            return
+        tmp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, self._path(key, name))
+        except OSError:
+            logging.warning(f"Could not save array {name} to cache {self.cache_dir}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.evict(keep=self._path(key, name))
+
+    def evict(self, keep: str = None) -> None:
+        """Removes the least recently used arrays, until the cache is
+        not larger than its maximum size.
+
+        Args:
+            keep (str, optional): path of an array, which is never removed
+        """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npy") and entry.path != keep:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        if keep is not None and os.path.exists(keep):
+            total += os.path.getsize(keep)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                # memory-mapped arrays stay readable after removing the file
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
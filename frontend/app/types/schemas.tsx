@@ -102,6 +102,8 @@ export interface ResultMessage extends BaseMessage {
     type: "result";
     cls: string;
     content: DartThrowSchema | undefined;
+    // id in the result stream, used to resume after a reconnect
+    id?: string;
 }
 
 export interface ImageMessage extends BaseMessage {
@@ -0,0 +1,109 @@
+import pytest
+
+from countdart.database.schemas import DartThrowBase, ResultMessage
+from countdart.procedures.collector import DartboardFusion
+from countdart.utils.tracing import new_trace
+
+
+def dart(score: str, confidence: float) -> ResultMessage:
+    """Dart result with given score and confidence"""
+    return ResultMessage(
+        cls="dart",
+        content=DartThrowBase(score=score, confidence=confidence, point=(0, 0)),
+    )
+
+
+def test_fuse():
+    """Majority class and score are used, otherwise the highest confidence"""
+    assert DartboardFusion.fuse([None, None]) is None
+    hand = ResultMessage(cls="hand")
+    assert DartboardFusion.fuse([hand, hand, dart("S 1", 1)]).cls == "hand"
+    result = DartboardFusion.fuse(
+        [dart("T 20", 0.5), dart("T 20", 0.4), dart("S 1", 1)]
+    )
+    assert result.content.score == "T 20"
+    result = DartboardFusion.fuse([dart("T 20", 0.5), dart("S 1", 0.9), None])
+    assert result.content.score == "S 1"
+
+
+def test_fusion():
+    """Results are fused if all cams reported or after the timeout"""
+    fusion = DartboardFusion(["a", "b"], timeout=1)
+    assert fusion.deadline is None
+    assert fusion.add("a", dart("T 20", 0.5), now=10) == []
+    # nothing is known about cam b yet
+    assert fusion.deadline == 11
+    fused = fusion.add("b", dart("T 20", 0.6), now=10.2)
+    assert [x.content.score for x in fused] == ["T 20"]
+    assert fusion.latency == pytest.approx(0.2)
+    # timeout of a single result, cam b usually lags 0.2 seconds
+    fusion.add("a", ResultMessage(cls="hand"), now=20)
+    assert fusion.deadline == pytest.approx(20.2)
+    assert fusion.poll(20.1) is None
+    assert fusion.poll(20.3).cls == "hand"
+    assert fusion.deadline is None
+    # a second result of the same cam does not overwrite the first one
+    fusion.add("a", dart("S 5", 0.9), now=30)
+    fused = fusion.add("a", ResultMessage(cls="hand"), now=30.1)
+    assert [x.cls for x in fused] == ["dart"]
+    assert fusion.poll(31.2).cls == "hand"
+
+
+def test_quorum():
+    """Agreeing quorum is published early, late cams only correct the result"""
+    fusion = DartboardFusion(["a", "b", "c"])
+    assert fusion.quorum == 2
+    assert fusion.add("a", dart("T 20", 0.5), now=10) == []
+    fused = fusion.add("b", dart("T 20", 0.6), now=10.1)
+    assert [x.content.score for x in fused] == ["T 20"]
+    # agreeing straggler does not publish again
+    assert fusion.add("c", dart("T 20", 0.7), now=10.3) == []
+    assert fusion.deadline is None
+    # the throw is confirmed once with the time of the first result
+    confirmed = fusion.pop_confirmed()
+    assert [(t, x.content.score) for t, x in confirmed] == [(10, "T 20")]
+    assert fusion.pop_confirmed() == []
+    # no early result without agreement, the late cam decides
+    fusion.add("a", dart("T 20", 0.5), now=20)
+    assert fusion.add("b", dart("S 1", 0.6), now=20.1) == []
+    fused = fusion.add("c", dart("S 1", 0.7), now=20.2)
+    assert [x.content.score for x in fused] == ["S 1"]
+    # disagreeing straggler corrects the early result
+    fusion = DartboardFusion(["a", "b", "c"], quorum=1)
+    assert fusion.add("a", ResultMessage(cls="hand"), now=10)[0].cls == "hand"
+    assert fusion.add("b", dart("T 20", 0.6), now=10.1) == []
+    fused = fusion.add("c", dart("T 20", 0.6), now=10.2)
+    assert [x.cls for x in fused] == ["dart"]
+
+
+def test_adaptive_timeout():
+    """Wait for a cam is bounded by its observed lag"""
+    fusion = DartboardFusion(["a", "b"], quorum=2, timeout=1, min_timeout=0.05)
+    assert fusion.wait_time("b") == 1
+    for i in range(20):
+        fusion.add("a", ResultMessage(cls="hand"), now=i)
+        fusion.add("b", ResultMessage(cls="hand"), now=i + 0.1 + 0.01 * (i % 2))
+    assert fusion.lags["b"].mean == pytest.approx(0.105, abs=0.01)
+    assert 0.1 < fusion.wait_time("b") < 0.2
+    # cam a is always first
+    assert fusion.wait_time("a") == 0.05
+    # a slow cam is bounded by the timeout
+    for i in range(20, 40):
+        fusion.add("a", ResultMessage(cls="hand"), now=i)
+        fusion.add("b", ResultMessage(cls="hand"), now=i + 5)
+    assert fusion.wait_time("b") == 1
+
+
+def test_fusion_trace():
+    """Fused result has the trace of the first result, stamped at fusion"""
+    fusion = DartboardFusion(["a", "b"])
+    first = dart("T 20", 0.5)
+    first.trace = new_trace("a-1", 9.5)
+    second = dart("T 20", 0.6)
+    second.trace = new_trace("b-1", 9.6)
+    fusion.add("a", first, now=10)
+    fused = fusion.add("b", second, now=10.2)[0]
+    assert fused.trace.id == "a-1"
+    assert fused.trace.stamps == {"capture": 9.5, "fuse": 10.2}
+    # results of the cams are not changed
+    assert "fuse" not in first.trace.stamps
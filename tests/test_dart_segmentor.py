@@ -0,0 +1,40 @@
+import cv2
+import numpy as np
+import pytest
+
+from countdart.operators import BBoxDetector, DartSegmentor
+from countdart.utils.misc import BBox
+
+
+def dart_frame(dart: bool) -> np.ndarray:
+    """Frame with noise and optionally a dart like line"""
+    frame = np.random.default_rng(0).integers(0, 30, (720, 1280, 3), dtype=np.uint8)
+    if dart:
+        cv2.line(frame, (500, 300), (700, 420), (255, 255, 255), thickness=6)
+    return frame
+
+
+def test_segment_roi():
+    """Segmentation of the motion region matches the full segmentation"""
+    bbox_detector = BBoxDetector()
+    segmentor = DartSegmentor()
+    segmentor.reset(dart_frame(False))
+    full_bbox, _ = bbox_detector(segmentor(dart_frame(True)))
+
+    segmentor.reset(dart_frame(False))
+    motion_bbox = BBox.from_pixel((510, 310, 150, 90), 720, 1280)
+    mask = segmentor(dart_frame(True), roi=motion_bbox)
+    assert mask.shape < (720, 1280)
+    bbox, _ = bbox_detector(mask)
+    bbox = bbox.to_parent(segmentor.crop)
+    for value, expected in zip(bbox.to_pixel(720, 1280), full_bbox.to_pixel(720, 1280)):
+        assert value == pytest.approx(expected, abs=1)
+
+
+def test_bbox_pad():
+    """Padded bounding box is clipped to the image"""
+    bbox = BBox(0.05, 0.5, 0.5, 0.25).pad(0.1, 0.1)
+    assert bbox.x == 0
+    assert bbox.w == pytest.approx(0.65)
+    assert bbox.y == pytest.approx(0.4)
+    assert bbox.h == pytest.approx(0.45)
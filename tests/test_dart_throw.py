@@ -0,0 +1,67 @@
+from datetime import datetime
+
+from countdart.database.crud.dart_throw import (
+    HEATMAP_BIN_SIZE,
+    HEATMAP_RADIUS,
+    heatmap_cell,
+    stats_increments,
+    stats_updates,
+)
+from countdart.database.schemas import DartThrowCreate
+
+
+def dart_throw(
+    dartboard_id: str, score: str, point=(0, 0), stream_id: str = "0-0"
+) -> DartThrowCreate:
+    """Throw with given score and point"""
+    return DartThrowCreate(
+        score=score,
+        confidence=1,
+        point=point,
+        dartboard_id=dartboard_id,
+        timestamp=datetime.now(),
+        stream_id=stream_id,
+    )
+
+
+def test_heatmap_cell():
+    """Points are assigned to cells, points outside of the heatmap are skipped"""
+    size = 2 * HEATMAP_RADIUS // HEATMAP_BIN_SIZE
+    assert heatmap_cell((0, 0)) == (size // 2, size // 2)
+    assert heatmap_cell((-HEATMAP_RADIUS, -HEATMAP_RADIUS)) == (0, 0)
+    assert heatmap_cell((HEATMAP_RADIUS - 0.1, 0)) == (size - 1, size // 2)
+    assert heatmap_cell((HEATMAP_RADIUS, 0)) is None
+    assert heatmap_cell((0, -HEATMAP_RADIUS - 1)) is None
+
+
+def test_stats_increments():
+    """Throws are summed up per dartboard"""
+    increments = stats_increments(
+        [
+            dart_throw("a", "T 20", (0, 103)),
+            dart_throw("a", "T 20", (1, 104)),
+            dart_throw("a", "D BULL"),
+            dart_throw("b", "M 3", (0, -500)),
+        ]
+    )
+    assert increments["a"]["count"] == 3
+    assert increments["a"]["score_sum"] == 170
+    assert increments["a"]["segments.T 20"] == 2
+    assert sum(v for k, v in increments["a"].items() if "heatmap" in k) == 3
+    assert increments["b"] == {"count": 1, "score_sum": 0, "segments.M 3": 1}
+
+
+def test_stats_updates():
+    """Throws already applied to the statistics are not counted again"""
+    throws = [
+        dart_throw("a", "T 20", stream_id="1-0"),
+        dart_throw("a", "S 5", stream_id="2-0"),
+        dart_throw("b", "S 1", stream_id="3-0"),
+    ]
+    updates = stats_updates(throws, {"a": {"1-0"}, "b": {"3-0"}})
+    assert len(updates) == 1
+    update = updates[0]._doc
+    assert updates[0]._filter == {"_id": "a", "applied_ids": {"$nin": ["2-0"]}}
+    assert update["$inc"]["count"] == 1
+    assert update["$push"]["applied_ids"]["$each"] == ["2-0"]
+    assert stats_updates(throws, {"a": {"1-0", "2-0"}, "b": {"3-0"}}) == []
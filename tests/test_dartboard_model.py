@@ -65,3 +65,35 @@ def test_get_outer_points(model):
     assert point == (-26.59385905683929, 167.9070179011734)
     point = model.get_outer_point("20 | 5")
     assert point == (-26.59385905683929, 167.9070179011734)
+
+
+@pytest.mark.parametrize("resolution", [0.5, 1.0, 2.0])
+def test_get_scores(resolution):
+    """Raster lookup matches the analytic path, also on the boundaries"""
+    model = DartboardModel(score_resolution=resolution)
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-200, 200, (5000, 2))
+    # points exactly on and close to rings and segment boundaries
+    radii = np.array(
+        [
+            model.double_bull,
+            model.bull,
+            model.inner_triple_ring,
+            model.outer_triple_ring,
+            model.inner_double_ring,
+            model.outer_double_ring,
+        ]
+    )
+    radii = np.concatenate([radii, radii + 1e-9, radii - 1e-9])
+    angles = np.radians(np.arange(0, 360, model.start_degree))
+    boundary = np.stack(
+        [
+            np.outer(radii, np.sin(angles)).ravel(),
+            np.outer(radii, np.cos(angles)).ravel(),
+        ],
+        axis=1,
+    )
+    points = np.concatenate([points, boundary, [[0, 0]]])
+    labels, scores = model.get_scores(points)
+    for point, label, score in zip(points, labels, scores):
+        assert (label, score) == model.get_score(point)
@@ -0,0 +1,301 @@
+import os
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from countdart.database.schemas import CalibrationPoint
+from countdart.database.schemas.config import BooleanConfigModel, IntConfigModel
+from countdart.operators import HomographyWarper
+from countdart.settings import settings
+from countdart.utils.dartboard_model import DartboardModel
+from countdart.utils.misc import BBox
+from countdart.utils.warp_cache import WarpCache
+
+LABELS = ["20 | 1", "13 | 6", "3 | 19", "11 | 14"]
+RESOLUTIONS = [(480, 640, 3), (600, 800, 3), (720, 1280, 3), (1080, 1920, 3)]
+
+
+def calibration_points(img_shape, scale=1.0, center=None):
+    """Create calibration points of a dartboard, which is seen from the front
+    with given scale (pixel per mm) and center in pixel"""
+    img_h, img_w = img_shape[:2]
+    if center is None:
+        center = (img_w / 2, img_h / 2)
+    model = DartboardModel()
+    points = []
+    for label in LABELS:
+        x, y = model.get_outer_point(label)
+        # image y axis points downwards
+        points.append(
+            CalibrationPoint(
+                x=(center[0] + x * scale) / img_w,
+                y=(center[1] - y * scale) / img_h,
+                label=label,
+            )
+        )
+    return points
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Use temporary directory as warp cache"""
+    monkeypatch.setattr(settings, "WARP_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def warper() -> HomographyWarper:
+    img_shape = (720, 1280, 3)
+    return HomographyWarper(calibration_points(img_shape), img_shape)
+
+
+def test_warp_point_to_model(warper):
+    """Image center should be bull and points should be scaled correctly"""
+    x, y = warper.warp_point_to_model(640, 360)
+    assert x == pytest.approx(0, abs=1e-3)
+    assert y == pytest.approx(0, abs=1e-3)
+    x, y = warper.warp_point_to_model(640, 260)
+    assert x == pytest.approx(0, abs=1e-3)
+    assert y == pytest.approx(100, abs=1e-3)
+
+
+def test_roi(warper):
+    """Region of interest should contain the board and the margin"""
+    radius = DartboardModel.outer_double_ring + warper.roi_margin.value
+    x, y, w, h = warper.roi_px
+    assert x == pytest.approx(640 - radius, abs=2)
+    assert y == pytest.approx(360 - radius, abs=2)
+    assert w == pytest.approx(2 * radius, abs=2)
+    assert h == pytest.approx(2 * radius, abs=2)
+    cropped = warper.crop_to_roi(np.zeros((720, 1280, 3), dtype=np.uint8))
+    assert cropped.shape == (h, w, 3)
+
+
+def test_roi_clipped():
+    """Region of interest is clipped to the image, if the board is cut off"""
+    img_shape = (480, 640, 3)
+    points = calibration_points(img_shape, scale=0.4, center=(560, 240))
+    warper = HomographyWarper(points, img_shape)
+    x, y, w, h = warper.roi_px
+    assert x + w == 640
+    assert y == pytest.approx(160, abs=2)
+    assert h == pytest.approx(160, abs=2)
+
+
+def test_bbox_to_parent():
+    """Bounding box in a crop is mapped back to the full image"""
+    parent = BBox(0.5, 0.25, 0.5, 0.5)
+    bbox = BBox(0.5, 0.5, 0.5, 0.5).to_parent(parent)
+    assert bbox == BBox(0.75, 0.5, 0.25, 0.25)
+
+
+@pytest.mark.parametrize("img_shape", RESOLUTIONS)
+def test_remap_equivalence(img_shape):
+    """Remap should produce the same result as warpPerspective
+    and the maps should be calculated fast"""
+    # tilted view onto the board
+    points = calibration_points(img_shape, scale=img_shape[0] / 500)
+    points[0].x += 0.02
+    points[2].y -= 0.02
+    remap_config = BooleanConfigModel(name="use_remap", default_value=False, value=True)
+    start = time.perf_counter()
+    warper = HomographyWarper(points, img_shape, config=[remap_config])
+    duration = time.perf_counter() - start
+    assert duration < 1
+
+    # maps should match the per point warp
+    map_xy = warper._map1.reshape(-1, 2)
+    # translation and vertical flip
+    translate = np.array(
+        [[1, 0, -warper.size / 2], [0, -1, warper.size / 2 - 1], [0, 0, 1]]
+    )
+    matrix = np.matmul(warper._h, translate)
+    rng = np.random.default_rng(0)
+    for idx in rng.integers(0, warper.size**2, 100):
+        x, y = idx % warper.size, idx // warper.size
+        px, py = warper._warp_point(matrix, (x, y))
+        if abs(px) < 30000 and abs(py) < 30000:
+            assert map_xy[idx, 0] == pytest.approx(px, abs=0.5 + 1e-3)
+            assert map_xy[idx, 1] == pytest.approx(py, abs=0.5 + 1e-3)
+
+    # warped images should be (almost) the same
+    image = rng.integers(0, 255, img_shape, dtype=np.uint8)
+    remapped = warper._warp_with_remap(image)
+    warped = warper._warp_with_homography(image)
+    assert remapped.shape == warped.shape
+    mismatch = np.any(remapped != warped, axis=-1).mean()
+    assert mismatch < 0.01
+
+
+def test_warp_cache(cache_dir):
+    """Homography and maps are loaded from cache on second initialization"""
+    img_shape = (720, 1280, 3)
+    points = calibration_points(img_shape)
+    remap_config = BooleanConfigModel(name="use_remap", default_value=False, value=True)
+    warper = HomographyWarper(points, img_shape, config=[remap_config])
+    assert len(list(cache_dir.glob("*.npy"))) == 4
+    cached = HomographyWarper(points, img_shape, config=[remap_config])
+    assert isinstance(cached._map1, np.memmap)
+    np.testing.assert_array_equal(cached._h, warper._h)
+    np.testing.assert_array_equal(cached._map1, warper._map1)
+    image = np.random.default_rng(0).integers(0, 255, img_shape, dtype=np.uint8)
+    np.testing.assert_array_equal(
+        cached._warp_with_remap(image), warper._warp_with_remap(image)
+    )
+    # other parameters result in new cache entries
+    margin_config = IntConfigModel(
+        name="margin", default_value=55, max_value=200, min_value=0, value=60
+    )
+    HomographyWarper(points, img_shape, config=[remap_config, margin_config])
+    assert len(list(cache_dir.glob("*.npy"))) == 8
+
+
+def test_warp_cache_eviction(cache_dir, monkeypatch):
+    """Least recently used arrays are removed and failed saves leave no files"""
+    array = np.zeros(1000, dtype=np.uint8)
+    cache = WarpCache(str(cache_dir), max_bytes=3500)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.save(key, "map", array)
+        os.utime(cache_dir / f"{key}_map.npy", (i, i))
+    assert cache.load("a", "map") is not None
+    cache.save("d", "map", array)
+    assert sorted(p.name for p in cache_dir.iterdir()) == [
+        "a_map.npy",
+        "c_map.npy",
+        "d_map.npy",
+    ]
+
+    def fail(*args):
+        raise OSError
+
+    monkeypatch.setattr(os, "replace", fail)
+    cache.save("e", "map", array)
+    assert sorted(p.name for p in cache_dir.iterdir()) == [
+        "a_map.npy",
+        "c_map.npy",
+        "d_map.npy",
+    ]
+
+
+def test_lazy_warp(warper):
+    """Image is only warped if a consumer is registered"""
+    image = np.zeros((720, 1280, 3), dtype=np.uint8)
+    assert warper(image) is None
+    received = []
+    warper.register_consumer(received.append)
+    warped = warper(image)
+    assert warped.shape == (warper.size, warper.size, 3)
+    assert received[0] is warped
+    warper.unregister_consumer(received.append)
+    assert warper(image) is None
+    # point warping is always available
+    assert warper.warp_point_to_model(640, 360) == pytest.approx((0, 0), abs=1e-3)
+
+
+def test_warp_points_to_model():
+    """Batch warp matches single point warps"""
+    img_shape = (720, 1280, 3)
+    points = calibration_points(img_shape)
+    points[0].x += 0.02
+    points[2].y -= 0.02
+    warper = HomographyWarper(points, img_shape)
+    img_points = np.random.default_rng(0).uniform((0, 0), (1280, 720), (1000, 2))
+    warped = warper.warp_points_to_model(img_points)
+    assert warped.shape == (1000, 2)
+    for pt, warped_pt in zip(img_points[:20], warped):
+        expected = warper._warp_point(warper._h_inv, pt)
+        np.testing.assert_allclose(warped_pt, expected)
+
+
+def test_score_at(cache_dir):
+    """Score map lookup matches the analytic score of the warped point"""
+    img_shape = (720, 1280, 3)
+    points = calibration_points(img_shape)
+    points[0].x += 0.02
+    points[2].y -= 0.02
+    warper = HomographyWarper(points, img_shape)
+    model = warper._dartboard_model
+    img_points = np.random.default_rng(0).uniform((0, 0), (1280, 720), (2000, 2))
+    for x, y in img_points:
+        score_id, wire_distance = warper.score_at(x, y)
+        model_pt = warper.warp_point_to_model(x, y)
+        assert model.score_labels[score_id] == model.get_score(model_pt)[0]
+        assert wire_distance >= 0
+    # center of single 20 is far from any wire, outer double ring is a wire
+    _, distance = warper.score_at(*warper._warp_point(warper._h, (0, 50)))
+    assert distance > 3
+    edge = warper._warp_point(warper._h, (0, model.outer_double_ring))
+    assert warper.score_at(*edge)[1] < 1
+    # maps are cached on disk
+    assert len(list(cache_dir.glob("*_map.npy"))) == 2
+
+
+@pytest.mark.parametrize(
+    "img_shape, scale", [((480, 640, 3), 0.4), ((240, 320, 3), 0.3)]
+)
+def test_score_at_low_resolution(img_shape, scale):
+    """Score map lookup is exact next to the wires, if a pixel covers
+    multiple millimeters of the board"""
+    points = calibration_points(img_shape, scale=scale)
+    points[0].x += 0.02
+    points[2].y -= 0.02
+    warper = HomographyWarper(points, img_shape)
+    model = warper._dartboard_model
+    img_h, img_w = img_shape[:2]
+    # points on the board
+    img_points = np.random.default_rng(0).uniform((0, 0), (img_w, img_h), (20000, 2))
+    model_points = warper.warp_points_to_model(img_points)
+    on_board = np.hypot(*model_points.T) < model.outer_double_ring
+    expected = model.get_score_ids_analytic(model_points[on_board])
+    for (x, y), score_id in zip(img_points[on_board], expected):
+        assert warper.score_at(x, y)[0] == score_id
+
+
+def test_distortion(cache_dir):
+    """Undistortion is part of point warping, score map and the remap table"""
+    img_shape = (720, 1280, 3)
+    camera_matrix = [[900, 0, 640], [0, 900, 360], [0, 0, 1]]
+    dist_coeffs = [-0.3, 0.1, 0, 0, 0]
+    pinhole = HomographyWarper(calibration_points(img_shape, scale=1.5), img_shape)
+    warper = HomographyWarper(
+        pinhole._calib_points,
+        img_shape,
+        camera_matrix=camera_matrix,
+        dist_coeffs=dist_coeffs,
+    )
+    # calibration points are clicked in the distorted image
+    points = calibration_points(img_shape, scale=1.5)
+    for point in points:
+        x, y = warper._distort_points([[point.x * 1280, point.y * 720]])[0]
+        point.x, point.y = x / 1280, y / 720
+    warper = HomographyWarper(
+        points, img_shape, camera_matrix=camera_matrix, dist_coeffs=dist_coeffs
+    )
+    model_points = np.random.default_rng(0).uniform(-170, 170, (100, 2))
+    pinhole_points = cv2.perspectiveTransform(
+        model_points.reshape(-1, 1, 2), pinhole._h
+    ).reshape(-1, 2)
+    img_points = warper._distort_points(pinhole_points)
+    np.testing.assert_allclose(
+        warper.warp_points_to_model(img_points), model_points, atol=1e-2
+    )
+    # score map uses the distortion as well
+    model = warper._dartboard_model
+    for (x, y), model_pt in zip(img_points, model_points):
+        score_id, _ = warper.score_at(x, y)
+        assert model.score_labels[score_id] == model.get_score(model_pt)[0]
+    # the warped view is a single remap of the distorted image
+    xs, ys = np.meshgrid(np.arange(1280), np.arange(720))
+    image = np.stack([xs // 5, ys // 3, xs // 10 + ys // 6], axis=-1).astype(np.uint8)
+    received = []
+    warper.register_consumer(received.append)
+    warped = warper(image)
+    assert received[0] is warped
+    expected = pinhole._warp_with_homography(
+        cv2.undistort(image, np.array(camera_matrix, float), np.array(dist_coeffs))
+    )
+    assert warped.shape == expected.shape
+    diff = np.abs(warped.astype(int) - expected.astype(int))
+    assert diff.mean() < 0.5
@@ -0,0 +1,21 @@
+import time
+
+from countdart.utils.idle_monitor import IdleMonitor
+
+
+def test_idle_monitor(monkeypatch):
+    """Only every k-th frame is processed while idle, motion wakes up"""
+    monitor = IdleMonitor()
+    now = time.time()
+    assert not monitor.is_idle(10)
+    assert not any(monitor.skip_frame(10, 3) for _ in range(5))
+    # no motion for some time
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert monitor.is_idle(10)
+    skipped = [monitor.skip_frame(10, 3) for _ in range(6)]
+    assert skipped == [True, True, False, True, True, False]
+    monitor.update(False)
+    assert monitor.is_idle(10)
+    monitor.update(True)
+    assert not monitor.is_idle(10)
+    assert not monitor.skip_frame(10, 3)
@@ -0,0 +1,50 @@
+import cv2
+import numpy as np
+import pytest
+
+from countdart.operators import HoughLineDetector, PrincipalAxisDetector
+from countdart.utils.misc import BBox
+
+FULL = BBox(0, 0, 1, 1)
+
+
+@pytest.fixture
+def mask() -> np.ndarray:
+    """Mask with a long line, a short line and some noise"""
+    mask = np.zeros((400, 600), dtype=np.uint8)
+    cv2.line(mask, (100, 100), (400, 250), 255, thickness=5)
+    cv2.line(mask, (450, 50), (500, 50), 255, thickness=5)
+    mask[20, 580] = 255
+    return mask
+
+
+@pytest.mark.parametrize("detector", [HoughLineDetector, PrincipalAxisDetector])
+def test_longest_line(detector, mask):
+    """Both detectors should find the long line"""
+    line = detector().call(mask, FULL)
+    x1, y1, x2, y2 = line.to_pixel(*mask.shape)
+    if x1 > x2:
+        x1, y1, x2, y2 = x2, y2, x1, y1
+    assert np.rad2deg(np.arctan2(y2 - y1, x2 - x1)) == pytest.approx(26.57, abs=2)
+    assert (x1, y1) == pytest.approx((100, 100), abs=6)
+    assert (x2, y2) == pytest.approx((400, 250), abs=6)
+
+
+@pytest.mark.parametrize("detector", [HoughLineDetector, PrincipalAxisDetector])
+def test_no_line(detector):
+    """Both detectors return None on empty masks"""
+    mask = np.zeros((400, 600), dtype=np.uint8)
+    assert detector().call(mask, FULL) is None
+
+
+@pytest.mark.parametrize("thickness", [1, 2])
+@pytest.mark.parametrize("x", [101, 102, 103, 104])
+def test_thin_line(x, thickness):
+    """Thin lines are found at every position on the pixel grid"""
+    mask = np.zeros((400, 600), dtype=np.uint8)
+    mask[50:350, x : x + thickness] = 255
+    line = PrincipalAxisDetector().call(mask, FULL)
+    assert line is not None
+    x1, y1, x2, y2 = line.to_pixel(*mask.shape)
+    assert (x1, x2) == pytest.approx((x, x), abs=2)
+    assert sorted((y1, y2)) == pytest.approx((50, 349), abs=2)
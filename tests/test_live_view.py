@@ -0,0 +1,150 @@
+import asyncio
+import base64
+import json
+
+import cv2
+import numpy as np
+
+from countdart.api import live_view
+from countdart.api.live_view import (
+    FRAME_HEADER,
+    FrameBroadcaster,
+    LiveFrame,
+    LiveViews,
+    Subscriber,
+    encode_frame,
+)
+from countdart.utils.misc import encode_numpy
+
+
+def test_encode_frame():
+    """RGB frames are encoded with the given encoding and quality"""
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    frame[..., 0] = 200
+    jpeg = encode_frame(encode_numpy(frame), quality=95)
+    decoded = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape == (120, 160, 3)
+    # opencv decodes to BGR, so red is the last channel
+    assert abs(int(decoded[60, 80, 2]) - 200) < 5
+    assert decoded[60, 80, 0] < 5
+    smaller = encode_frame(encode_numpy(frame), quality=10)
+    assert len(smaller) <= len(jpeg)
+    gray = np.full((120, 160, 1), 100, dtype=np.uint8)
+    jpeg = encode_frame(encode_numpy(gray))
+    decoded = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_GRAYSCALE)
+    assert decoded.shape == (120, 160)
+    webp = encode_frame(encode_numpy(frame), encoding="webp")
+    assert webp[:4] == b"RIFF" and webp[8:12] == b"WEBP"
+
+
+def test_live_frame_messages():
+    """Json and binary messages contain the same image"""
+    frame = LiveFrame(b"\xff\xd8image", "jpeg", 7, 1234.5)
+    message = json.loads(frame.text())
+    assert message["type"] == "image"
+    assert base64.b64decode(message["content"]) == frame.image
+    binary = frame.binary()
+    assert FRAME_HEADER.unpack_from(binary) == (1, 1, 7, 1234.5)
+    assert binary[FRAME_HEADER.size :] == frame.image
+    # messages are built once and shared by all subscribers
+    assert frame.binary() is binary
+
+
+def test_subscriber_skips_frames():
+    """A slow subscriber receives all results, but only the latest frame"""
+
+    async def run():
+        subscriber = Subscriber()
+        subscriber.push_frame("frame 1")
+        subscriber.push("result")
+        subscriber.push_frame("frame 2")
+        assert await subscriber.next() == ["result", "frame 2"]
+        subscriber.close()
+        assert await subscriber.next() == []
+        assert subscriber.closed
+
+    asyncio.run(run())
+
+
+class FakeRedis:
+    """Returns the same frame for all keys"""
+
+    def __init__(self, frame: bytes):
+        self.frame = frame
+
+    async def get(self, key):
+        return self.frame
+
+
+async def idle(self):
+    """Replaces FrameBroadcaster._run, frames are broadcast by the test"""
+    await asyncio.Event().wait()
+
+
+def test_broadcast_encodes_once(monkeypatch):
+    """Each frame is encoded once and the same message is sent to all
+    subscribers"""
+    monkeypatch.setattr(FrameBroadcaster, "_run", idle)
+    calls = []
+
+    def encode(*args):
+        calls.append(args)
+        return b"image"
+
+    monkeypatch.setattr(live_view, "encode_frame", encode)
+
+    async def run():
+        views = LiveViews()
+        view = ("cam", "USBCam", "USBCam", "jpeg", 80)
+        subscribers = [Subscriber() for _ in range(3)]
+        for subscriber in subscribers:
+            views.subscribe(subscriber, view)
+        broadcaster = views._broadcasters[view]
+        r = FakeRedis(encode_numpy(np.zeros((4, 4, 3), dtype=np.uint8)))
+        last = await broadcaster._broadcast_frame(r, (None, None))
+        # unchanged frames are not encoded again
+        await broadcaster._broadcast_frame(r, last)
+        assert len(calls) == 1
+        frames = [(await x.next())[0] for x in subscribers]
+        assert all(frame is frames[0] for frame in frames)
+        assert frames[0].image == b"image" and frames[0].seq == 1
+        for subscriber in subscribers:
+            views.unsubscribe(subscriber)
+
+    asyncio.run(run())
+
+
+def test_broadcaster_lifecycle(monkeypatch):
+    """The broadcaster stops with its last subscriber and a failed broadcaster
+    is replaced"""
+    monkeypatch.setattr(FrameBroadcaster, "_run", idle)
+
+    async def run():
+        views = LiveViews()
+        view = ("cam", "USBCam", "USBCam", "jpeg", 80)
+        first, second = Subscriber(), Subscriber()
+        views.subscribe(first, view)
+        views.subscribe(second, view)
+        broadcaster = views._broadcasters[view]
+        views.unsubscribe(first)
+        assert views._broadcasters[view] is broadcaster
+        views.unsubscribe(second)
+        assert view not in views._broadcasters
+        await asyncio.sleep(0)
+        assert not broadcaster.running
+
+        # a failed broadcaster is not reused
+        views.subscribe(first, view)
+        failed = views._broadcasters[view]
+        failed.stop()
+        await asyncio.sleep(0)
+        views.subscribe(second, view)
+        assert views._broadcasters[view] is not failed
+        assert views._broadcasters[view].running
+        # the subscriber of the failed broadcaster does not stop the new one
+        views.unsubscribe(first)
+        assert views._broadcasters[view].running
+        views.unsubscribe(second)
+        assert view not in views._broadcasters
+
+    asyncio.run(run())
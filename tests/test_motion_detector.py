@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from countdart.operators import MotionDetector
+
+
+@pytest.fixture
+def detector() -> MotionDetector:
+    return MotionDetector()
+
+
+def moving_frame(i: int) -> np.ndarray:
+    """Frame with a white square at a position depending on i"""
+    frame = np.zeros((400, 400, 3), dtype=np.uint8)
+    frame[40 * i : 40 * i + 40, 100:140] = 255
+    return frame
+
+
+def test_no_motion(detector):
+    """Static frames should never report motion"""
+    frame = moving_frame(0)
+    for _ in range(10):
+        mask = detector(frame)
+        assert not np.any(mask)
+        assert not detector.had_motion
+
+
+def test_consistent_motion(detector):
+    """Motion is only reported after consistency_frames frames with motion"""
+    consistency = detector.consistency_frames.value
+    detector(moving_frame(0))
+    for i in range(1, consistency):
+        mask = detector(moving_frame(i))
+        assert detector.had_motion
+        assert not np.any(mask)
+    mask = detector(moving_frame(consistency))
+    assert np.any(mask)
+
+
+def test_motion_interrupted(detector):
+    """A single frame without motion resets the consistency counter"""
+    consistency = detector.consistency_frames.value
+    detector(moving_frame(0))
+    for i in range(1, consistency):
+        detector(moving_frame(i))
+    # the reference image is still the first frame, so this has no motion
+    mask = detector(moving_frame(0))
+    assert not detector.had_motion
+    assert not np.any(mask)
+    mask = detector(moving_frame(consistency))
+    assert not np.any(mask)
+
+
+def test_resize_override(detector):
+    """Resize argument overwrites the resize config, e.g. while idle"""
+    mask = detector(moving_frame(0), resize=0.1)
+    assert mask.shape == (40, 40)
+    mask = detector(moving_frame(0))
+    assert mask.shape == (100, 100)
+
+
+def test_idle_to_active_keeps_background(detector):
+    """A dart which lands while idle is reported after switching back to the
+    active resolution, as the background is not replaced by the idle frame"""
+    # board like frame with sharp edges
+    ys, xs = np.mgrid[-200:200, -200:200]
+    segments = (np.degrees(np.arctan2(ys, xs)) // 18).astype(int) % 2
+    board = np.repeat((segments * 200 + 20).astype(np.uint8)[..., None], 3, axis=2)
+    detector(board)
+    detector(board)
+    # idle frames of the unchanged board contain no motion
+    for _ in range(3):
+        detector(board, resize=detector.idle_resize.value)
+        assert not detector.had_motion
+    dart = board.copy()
+    dart[150:250, 195:205] = 255
+    dart[150:250, 195:205, 1:] = 0
+    detector(dart, resize=detector.idle_resize.value)
+    assert detector.had_motion
+    masks = [detector(dart) for _ in range(20)]
+    assert any(np.any(mask) for mask in masks)
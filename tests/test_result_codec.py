@@ -0,0 +1,71 @@
+import pytest
+
+from countdart.database.schemas import DartThrowBase, ResultMessage, Trace
+from countdart.utils.dartboard_model import DartboardModel
+from countdart.utils.result_codec import (
+    RESULT_SCORES,
+    add_trace,
+    decode_result,
+    encode_result,
+)
+from countdart.utils.tracing import new_trace, stamp
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        ResultMessage(cls="none"),
+        ResultMessage(cls="hand"),
+        ResultMessage(
+            cls="dart",
+            content=DartThrowBase(score="T 20", confidence=0.75, point=(1.5, 100.25)),
+        ),
+        ResultMessage(
+            cls="dart",
+            content=DartThrowBase(score="S 1", confidence=0.5, point=(0, 0)),
+            trace=Trace(id="a1b2-42", stamps={"capture": 1e9, "detect": 1e9 + 0.1}),
+        ),
+        # strings which are not in the tables of known classes and scores
+        ResultMessage(
+            cls="other",
+            content=DartThrowBase(score="X 1", confidence=1, point=(-1, 2)),
+            trace=Trace(id="c", stamps={"capture": 1.0}),
+        ),
+    ],
+)
+def test_result_codec(message):
+    """Binary encoded results are decoded to the same message"""
+    encoded = encode_result(message)
+    assert len(encoded) < len(message.model_dump_json())
+    decoded = decode_result(encoded)
+    assert decoded == message
+    assert decoded.model_dump_json() == message.model_dump_json()
+    # json is still supported
+    assert decode_result(message.model_dump_json().encode()) == message
+
+
+def test_result_scores():
+    """The frozen table of scores matches the labels of the dartboard model"""
+    assert RESULT_SCORES == tuple(DartboardModel().score_labels.tolist())
+
+
+def test_result_codec_version():
+    """Unknown versions are rejected"""
+    encoded = bytearray(encode_result(ResultMessage(cls="hand")))
+    encoded[0] = 99
+    with pytest.raises(ValueError, match="version"):
+        decode_result(bytes(encoded))
+
+
+def test_add_trace():
+    """Trace is appended to an encoded message and stamps are copies"""
+    trace = new_trace("cam-1", 10.0)
+    stamped = stamp(trace, "detect", 10.5)
+    assert trace.stamps == {"capture": 10.0}
+    assert stamped.stamps == {"capture": 10.0, "detect": 10.5}
+    message = ResultMessage(cls="hand")
+    encoded = encode_result(message)
+    traced = add_trace(encoded, stamped)
+    assert traced.startswith(encoded[:1])
+    assert decode_result(traced).trace == stamped
+    assert decode_result(traced).cls == "hand"
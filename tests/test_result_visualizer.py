@@ -0,0 +1,28 @@
+import numpy as np
+
+from countdart.database.schemas import OverlayMessage
+from countdart.operators import ResultVisualizer
+from countdart.utils.misc import BBox, Line
+from countdart.utils.visualization import draw_overlay
+
+
+def test_overlay():
+    """Visualizer returns an overlay, which is drawn onto another frame"""
+    image = np.zeros((400, 800, 3), dtype=np.uint8)
+    visualizer = ResultVisualizer()
+    overlay = visualizer(
+        image,
+        BBox(0.25, 0.25, 0.5, 0.5),
+        "dart",
+        Line(0, 0, 1, 1),
+        "T 20",
+        0.9,
+        (400, 250),
+    )
+    assert not np.any(image)
+    assert overlay.tip == (0.5, 0.625)
+    # overlay is resolution independent
+    overlay = OverlayMessage.model_validate_json(overlay.model_dump_json())
+    frame = draw_overlay(np.zeros((200, 400, 3), dtype=np.uint8), overlay)
+    assert np.all(frame[51, 150:300] == (255, 0, 0))
+    assert np.all(frame[125, 200] == (0, 255, 0))
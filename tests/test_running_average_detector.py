@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from countdart.operators import RunningAverageDetector
+
+
+@pytest.fixture
+def detector() -> RunningAverageDetector:
+    return RunningAverageDetector()
+
+
+def frame(brightness: int = 100, square: bool = False) -> np.ndarray:
+    """Frame with given brightness and optionally a white square"""
+    image = np.full((400, 400, 3), brightness, dtype=np.uint8)
+    if square:
+        image[100:200, 100:200] = 255
+    return image
+
+
+def test_static(detector):
+    """Static frames should never report changes"""
+    for _ in range(10):
+        mask = detector(frame())
+        assert mask.shape == (100, 100)
+        assert not np.any(mask)
+
+
+def test_change_is_kept(detector):
+    """Background is frozen while the change is present"""
+    detector(frame())
+    for _ in range(50):
+        mask = detector(frame(square=True))
+        assert detector.had_motion
+        assert np.any(mask)
+    detector.reset(frame(square=True))
+    assert not np.any(detector(frame(square=True)))
+
+
+def test_adapts_to_lighting(detector):
+    """Slow lighting changes are learned by the background"""
+    detector(frame())
+    for i in range(100):
+        mask = detector(frame(100 + i // 2))
+        assert not np.any(mask)
@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from countdart.database.schemas import DartThrowBase
+from countdart.services.throw_writer import ThrowWriter, to_dart_throw
+
+
+def entry(i: int):
+    """Entry of the throw stream"""
+    throw = DartThrowBase(score="T 20", confidence=0.9, point=(1, 2))
+    fields = {
+        b"dartboard_id": b"board",
+        b"timestamp": str(1000.5 + i).encode(),
+        b"data": throw.model_dump_json().encode(),
+    }
+    return f"{i}-0".encode(), fields
+
+
+def test_to_dart_throw():
+    """Stream entries are converted to dart throws with their stream id"""
+    throw = to_dart_throw(*entry(1))
+    assert throw.score == "T 20"
+    assert throw.point == (1, 2)
+    assert throw.dartboard_id == "board"
+    assert throw.stream_id == "1-0"
+    assert throw.timestamp == datetime.fromtimestamp(1001.5, timezone.utc)
+
+
+def test_buffer():
+    """Throws are saved if the batch is full or after the flush interval,
+    failed saves keep the throws buffered"""
+    saved = []
+
+    def fail(throws):
+        saved.append(len(throws))
+        raise ConnectionError()
+
+    writer = ThrowWriter(None, fail, batch_size=3, flush_interval=1)
+    assert not writer.due(0)
+    writer.add(*entry(0), now=10)
+    assert not writer.due(10.5)
+    assert writer.due(11)
+    writer.add(*entry(1), now=10.1)
+    writer.add(*entry(2), now=10.2)
+    assert writer.due(10.2)
+    assert writer.flush(10.2) == 0
+    assert saved == [3]
+    # retry after the flush interval
+    assert not writer.due(10.5)
+    assert writer._block_ms(10.5) == pytest.approx(700, abs=1)
+    assert writer.due(11.2)
+
+
+def test_invalid_entries():
+    """Trimmed and malformed entries are acknowledged instead of buffered"""
+
+    class Redis:
+        acked = []
+
+        def xack(self, stream, group, *ids):
+            self.acked.extend(ids)
+
+    r = Redis()
+    writer = ThrowWriter(r, lambda throws: len(throws))
+    writer.add(b"1-0", None, now=10)
+    writer.add(b"2-0", {b"dartboard_id": b"board"}, now=10)
+    entry_id, fields = entry(3)
+    fields[b"data"] = b"{}"
+    writer.add(entry_id, fields, now=10)
+    writer.add(*entry(4), now=10)
+    assert r.acked == [b"1-0", b"2-0", b"3-0"]
+    assert not writer.due(10)
+    assert writer.flush(10) == 1